@@ -1,9 +1,22 @@
+import dataset_cache
 import pandas as pd
 import util
 
+RAW_FILES = ["data/Abalone/abalone.data"]
+
+
+def read_dataframe():
+    return pd.read_csv("data/Abalone/abalone.data")
+
+
+def load_dataframe():
+    return dataset_cache.load(
+        "Abalone", RAW_FILES, read_dataframe, util.preprocess_dataframe
+    )
+
+
 if __name__ == "__main__":
-    df = pd.read_csv("data/Abalone/abalone.data")
-    df = util.preprocess_dataframe(df)
+    df = load_dataframe()
 
     util.train_hc_models("Abalone", df)
     (bic_result, clg_vl_result, hspbn_vl_result, hspbn_hckde_vl_result) = (
@@ -1,15 +1,20 @@
 import math
+import os
 import sys
-from itertools import chain, combinations
+from functools import lru_cache
+from pathlib import Path
 
 import numpy as np
+import task_lease
 from scipy.stats import norm
 
-
-def non_empty_powerset(iterable):
-    "powerset([1,2,3]) --> () (1,) (2,) (3,) (1,2) (1,3) (2,3) (1,2,3)"
-    s = list(iterable)
-    return chain.from_iterable(combinations(s, r) for r in range(1, len(s) + 1))
+# Number of exhaustive sets processed at once in bergmann_hommel.
+BH_CHUNK_SIZE = 1 << 16
+# Precomputed exhaustive sets, one .npy file of bitmasks per number of algorithms.
+EXHAUSTIVE_SETS_PATH = Path("data/exhaustive_sets/")
+# The number of exhaustive sets is Bell(k) - 1: k = 12 takes 67 MB, k = 13 442 MB and
+# k = 15 more than 20 GB, so larger tables are built in memory and not stored.
+MAX_STORED_K = 12
 
 
 def nth(l, n):
@@ -19,113 +24,182 @@ def nth(l, n):
     return [a[n] for a in l]
 
 
-def holm(avgranks, N, names):
-    p_values = pvalues(avgranks, N)
+def holm_arrays(avgranks, N):
+    """
+    Holm adjusted p-values of all the pairwise hypotheses.
+
+    Returns:
+    tuple: Three arrays (adjusted p-values, i, j) sorted by unadjusted p-value, as
+        returned by pvalue_arrays.
+    """
+    p, i, j = pvalue_arrays(avgranks, N)
     k = len(avgranks)
     m = k * (k - 1) / 2
 
-    apv = []
+    apv = np.maximum.accumulate((m - np.arange(p.shape[0])) * p)
+    return np.minimum(apv, 1), i, j
 
-    pv_list = nth(p_values, 0)
-    for i, (_, (alg1, alg2)) in enumerate(p_values):
-        v = m * pv_list[0]
-        for j in range(1, i + 1):
-            v = max(v, (m - j) * pv_list[j])
 
-        apv.append((min(v, 1), (alg1, alg2)))
+def holm(avgranks, N, names):
+    apv, i, j = holm_arrays(avgranks, N)
+    return [(p, (names[alg1], names[alg2])) for (p, alg1, alg2) in zip(apv, i, j)]
 
-    mon_apv = correct_monotocity(apv)
-    apv_names = [(p, (names[alg1], names[alg2])) for (p, (alg1, alg2)) in mon_apv]
-    return apv_names
 
+def correct_monotocity(p_values):
+    array_pvalues = np.maximum.accumulate([p[0] for p in p_values])
+    return [(p, h) for p, (_, h) in zip(array_pvalues, p_values)]
 
-def bh_exhaustivesets(classifiers):
-    e = set()
-    k = len(classifiers)
 
-    i_full = set()
-    for i in range(k - 1):
-        for j in range(i + 1, k):
-            i_full.add((classifiers[i], classifiers[j]))
+def hypotheses(k):
+    """
+    Pairwise hypotheses (i, j), i < j, between k algorithms. The position of each
+    hypothesis is its bit in the exhaustive set masks.
+    """
+    return [(i, j) for i in range(k - 1) for j in range(i + 1, k)]
 
-    if not i_full:
-        return frozenset()
 
-    e.add(frozenset(i_full))
+@lru_cache(maxsize=None)
+def set_partitions(k):
+    """
+    Returns all the partitions of k algorithms as restricted growth strings: an array
+    of shape (Bell(k), k) where each row assigns a block label to each algorithm.
+    """
+    if k == 0:
+        return np.zeros((1, 0), dtype=np.int8)
 
-    classifier_set = set(classifiers)
-    for p in non_empty_powerset(classifiers[:-1]):
-        c1 = list(p)
-        c2 = sorted(list(classifier_set - set(c1)))
+    previous = set_partitions(k - 1)
+    # The new algorithm joins one of the existing blocks or starts a new one.
+    choices = previous.max(axis=1, initial=-1) + 2
+    rows = np.repeat(np.arange(previous.shape[0]), choices)
+    labels = np.arange(rows.shape[0]) - np.repeat(np.cumsum(choices) - choices, choices)
 
-        e1 = bh_exhaustivesets(c1)
-        e2 = bh_exhaustivesets(c2)
+    return np.column_stack((previous[rows], labels.astype(np.int8)))
 
-        e = e.union(e1)
-        e = e.union(e2)
 
-        for f1 in e1:
-            for f2 in e2:
-                e.add(f1.union(f2))
+def build_exhaustive_set_masks(k):
+    """
+    Returns the Bergmann-Hommel exhaustive sets of k algorithms as bitmasks over
+    hypotheses(k): an array of shape (number of sets, words) of np.uint64, where bit h
+    of the set is bit h % 64 of word h // 64.
 
-    if frozenset() in e:
-        e.remove(frozenset())
-    return frozenset(e)
+    Each exhaustive set corresponds to a partition of the algorithms into blocks of
+    equivalent algorithms: it contains the hypotheses between algorithms of the same
+    block. The partition with all the algorithms in different blocks is excluded.
+    """
+    partitions = set_partitions(k)
+    hyp = hypotheses(k)
+    masks = np.zeros((partitions.shape[0], max(1, math.ceil(len(hyp) / 64))), np.uint64)
 
+    for h, (i, j) in enumerate(hyp):
+        same_block = (partitions[:, i] == partitions[:, j]).astype(np.uint64)
+        masks[:, h // 64] |= same_block << np.uint64(h % 64)
 
-def min_pvalue_set(exhaustive_set, pvalues_dict):
-    m = sys.float_info.max
-    for h in exhaustive_set:
-        m = min(m, pvalues_dict[h])
-    return m
+    return masks[masks.any(axis=1)]
 
 
-def correct_monotocity(p_values):
-    new_pvalues = p_values.copy()
-    array_pvalues = np.asarray([p[0] for p in p_values])
+def exhaustive_sets_file(k):
+    return EXHAUSTIVE_SETS_PATH / ("exhaustive_sets_" + str(k).zfill(2) + ".npy")
 
-    for i, (_, h) in enumerate(p_values[1:]):
-        i = i + 1
-        new_pvalues[i] = (array_pvalues[: i + 1].max(), h)
 
-    return new_pvalues
+@lru_cache(maxsize=None)
+def exhaustive_set_masks(k):
+    """
+    Returns the exhaustive set bitmasks of k algorithms (see
+    build_exhaustive_set_masks). The stored table is memory-mapped if it exists.
+    Otherwise, it is built and, for k <= MAX_STORED_K, stored for the next runs.
+    """
+    filename = exhaustive_sets_file(k)
+    if filename.exists():
+        return np.load(filename, mmap_mode="r")
+
+    masks = build_exhaustive_set_masks(k)
+
+    if k <= MAX_STORED_K:
+        EXHAUSTIVE_SETS_PATH.mkdir(parents=True, exist_ok=True)
+        # Processes building the same table write to their own temporary file, and the
+        # last os.replace wins with an identical table.
+        tmp_file = task_lease.temporary_file(filename)
+        try:
+            with open(tmp_file, "wb") as f:
+                np.save(f, masks)
+            os.replace(tmp_file, filename)
+        finally:
+            if os.path.exists(tmp_file):
+                os.unlink(tmp_file)
+
+    return masks
+
+
+def precompute_exhaustive_sets(max_k=MAX_STORED_K):
+    for k in range(2, max_k + 1):
+        exhaustive_set_masks(k)
+        print(
+            "Exhaustive sets for k = "
+            + str(k)
+            + " saved in "
+            + str(exhaustive_sets_file(k))
+        )
 
 
 def bergmann_hommel(avgranks, N, names):
     p_values = pvalues(avgranks, N)
 
     k = len(avgranks)
-    exhaustive_sets = bh_exhaustivesets(np.arange(k))
-    pvalues_dict = {h: p for (p, h) in p_values}
+    hyp = hypotheses(k)
+    hyp_index = {h: idx for idx, h in enumerate(hyp)}
 
-    apv = []
-    for i, (_, hypot) in enumerate(p_values):
-        v = sys.float_info.min
-        for ex_set in exhaustive_sets:
-            if hypot in ex_set:
-                v = max(v, len(ex_set) * min_pvalue_set(ex_set, pvalues_dict))
+    p_array = np.empty((len(hyp),))
+    for p, h in p_values:
+        p_array[hyp_index[h]] = p
 
-        apv.append((min(v, 1), hypot))
+    exhaustive_sets = exhaustive_set_masks(k)
+    words = np.asarray([h // 64 for h in range(len(hyp))])
+    shifts = np.asarray([h % 64 for h in range(len(hyp))], dtype=np.uint64)
+
+    # For each hypothesis, maximum of |S| * min(p_S) over the exhaustive sets S that
+    # contain it.
+    max_values = np.full((len(hyp),), sys.float_info.min)
+    for start in range(0, exhaustive_sets.shape[0], BH_CHUNK_SIZE):
+        chunk = exhaustive_sets[start : start + BH_CHUNK_SIZE]
+        contains = ((chunk[:, words] >> shifts) & np.uint64(1)).astype(bool)
+
+        set_values = contains.sum(axis=1) * np.where(contains, p_array, np.inf).min(
+            axis=1
+        )
+        max_values = np.maximum(
+            max_values, np.where(contains, set_values[:, None], -np.inf).max(axis=0)
+        )
+
+    apv = [(min(max_values[hyp_index[hypot]], 1), hypot) for (_, hypot) in p_values]
 
     mon_apv = correct_monotocity(apv)
     apv_names = [(p, (names[alg1], names[alg2])) for (p, (alg1, alg2)) in mon_apv]
     return apv_names
 
 
-def pvalues(avgranks, N):
-    k = len(avgranks)
+def pvalue_arrays(avgranks, N):
+    """
+    Computes the p-values of all the pairwise hypotheses (i, j), i < j, from the
+    average ranks of k algorithms over N datasets.
+
+    Returns:
+    tuple: Three arrays (p-values, i, j) sorted by p-value (ties by i and j).
+    """
+    avgranks = np.asarray(avgranks, dtype=float)
+    k = avgranks.shape[0]
 
-    z_values = {}
-    p_values = []
-    for i in range(k - 1):
-        for j in range(i + 1, k):
-            z_values[(i, j)] = abs(
-                (avgranks[i] - avgranks[j]) / (math.sqrt(k * (k + 1) / (6 * N)))
-            )
+    i, j = np.triu_indices(k, 1)
+    z_values = np.abs((avgranks[i] - avgranks[j]) / math.sqrt(k * (k + 1) / (6 * N)))
+    p_values = (1 - norm.cdf(z_values)) * 2
 
-            p_value = (1 - norm.cdf(z_values[(i, j)])) * 2
-            p_values.append((p_value, (i, j)))
+    order = np.lexsort((j, i, p_values))
+    return p_values[order], i[order], j[order]
+
+
+def pvalues(avgranks, N):
+    p_values, i, j = pvalue_arrays(avgranks, N)
+    return [(p, (alg1, alg2)) for (p, alg1, alg2) in zip(p_values, i, j)]
 
-    sort_pvalues = sorted(p_values)
 
-    return sort_pvalues
+if __name__ == "__main__":
+    precompute_exhaustive_sets()
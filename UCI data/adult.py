@@ -1,18 +1,28 @@
+import dataset_cache
 import pandas as pd
 import util
 
+RAW_FILES = ["data/Adult/adult.data", "data/Adult/adult.test"]
+
 
 def preprocess_dataframe(df):
     df = df.drop("education-num", axis=1)
     return util.preprocess_dataframe(df)
 
 
-if __name__ == "__main__":
+def read_dataframe():
     train_df = pd.read_csv("data/Adult/adult.data", na_values="?")
     test_df = pd.read_csv("data/Adult/adult.test", na_values="?")
 
-    df = pd.concat([train_df, test_df], ignore_index=True)
-    df = preprocess_dataframe(df)
+    return pd.concat([train_df, test_df], ignore_index=True)
+
+
+def load_dataframe():
+    return dataset_cache.load("Adult", RAW_FILES, read_dataframe, preprocess_dataframe)
+
+
+if __name__ == "__main__":
+    df = load_dataframe()
 
     util.train_hc_models("Adult", df)
     (bic_result, clg_vl_result, hspbn_vl_result, hspbn_hckde_vl_result) = (
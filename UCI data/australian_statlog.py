@@ -1,6 +1,9 @@
+import dataset_cache
 import pandas as pd
 import util
 
+RAW_FILES = ["data/AustralianStatlog/australian.dat"]
+
 
 def preprocess_dataframe(df):
     cat_columns = ["A1", "A4", "A5", "A6", "A8", "A9", "A11", "A12", "A15"]
@@ -22,9 +25,18 @@ def preprocess_dataframe(df):
     return df
 
 
+def read_dataframe():
+    return pd.read_csv("data/AustralianStatlog/australian.dat")
+
+
+def load_dataframe():
+    return dataset_cache.load(
+        "AustralianStatlog", RAW_FILES, read_dataframe, preprocess_dataframe
+    )
+
+
 if __name__ == "__main__":
-    df = pd.read_csv("data/AustralianStatlog/australian.dat")
-    df = preprocess_dataframe(df)
+    df = load_dataframe()
 
     util.train_hc_models("AustralianStatlog", df)
     (bic_result, clg_vl_result, hspbn_vl_result, hspbn_hckde_vl_result) = (
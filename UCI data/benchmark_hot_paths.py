@@ -0,0 +1,94 @@
+import sys
+from pathlib import Path
+
+# Modules shared by the UCI and synthetic experiments.
+sys.path.append(str(Path(__file__).resolve().parents[1] / "common"))
+
+import adjusted_pvalues
+import benchmark_harness
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import util
+
+import pybnesian as pbn
+
+SEED = 0
+
+
+def gaussian_data(n, d, rng):
+    """
+    n instances of d correlated continuous variables.
+    """
+    mixing = rng.normal(size=(d, d))
+    return pd.DataFrame(
+        rng.normal(size=(n, d)) @ mixing, columns=["X" + str(i) for i in range(d)]
+    )
+
+
+def setup_plugin_bandwidth(n, d):
+    df = pa.RecordBatch.from_pandas(gaussian_data(n, d, np.random.default_rng(SEED)))
+    variables = df.schema.names
+    estimator = util.PluginEstimator()
+    return lambda: estimator.bandwidth(df, variables)
+
+
+def setup_linear_dependent_features(n, d):
+    df = gaussian_data(n, d, np.random.default_rng(SEED))
+    df["dependent_sum"] = df["X0"] + 2 * df["X" + str(d - 1)]
+    df["dependent_copy"] = 3 * df["X0"]
+    return lambda: util.linear_dependent_features(df)
+
+
+def avgranks(k):
+    rng = np.random.default_rng(SEED)
+    ranks = rng.uniform(1, k, size=k)
+    return ranks * k * (k + 1) / 2 / ranks.sum()
+
+
+def setup_holm(k):
+    ranks = avgranks(k)
+    names = ["algorithm" + str(i) for i in range(k)]
+    return lambda: adjusted_pvalues.holm(ranks, 10, names)
+
+
+def setup_bergmann_hommel(k):
+    ranks = avgranks(k)
+    names = ["algorithm" + str(i) for i in range(k)]
+    return lambda: adjusted_pvalues.bergmann_hommel(ranks, 10, names)
+
+
+def setup_unfold_predictions(n):
+    df = pd.DataFrame({"X0": np.zeros((n,))})
+    fold_indices = util.evaluation_folds(df)
+    rng = np.random.default_rng(SEED)
+    results = [rng.normal(size=len(test)) for (_, test) in fold_indices]
+    return lambda: util.unfold_predictions(results, fold_indices)
+
+
+def benchmark_cases():
+    """
+    Returns the name and the (setup function, arguments) of each benchmark. The setup
+    function generates the inputs and returns the function to time.
+    """
+    cases = {}
+    for n in [200, 2000, 10000]:
+        for d in [1, 4]:
+            name = "PluginEstimator.bandwidth[n=" + str(n) + ",d=" + str(d) + "]"
+            cases[name] = (setup_plugin_bandwidth, (n, d))
+    for n in [200, 2000, 10000]:
+        name = "linear_dependent_features[n=" + str(n) + ",d=10]"
+        cases[name] = (setup_linear_dependent_features, (n, 10))
+    for k in [4, 8, 12, 50]:
+        cases["holm[k=" + str(k) + "]"] = (setup_holm, (k,))
+    for k in [4, 6, 8, 10]:
+        cases["bergmann_hommel[k=" + str(k) + "]"] = (setup_bergmann_hommel, (k,))
+    for n in [1000, 100000, 1000000]:
+        name = "unfold_predictions[n=" + str(n) + "]"
+        cases[name] = (setup_unfold_predictions, (n,))
+    return cases
+
+
+if __name__ == "__main__":
+    # python benchmark_hot_paths.py [--save] [name pattern ...]
+    benchmark_harness.main(benchmark_cases(), sys.argv[1:])
@@ -0,0 +1,115 @@
+import time
+
+import abalone
+import adult
+import australian_statlog
+import cover_type
+import credit_approval
+import german_statlog
+import kdd
+import liver_disorders
+import numpy as np
+import thyroid_hypothyroid
+import thyroid_sick
+import util
+
+REPETITIONS = 3
+
+
+def load_datasets():
+    """
+    Loads every preprocessed UCI dataset.
+
+    Returns:
+    dict: The preprocessed pandas.DataFrame of each dataset, indexed by its name.
+    """
+    return {
+        "Abalone": abalone.load_dataframe(),
+        "Adult": adult.load_dataframe(),
+        "AustralianStatlog": australian_statlog.load_dataframe(),
+        "CoverType": cover_type.load_dataframe(),
+        "CreditApproval": credit_approval.load_dataframe(),
+        "GermanStatlog": german_statlog.load_dataframe(),
+        "KDDCup": kdd.load_dataframe(),
+        "LiverDisorders": liver_disorders.load_dataframe(),
+        "Thyroid-hypothyroid": thyroid_hypothyroid.load_dataframe(),
+        "Thyroid-sick": thyroid_sick.load_dataframe(),
+    }
+
+
+def add_dependent_columns(df):
+    """
+    Adds two continuous columns that are linear combinations of the first continuous
+    columns of df, so the dependent-column search has something to find.
+    """
+    continuous = df.select_dtypes("float64").columns
+    df = df.copy()
+    df["dependent_sum"] = df[continuous[0]] + 2 * df[continuous[-1]]
+    df["dependent_copy"] = 3 * df[continuous[0]]
+    return df
+
+
+def fold_covariances(df):
+    """
+    Covariance of the continuous columns in the training data of every inner CV fold,
+    as analyzed by util.linear_dependent_features.
+    """
+    data = df.select_dtypes("float64").to_numpy(dtype="double")
+
+    covs = []
+    for inner_folds in util.preprocessing_folds(df.shape[0], 10):
+        centered, starts, sizes = util.centered_fold_data(data, inner_folds)
+        for start, size in zip(starts, sizes):
+            fold = centered[start : start + size, :]
+            covs.append(fold.T @ fold / (size - 1))
+
+    return covs
+
+
+def time_method(covs, dependent_columns):
+    times = np.empty((REPETITIONS,))
+    for i in range(REPETITIONS):
+        start_time = time.perf_counter()
+        result = [dependent_columns(cov) for cov in covs]
+        times[i] = time.perf_counter() - start_time
+
+    return result, np.median(times)
+
+
+def benchmark(name, df):
+    covs = fold_covariances(df)
+    rank_result, rank_time = time_method(covs, util.dependent_columns_rank)
+    qr_result, qr_time = time_method(covs, util.dependent_columns_qr)
+
+    print(
+        name
+        + " ("
+        + str(covs[0].shape[0])
+        + " continuous, "
+        + str(sum(len(r) > 0 for r in rank_result))
+        + "/"
+        + str(len(covs))
+        + " folds with dependent columns): rank "
+        + "{:.3f}".format(rank_time)
+        + "s, qr "
+        + "{:.3f}".format(qr_time)
+        + "s, speedup "
+        + "{:.1f}".format(rank_time / qr_time)
+        + "x, same result: "
+        + str(rank_result == qr_result)
+    )
+
+
+if __name__ == "__main__":
+    datasets = load_datasets()
+
+    print("Preprocessed datasets")
+    print("=======================")
+    for name, df in datasets.items():
+        benchmark(name, df)
+
+    print()
+    print("Datasets with added dependent columns")
+    print("=======================")
+    for name, df in datasets.items():
+        benchmark(name, add_dependent_columns(df))
@@ -0,0 +1,163 @@
+import argparse
+import csv
+import sys
+import time
+from pathlib import Path
+
+# Modules shared by the UCI and synthetic experiments.
+sys.path.append(str(Path(__file__).resolve().parents[1] / "common"))
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import thread_budget
+import util
+import worker_pool
+
+SEED = 0
+# Tasks run by every worker x thread split. Each task runs the workload once.
+TASKS = 48
+RESULTS_FILE = Path("benchmarks/thread_budget.csv")
+
+# Workload of a worker process, created by init_benchmark_worker.
+worker_workload = None
+
+
+def gaussian_data(n, d, seed):
+    """
+    n instances of d correlated continuous variables.
+    """
+    rng = np.random.default_rng(seed)
+    mixing = rng.normal(size=(d, d))
+    return pd.DataFrame(
+        rng.normal(size=(n, d)) @ mixing, columns=["X" + str(i) for i in range(d)]
+    )
+
+
+def setup_linear_dependent_features(n, d):
+    df = gaussian_data(n, d, SEED)
+    df["dependent_sum"] = df["X0"] + 2 * df["X" + str(d - 1)]
+    return lambda: util.linear_dependent_features(df)
+
+
+def setup_plugin_bandwidth(n, d):
+    df = pa.RecordBatch.from_pandas(gaussian_data(n, d, SEED))
+    variables = df.schema.names
+    estimator = util.PluginEstimator()
+    return lambda: estimator.bandwidth(df, variables)
+
+
+# Setup function and arguments of each workload: the NumPy linear algebra of the
+# preprocessing and the covariance, rank and ks::Hpi of a CKDE bandwidth (needs R).
+WORKLOADS = {
+    "linear_dependent_features": (setup_linear_dependent_features, (20000, 60)),
+    "plugin_bandwidth": (setup_plugin_bandwidth, (5000, 8)),
+}
+
+
+def init_benchmark_worker(workload, budget, counter):
+    global worker_workload
+    if budget is not None:
+        thread_budget.init_worker(budget, counter)
+    setup, args = WORKLOADS[workload]
+    worker_workload = setup(*args)
+
+
+def run_task(_):
+    worker_workload()
+
+
+def splits(cpus):
+    """
+    Returns the (workers, threads) splits to benchmark: every power of two number of
+    workers up to cpus, with a single thread, with the CPUs divided among the workers
+    and without any limit (threads None, each library uses all the CPUs).
+    """
+    workers = [w for w in [2**i for i in range(cpus.bit_length())] if w <= cpus]
+    if cpus not in workers:
+        workers.append(cpus)
+
+    result = []
+    for w in workers:
+        for threads in sorted({1, max(1, cpus // w)}):
+            result.append((w, threads))
+        result.append((w, None))
+    return result
+
+
+def benchmark(workload, workers, threads, pin):
+    """
+    Runs TASKS tasks of the workload on a pool of worker processes with the given
+    threads per worker, after starting the workers and creating their workload.
+
+    Returns:
+    float: The tasks per second.
+    """
+    ctx = worker_pool.context(util.START_METHOD)
+    budget = None
+    if threads is not None:
+        budget = thread_budget.ThreadBudget(workers, threads, pin=pin)
+
+    with ctx.Pool(
+        processes=workers,
+        initializer=init_benchmark_worker,
+        initargs=(workload, budget, ctx.Value("i", 0)),
+    ) as p:
+        # Waits until every worker has started.
+        p.map(time.sleep, [0.1] * workers, chunksize=1)
+
+        start = time.perf_counter()
+        p.map(run_task, range(TASKS), chunksize=1)
+        return TASKS / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    # python benchmark_thread_budget.py [--workload plugin_bandwidth] [--pin]
+    parser = argparse.ArgumentParser(
+        description="Measures the throughput of the worker x thread splits of the CPUs."
+    )
+    parser.add_argument(
+        "--workload", choices=list(WORKLOADS), default="linear_dependent_features"
+    )
+    parser.add_argument(
+        "--pin", action="store_true", help="bind every worker to its own CPUs"
+    )
+    args = parser.parse_args()
+
+    cpus = len(thread_budget.available_cpus())
+    print(
+        args.workload
+        + ", "
+        + str(TASKS)
+        + " tasks on "
+        + str(cpus)
+        + " CPUs"
+        + (", pinned workers" if args.pin else "")
+    )
+    print("{:>8} {:>8} {:>12} {:>9}".format("workers", "threads", "tasks/s", "speedup"))
+
+    rows = []
+    for workers, threads in splits(cpus):
+        throughput = benchmark(args.workload, workers, threads, args.pin)
+        if not rows:
+            baseline = throughput
+        rows.append(
+            {
+                "workload": args.workload,
+                "pin": args.pin,
+                "workers": workers,
+                "threads": threads if threads is not None else "unlimited",
+                "tasks_per_second": throughput,
+            }
+        )
+        print(
+            "{:>8} {:>8} {:>12.3f} {:>8.2f}x".format(
+                workers, rows[-1]["threads"], throughput, throughput / baseline
+            )
+        )
+
+    RESULTS_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(RESULTS_FILE, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
@@ -1,6 +1,9 @@
+import dataset_cache
 import pandas as pd
 import util
 
+RAW_FILES = ["data/Cover Type/covtype_truncated.csv"]
+
 
 def preprocess_dataframe(df):
     cat_columns = (
@@ -37,9 +40,18 @@ def preprocess_dataframe(df):
     return df
 
 
+def read_dataframe():
+    return pd.read_csv("data/Cover Type/covtype_truncated.csv")
+
+
+def load_dataframe():
+    return dataset_cache.load(
+        "CoverType", RAW_FILES, read_dataframe, preprocess_dataframe
+    )
+
+
 if __name__ == "__main__":
-    df = pd.read_csv("data/Cover Type/covtype_truncated.csv")
-    df = preprocess_dataframe(df)
+    df = load_dataframe()
 
     util.train_hc_models("CoverType", df)
     (bic_result, clg_vl_result, hspbn_vl_result, hspbn_hckde_vl_result) = (
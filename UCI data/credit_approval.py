@@ -1,9 +1,22 @@
+import dataset_cache
 import pandas as pd
 import util
 
+RAW_FILES = ["data/Credit Approval/crx.data"]
+
+
+def read_dataframe():
+    return pd.read_csv("data/Credit Approval/crx.data", na_values="?")
+
+
+def load_dataframe():
+    return dataset_cache.load(
+        "CreditApproval", RAW_FILES, read_dataframe, util.preprocess_dataframe
+    )
+
+
 if __name__ == "__main__":
-    df = pd.read_csv("data/Credit Approval/crx.data", na_values="?")
-    df = util.preprocess_dataframe(df)
+    df = load_dataframe()
 
     util.train_hc_models("CreditApproval", df)
     (bic_result, clg_vl_result, hspbn_vl_result, hspbn_hckde_vl_result) = (
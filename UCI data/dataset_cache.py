@@ -0,0 +1,150 @@
+import hashlib
+import inspect
+import json
+import os
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.parquet as pq
+import sklearn
+import task_lease
+import util
+
+import pybnesian as pbn
+
+CACHE_PATH = Path("data/cache/")
+
+# Functions whose code defines the preprocessing. If any of them changes, the cached
+# datasets are preprocessed again.
+PREPROCESSING_FUNCTIONS = [
+    util.preprocess_dataframe,
+    util.preprocessing_folds,
+    util.centered_fold_data,
+    util.remove_crossvalidated_nan,
+    util.dependent_columns_rank,
+    util.dependent_columns_qr,
+    util.linear_dependent_features,
+]
+
+
+def file_hash(filename):
+    h = hashlib.sha256()
+    with open(filename, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def preprocessing_version(read, preprocess):
+    """
+    Hash of the source code of the preprocessing functions (including the dataset
+    specific read and preprocess functions), of the constants that define the CV folds
+    and of the library versions that affect the CV folds.
+    """
+    h = hashlib.sha256()
+    for f in PREPROCESSING_FUNCTIONS + [read, preprocess]:
+        h.update(inspect.getsource(f).encode())
+    h.update(str(util.SEED).encode())
+    h.update(str(util.EVALUATION_FOLDS).encode())
+    h.update(pd.__version__.encode())
+    h.update(pbn.__version__.encode())
+    h.update(sklearn.__version__.encode())
+    return h.hexdigest()
+
+
+def cache_key(raw_files, read, preprocess):
+    return {
+        "raw_files": {filename: file_hash(filename) for filename in raw_files},
+        "preprocessing_version": preprocessing_version(read, preprocess),
+    }
+
+
+def load(df_name, raw_files, read, preprocess):
+    """
+    Loads the preprocessed dataset from the cache. The dataset is read and preprocessed
+    again if it is not cached, or if the raw files, the reading or preprocessing code,
+    the CV fold constants or the library versions changed.
+
+    Parameters:
+    df_name (str): The name of the dataset.
+    raw_files (list of str): The raw UCI files of the dataset.
+    read (callable): Function without arguments that reads the raw files into a
+        pandas.DataFrame.
+    preprocess (callable): Function that preprocesses the raw pandas.DataFrame.
+
+    Returns:
+    pandas.DataFrame: The preprocessed dataset.
+    """
+    data_file = CACHE_PATH / (df_name + ".parquet")
+    metadata_file = CACHE_PATH / (df_name + ".json")
+
+    key = cache_key(raw_files, read, preprocess)
+
+    if data_file.exists() and metadata_file.exists():
+        with open(metadata_file, "r") as f:
+            metadata = json.load(f)
+
+        if metadata["key"] == key:
+            df = pd.read_parquet(data_file)
+            # Parquet stores the string categories as plain object categories.
+            for c in metadata["string_categories"]:
+                df[c] = df[c].cat.rename_categories(
+                    df[c].cat.categories.astype("string")
+                )
+            return df
+
+    raw_df = read()
+    df = preprocess(raw_df.copy())
+
+    CACHE_PATH.mkdir(parents=True, exist_ok=True)
+    # Write to a temporary file first, so an interrupted run never leaves a broken cache.
+    tmp_file = task_lease.temporary_file(data_file)
+    df.to_parquet(tmp_file)
+    os.replace(tmp_file, data_file)
+
+    metadata = {
+        "key": key,
+        "removed_columns": [c for c in raw_df.columns if c not in df.columns],
+        "string_categories": [
+            c
+            for c in df.select_dtypes("category")
+            if isinstance(df[c].cat.categories.dtype, pd.StringDtype)
+        ],
+    }
+    tmp_file = task_lease.temporary_file(metadata_file)
+    with open(tmp_file, "w") as f:
+        json.dump(metadata, f, indent=4)
+    os.replace(tmp_file, metadata_file)
+
+    return df
+
+
+def is_cached(df_name):
+    """
+    Returns whether a dataset was cached. The cache could still be outdated (see load).
+    """
+    return (CACHE_PATH / (df_name + ".json")).exists()
+
+
+def cached_shape(df_name):
+    """
+    Returns the (rows, columns) shape of a cached dataset, read from the Parquet
+    metadata without loading the data.
+    """
+    data_file = CACHE_PATH / (df_name + ".parquet")
+    schema = pq.read_schema(data_file)
+    index_columns = [
+        c for c in schema.pandas_metadata["index_columns"] if isinstance(c, str)
+    ]
+    return (
+        pq.read_metadata(data_file).num_rows,
+        len(schema.names) - len(index_columns),
+    )
+
+
+def removed_columns(df_name):
+    """
+    Returns the raw columns removed by the preprocessing of a cached dataset.
+    """
+    with open(CACHE_PATH / (df_name + ".json"), "r") as f:
+        return json.load(f)["removed_columns"]
@@ -1,6 +1,9 @@
+import dataset_cache
 import pandas as pd
 import util
 
+RAW_FILES = ["data/GermanStatlog/german.data"]
+
 
 def preprocess_dataframe(df):
     cat_columns = [
@@ -45,9 +48,18 @@ def preprocess_dataframe(df):
     return df
 
 
+def read_dataframe():
+    return pd.read_csv("data/GermanStatlog/german.data")
+
+
+def load_dataframe():
+    return dataset_cache.load(
+        "GermanStatlog", RAW_FILES, read_dataframe, preprocess_dataframe
+    )
+
+
 if __name__ == "__main__":
-    df = pd.read_csv("data/GermanStatlog/german.data")
-    df = preprocess_dataframe(df)
+    df = load_dataframe()
 
     util.train_hc_models("GermanStatlog", df)
     (bic_result, clg_vl_result, hspbn_vl_result, hspbn_hckde_vl_result) = (
@@ -1,7 +1,10 @@
+import dataset_cache
 import numpy as np
 import pandas as pd
 import util
 
+RAW_FILES = ["data/KDD Cup/kddcup_truncated.csv"]
+
 
 def preprocess_dataframe(df):
     index_constant = np.where(df.nunique() == 1)[0]
@@ -58,9 +61,16 @@ def preprocess_dataframe(df):
     return df
 
 
+def read_dataframe():
+    return pd.read_csv("data/KDD Cup/kddcup_truncated.csv")
+
+
+def load_dataframe():
+    return dataset_cache.load("KDDCup", RAW_FILES, read_dataframe, preprocess_dataframe)
+
+
 if __name__ == "__main__":
-    df = pd.read_csv("data/KDD Cup/kddcup_truncated.csv")
-    df = preprocess_dataframe(df)
+    df = load_dataframe()
 
     util.train_hc_models("KDDCup", df)
     (bic_result, clg_vl_result, hspbn_vl_result, hspbn_hckde_vl_result) = (
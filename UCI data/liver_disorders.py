@@ -1,6 +1,9 @@
+import dataset_cache
 import pandas as pd
 import util
 
+RAW_FILES = ["data/Liver disorders/bupa.data"]
+
 
 def preprocess_dataframe(df):
     cat_columns = ["selector"]
@@ -22,9 +25,18 @@ def preprocess_dataframe(df):
     return df
 
 
+def read_dataframe():
+    return pd.read_csv("data/Liver disorders/bupa.data")
+
+
+def load_dataframe():
+    return dataset_cache.load(
+        "LiverDisorders", RAW_FILES, read_dataframe, preprocess_dataframe
+    )
+
+
 if __name__ == "__main__":
-    df = pd.read_csv("data/Liver disorders/bupa.data")
-    df = preprocess_dataframe(df)
+    df = load_dataframe()
 
     util.train_hc_models("LiverDisorders", df)
     (bic_result, clg_vl_result, hspbn_vl_result, hspbn_hckde_vl_result) = (
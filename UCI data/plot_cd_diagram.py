@@ -92,6 +92,92 @@ def compute_CD(avgranks, n, alpha="0.05", test="nemenyi"):
     return cd
 
 
+def sort_ranks(avgranks, reverse=False):
+    """
+    Returns the sorted average ranks and the index of each sorted rank in `avgranks`.
+    """
+    tempsort = sorted([(a, i) for i, a in enumerate(avgranks)], reverse=reverse)
+    return [a for a, _ in tempsort], [i for _, i in tempsort]
+
+
+def adjusted_pvalue_matrix(ssums, N, posthoc_method):
+    """
+    Returns a k x k matrix with the adjusted p-values of all the pairwise hypotheses.
+
+    Args:
+        ssums (list of float): sorted average ranks of methods.
+        N (int): number of datasets.
+        posthoc_method (str): "holm" or "bergmann".
+    """
+    k = len(ssums)
+    if posthoc_method == "holm":
+        apv, i, j = adjusted_pvalues.holm_arrays(ssums, N)
+    elif posthoc_method == "bergmann":
+        bh = adjusted_pvalues.bergmann_hommel(ssums, N, np.arange(k))
+        apv = np.asarray([p for (p, _) in bh])
+        i = np.asarray([i for (_, (i, _)) in bh], dtype=int)
+        j = np.asarray([j for (_, (_, j)) in bh], dtype=int)
+    else:
+        raise ValueError(
+            'Wrong posthoc method. Only Holm ("holm") and Bergmann-Hommel ("bergmann") '
+            "adjusted p-values are implemented"
+        )
+
+    matrix = np.ones((k, k))
+    matrix[i, j] = apv
+    matrix[j, i] = apv
+    return matrix
+
+
+def nonsignificant_lines(ssums, N, posthoc_method="cd", alpha=0.05, pvalue_matrix=None):
+    """
+    Returns the longest groups (i, j) of methods whose differences are not
+    significant, where i and j are positions in the sorted average ranks `ssums`.
+
+    Args:
+        ssums (list of float): sorted average ranks of methods.
+        N (int): number of datasets.
+        posthoc_method (str): "cd", "holm" or "bergmann".
+        alpha (float): significance level.
+        pvalue_matrix (numpy.ndarray, optional): precomputed adjusted p-values, as
+            returned by `adjusted_pvalue_matrix`. Ignored for the "cd" method.
+    """
+    k = len(ssums)
+    if posthoc_method == "cd":
+        hsd = compute_CD(ssums, N, alpha=str(alpha), test="nemenyi")
+        # remove not significant
+        notSig = [
+            (i, j)
+            for i in range(k)
+            for j in range(i + 1, k)
+            if abs(ssums[i] - ssums[j]) <= hsd
+        ]
+    elif posthoc_method in ("holm", "bergmann"):
+        if pvalue_matrix is None:
+            pvalue_matrix = adjusted_pvalue_matrix(ssums, N, posthoc_method)
+        notSig = [
+            (i, j)
+            for i in range(k)
+            for j in range(i + 1, k)
+            if pvalue_matrix[i, j] > alpha
+        ]
+    else:
+        raise ValueError(
+            'Wrong posthoc method. Only Nemenyi ("cd"), Holm ("holm") and '
+            'Bergmann-Hommel ("bergmann") posthoc methods are implemented'
+        )
+
+    # keep only longest
+    def no_longer(ij_tuple, notSig):
+        i, j = ij_tuple
+        for i1, j1 in notSig:
+            if (i1 <= i and j1 > j) or (i1 < i and j1 >= j):
+                return False
+        return True
+
+    return [(i, j) for i, j in notSig if no_longer((i, j), notSig)]
+
+
 # Adapted from Orange3 https://docs.biolab.si//3/data-mining-library/_modules/Orange/evaluation/scoring.html#graph_ranks
 def graph_ranks(
     avgranks,
@@ -105,6 +191,7 @@ def graph_ranks(
     reverse=False,
     filename=None,
     alpha=0.05,
+    lines=None,
     **kwargs
 ):
     """
@@ -133,6 +220,9 @@ def graph_ranks(
             right (default: `False`)
         filename (str, optional): output file name (with extension). If not
             given, the function does not write a file.
+        lines (list of tuple, optional): precomputed non-significance lines, as
+            returned by `nonsignificant_lines`. If omitted, they are computed from
+            `avgranks` with `posthoc_method`.
     """
     try:
         import matplotlib.pyplot as plt
@@ -161,39 +251,13 @@ def graph_ranks(
         else:
             return n
 
-    def mxrange(lr):
-        """
-        Multiple xranges. Can be used to traverse matrices.
-        This function is very slow due to unknown number of
-        parameters.
-
-        >>> mxrange([3,5])
-        [(0, 0), (0, 1), (0, 2), (1, 0), (1, 1), (1, 2)]
-
-        >>> mxrange([[3,5,1],[9,0,-3]])
-        [(3, 9), (3, 6), (3, 3), (4, 9), (4, 6), (4, 3)]
-
-        """
-        if not len(lr):
-            yield ()
-        else:
-            # it can work with single numbers
-            index = lr[0]
-            if isinstance(index, int):
-                index = [index]
-            for a in range(*index):
-                for b in mxrange(lr[1:]):
-                    yield tuple([a] + list(b))
-
     def print_figure(fig, *args, **kwargs):
         canvas = FigureCanvasAgg(fig)
         canvas.print_figure(*args, **kwargs)
 
     sums = avgranks
 
-    tempsort = sorted([(a, i) for i, a in enumerate(sums)], reverse=reverse)
-    ssums = nth(tempsort, 0)
-    sortidx = nth(tempsort, 1)
+    ssums, sortidx = sort_ranks(sums, reverse)
     nnames = [names[x] for x in sortidx]
 
     if lowv is None:
@@ -205,8 +269,6 @@ def graph_ranks(
 
     k = len(sums)
 
-    lines = None
-
     linesblank = 0
     scalewidth = width - 2 * textspace
 
@@ -221,47 +283,8 @@ def graph_ranks(
 
     if posthoc_method is not None:
 
-        def get_lines(sums, posthoc_method=posthoc_method):
-            if posthoc_method == "cd":
-                hsd = compute_CD(avgranks, N, alpha=str(alpha), test="nemenyi")
-                # get all pairs
-                lsums = len(sums)
-                allpairs = [
-                    (i, j)
-                    for i, j in mxrange([[lsums], [lsums]])  # type: ignore
-                    if j > i
-                ]
-                # remove not significant
-                notSig = [(i, j) for i, j in allpairs if abs(sums[i] - sums[j]) <= hsd]
-
-            elif posthoc_method == "holm":
-                apv = adjusted_pvalues.holm(ssums, N, np.arange(k))
-                notSig = sorted([(i, j) for (p, (i, j)) in apv if p > alpha])
-
-            elif posthoc_method == "bergmann":
-                apv = adjusted_pvalues.bergmann_hommel(ssums, N, np.arange(k))
-                notSig = sorted([(i, j) for (p, (i, j)) in apv if p > alpha])
-
-            else:
-                raise ValueError(
-                    'Wrong posthoc method. Only Nemenyi ("cd"), Holm ("holm") and '
-                    'Bergmann-Hommel ("bergmann") posthoc methods are implemented'
-                )
-
-            # keep only longest
-            def no_longer(ij_tuple, notSig):
-                i, j = ij_tuple
-                for i1, j1 in notSig:
-                    if (i1 <= i and j1 > j) or (i1 < i and j1 >= j):
-                        return False
-                return True
-
-            # namesNotSig = [(names[i], names[j]) for (i, j) in notSig]
-            longest = [(i, j) for i, j in notSig if no_longer((i, j), notSig)]
-
-            return longest
-
-        lines = get_lines(ssums, posthoc_method)
+        if lines is None:
+            lines = nonsignificant_lines(ssums, N, posthoc_method, alpha)
         linesblank = 0.2 + 0.2 + (len(lines) - 1) * 0.1
 
         # add scale
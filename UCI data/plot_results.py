@@ -1,168 +1,215 @@
 from pathlib import Path
 
+import abalone
+import adjusted_pvalues
 import adult
 import australian_statlog
 import cover_type
+import credit_approval
 import german_statlog
 import kdd
 import liver_disorders
 import pandas as pd
 import plot_cd_diagram
+import results_store
 import thyroid_hypothyroid
 import thyroid_sick
-import tikzplotlib
 import util
+import worker_pool
 
 RESULT_SUMMARY_FILE = "data/result_summary.csv"
 PLOT_PATH = Path("plots/")
 PLOT_PATH.mkdir(exist_ok=True)
 
-
-def result_string(df_name, df):
-    (bic_result, clg_vl_result, hspbn_vl_result, hspbn_hckde_vl_result) = (
-        util.test_hc_models(df_name, df)
-    )
-
-    (bic_result, clg_vl_result, hspbn_vl_result, hspbn_hckde_vl_result) = (
-        util.common_instance_results(
-            bic_result, clg_vl_result, hspbn_vl_result, hspbn_hckde_vl_result
-        )
-    )
-
-    return (
-        df_name
-        + ","
-        + ",".join([str(ll.sum()) for ll in bic_result])
-        + ","
-        + ",".join([str(ll.sum()) for ll in clg_vl_result])
-        + ","
-        + ",".join([str(ll.sum()) for ll in hspbn_vl_result])
-        + ","
-        + ",".join([str(ll.sum()) for ll in hspbn_hckde_vl_result])
-    )
+DATASETS = {
+    "Abalone": abalone,
+    "Adult": adult,
+    "AustralianStatlog": australian_statlog,
+    "CoverType": cover_type,
+    "CreditApproval": credit_approval,
+    "GermanStatlog": german_statlog,
+    "KDDCup": kdd,
+    "LiverDisorders": liver_disorders,
+    "Thyroid-hypothyroid": thyroid_hypothyroid,
+    "Thyroid-sick": thyroid_sick,
+}
+POSTHOC_METHODS = {"cd": "CD", "holm": "Holm", "bergmann": "Bergmann"}
+DATASET_GROUPS = {
+    "small_datasets": [
+        "AustralianStatlog",
+        "CreditApproval",
+        "GermanStatlog",
+        "LiverDisorders",
+    ],
+    "large_datasets": [
+        "Abalone",
+        "Adult",
+        "CoverType",
+        "KDDCup",
+        "Thyroid-hypothyroid",
+        "Thyroid-sick",
+    ],
+}
+
+ALGORITHM_NAMES = {
+    "CLG_BIC_0": r"CLGBN-BIC $\lambda=0$",
+    "CLG_BIC_5": r"CLGBN-BIC $\lambda=5$",
+    "CLG_BIC_15": r"CLGBN-BIC $\lambda=15$",
+    "CLG_0": r"CLGBN-VL $\lambda=0$",
+    "CLG_5": r"CLGBN-VL $\lambda=5$",
+    "CLG_15": r"CLGBN-VL $\lambda=15$",
+    "HSPBN_0": r"HSPBN-CLG $\lambda=0$",
+    "HSPBN_5": r"HSPBN-CLG $\lambda=5$",
+    "HSPBN_15": r"HSPBN-CLG $\lambda=15$",
+    "HSPBN_HCKDE_0": r"HSPBN-HCKDE $\lambda=0$",
+    "HSPBN_HCKDE_5": r"HSPBN-HCKDE $\lambda=5$",
+    "HSPBN_HCKDE_15": r"HSPBN-HCKDE $\lambda=15$",
+}
 
 
 def save_summary_results():
-    string_file = (
-        "Dataset,"
-        + ",".join(["CLG_BIC_" + str(p) for p in util.PATIENCE])
-        + ","
-        + ",".join(["CLG_" + str(p) for p in util.PATIENCE])
-        + ","
-        + ",".join(["HSPBN_" + str(p) for p in util.PATIENCE])
-        + ","
-        + ",".join(["HSPBN_HCKDE_" + str(p) for p in util.PATIENCE])
-        + "\n"
-    )
-
-    abalone = pd.read_csv("data/Abalone/abalone.data")
-    abalone = util.preprocess_dataframe(abalone)
-    string_file += result_string("Abalone", abalone) + "\n"
-
-    adult_train = pd.read_csv("data/Adult/adult.data", na_values="?")
-    adult_test = pd.read_csv("data/Adult/adult.test", na_values="?")
-    adult_df = pd.concat([adult_train, adult_test], ignore_index=True)
-    adult_df = adult.preprocess_dataframe(adult_df)
-    string_file += result_string("Adult", adult_df) + "\n"
+    """
+    Saves the total log-likelihood of each dataset and configuration from the results
+    store. Only the datasets without all their results stored are evaluated again.
+    """
+    configurations = {(f, p) for f in util.MODEL_FAMILIES for p in util.PATIENCE}
+    for df_name, dataset in DATASETS.items():
+        if not configurations <= results_store.stored_configurations(df_name):
+            util.test_hc_models(df_name, dataset.load_dataframe())
+
+    results = results_store.load(list(DATASETS))
+    summary = results_store.summary_table(results, util.MODEL_FAMILIES, util.PATIENCE)
+    summary.to_csv(RESULT_SUMMARY_FILE)
+
+
+def cd_diagram_slices(df_algorithms):
+    """
+    Subsets of the results compared in the CD diagrams: all the results, each patience
+    value, each model family and each group of datasets.
+
+    Returns:
+    dict: Maps the plot folder of each slice (relative to PLOT_PATH) to its
+        pandas.DataFrame of results.
+    """
+    slices = {"": df_algorithms}
+
+    for p in util.PATIENCE:
+        slices["patience_" + str(p)] = df_algorithms[
+            [f + "_" + str(p) for f in util.MODEL_FAMILIES]
+        ]
+
+    for f in util.MODEL_FAMILIES:
+        slices[f] = df_algorithms[[f + "_" + str(p) for p in util.PATIENCE]]
+
+    for group, datasets in DATASET_GROUPS.items():
+        slices[group] = df_algorithms.loc[df_algorithms.index.intersection(datasets)]
+
+    return slices
+
+
+def cd_diagram_statistics(df_algorithms, rename_dict, alpha=0.05):
+    """
+    Computes the average ranks, the adjusted p-value matrices and the non-significance
+    lines of every post-hoc method for a slice of the results.
+    """
+    rank = df_algorithms.rank(axis=1, ascending=False)
+    avgranks = rank.mean().to_numpy()
+    names = [rename_dict[s] for s in rank.columns.values]
+    N = df_algorithms.shape[0]
+
+    ssums, sortidx = plot_cd_diagram.sort_ranks(avgranks)
+    sorted_names = [names[i] for i in sortidx]
+
+    pvalue_matrices = {}
+    lines = {}
+    for method in POSTHOC_METHODS:
+        if method != "cd":
+            pvalue_matrices[method] = pd.DataFrame(
+                plot_cd_diagram.adjusted_pvalue_matrix(ssums, N, method),
+                index=sorted_names,
+                columns=sorted_names,
+            )
+        lines[method] = plot_cd_diagram.nonsignificant_lines(
+            ssums,
+            N,
+            method,
+            alpha,
+            pvalue_matrix=(
+                pvalue_matrices[method].to_numpy() if method != "cd" else None
+            ),
+        )
 
-    australian = pd.read_csv("data/AustralianStatlog/australian.dat")
-    australian = australian_statlog.preprocess_dataframe(australian)
-    string_file += result_string("AustralianStatlog", australian) + "\n"
+    return avgranks, names, N, pvalue_matrices, lines
 
-    cover = pd.read_csv("data/Cover Type/covtype_truncated.csv")
-    cover = cover_type.preprocess_dataframe(cover)
-    string_file += result_string("CoverType", cover) + "\n"
 
-    credit_approval = pd.read_csv("data/Credit Approval/crx.data", na_values="?")
-    credit_approval = util.preprocess_dataframe(credit_approval)
-    string_file += result_string("CreditApproval", credit_approval) + "\n"
+def init_plot_worker():
+    import matplotlib
 
-    german = pd.read_csv("data/GermanStatlog/german.data")
-    german = german_statlog.preprocess_dataframe(german)
-    string_file += result_string("GermanStatlog", german) + "\n"
+    # Render without any GUI backend in the worker processes.
+    matplotlib.use("Agg")
 
-    kdd_cup = pd.read_csv("data/KDD Cup/kddcup_truncated.csv")
-    kdd_cup = kdd.preprocess_dataframe(kdd_cup)
-    string_file += result_string("KDDCup", kdd_cup) + "\n"
 
-    liver = pd.read_csv("data/Liver disorders/bupa.data")
-    liver = liver_disorders.preprocess_dataframe(liver)
-    string_file += result_string("LiverDisorders", liver) + "\n"
+def plot_slice_cd_diagrams(args):
+    import matplotlib.pyplot as plt
 
-    hypothyroid = pd.read_csv("data/Thyroid/hypothyroid.data", na_values="?")
-    hypothyroid = thyroid_hypothyroid.preprocess_dataframe(hypothyroid)
-    string_file += result_string("Thyroid-hypothyroid", hypothyroid) + "\n"
+    folder, df_slice, rename_dict, alpha = args
 
-    sick = pd.read_csv("data/Thyroid/sick.data", na_values="?")
-    sick = thyroid_sick.preprocess_dataframe(sick)
-    string_file += result_string("Thyroid-sick", sick)
+    avgranks, names, N, pvalue_matrices, lines = cd_diagram_statistics(
+        df_slice, rename_dict, alpha
+    )
 
-    with open(RESULT_SUMMARY_FILE, "w") as f:
-        f.write(string_file)
+    slice_path = PLOT_PATH / folder
+    slice_path.mkdir(exist_ok=True)
+    for method, matrix in pvalue_matrices.items():
+        matrix.to_csv(slice_path / (POSTHOC_METHODS[method] + "_pvalues.csv"))
+
+    for method, plot_name in POSTHOC_METHODS.items():
+        plot_cd_diagram.graph_ranks(
+            avgranks,
+            names,
+            N,
+            posthoc_method=method,
+            lines=lines[method],
+            filename=slice_path / (plot_name + ".png"),
+        )
+        plt.close("all")
 
+    return folder
 
-def plot_cd_diagrams(rename_dict):
 
+def plot_cd_diagrams(rename_dict, alpha=0.05):
+    """
+    Draws the CD diagrams of every slice of the results (see cd_diagram_slices) and
+    post-hoc method. The statistics of each slice are computed once and shared by all
+    its diagrams. The slices are processed in parallel.
+    """
     df_algorithms = pd.read_csv(RESULT_SUMMARY_FILE)
     df_algorithms = df_algorithms.set_index("Dataset")
 
-    rank = df_algorithms.rank(axis=1, ascending=False)
-    avgranks = rank.mean().to_numpy()
-    names = rank.columns.values
+    tasks = []
+    for folder, df_slice in cd_diagram_slices(df_algorithms).items():
+        # Friedman ranks need at least two datasets and two algorithms.
+        if df_slice.shape[0] < 2 or df_slice.shape[1] < 2:
+            print("Skipping CD diagrams of " + folder + ": not enough results")
+            continue
+        tasks.append((folder, df_slice, rename_dict, alpha))
 
-    names = [rename_dict[s] for s in names]
+    # Build the missing exhaustive set tables before starting the workers, so they are
+    # built once and every worker memory-maps the stored table.
+    for k in sorted({df_slice.shape[1] for (_, df_slice, _, _) in tasks}):
+        if k <= adjusted_pvalues.MAX_STORED_K:
+            adjusted_pvalues.exhaustive_set_masks(k)
 
-    plot_cd_diagram.graph_ranks(
-        avgranks,
-        names,
-        df_algorithms.shape[0],
-        posthoc_method="cd",
-        filename=PLOT_PATH / "CD.png",
-    )
-    # TODO: Debug why the tikzplotlib is not being saved
-    # tikzplotlib.save(
-    #     "plots/Nemenyi.tex", standalone=True, axis_width="14cm", axis_height="5cm"
-    # )
-
-    plot_cd_diagram.graph_ranks(
-        avgranks,
-        names,
-        df_algorithms.shape[0],
-        posthoc_method="holm",
-        filename=PLOT_PATH / "Holm.png",
-    )
-    # tikzplotlib.save(
-    #     "plots/Holm.tex", standalone=True, axis_width="14cm", axis_height="5cm"
-    # )
-    # TODO: Check why it takes so much time to run
-    # plot_cd_diagram.graph_ranks(
-    #     avgranks,
-    #     names,
-    #     df_algorithms.shape[0],
-    #     posthoc_method="bergmann",
-    #     filename=PLOT_PATH / "Bergmann.png",
-    # )
-    # tikzplotlib.save(
-    #     "plots/Bergmann.tex", standalone=True, axis_width="14cm", axis_height="5cm"
-    # )
+    ctx = worker_pool.context(util.START_METHOD)
+    with ctx.Pool(
+        max(1, min(util.PARALLEL_THREADS, len(tasks))), initializer=init_plot_worker
+    ) as p:
+        for _ in p.imap_unordered(plot_slice_cd_diagrams, tasks):
+            pass
 
 
 if __name__ == "__main__":
-    rename_dict = {
-        "CLG_BIC_0": r"CLGBN-BIC $\lambda=0$",
-        "CLG_BIC_5": r"CLGBN-BIC $\lambda=5$",
-        "CLG_BIC_15": r"CLGBN-BIC $\lambda=15$",
-        "CLG_0": r"CLGBN-VL $\lambda=0$",
-        "CLG_5": r"CLGBN-VL $\lambda=5$",
-        "CLG_15": r"CLGBN-VL $\lambda=15$",
-        "HSPBN_0": r"HSPBN-CLG $\lambda=0$",
-        "HSPBN_5": r"HSPBN-CLG $\lambda=5$",
-        "HSPBN_15": r"HSPBN-CLG $\lambda=15$",
-        "HSPBN_HCKDE_0": r"HSPBN-HCKDE $\lambda=0$",
-        "HSPBN_HCKDE_5": r"HSPBN-HCKDE $\lambda=5$",
-        "HSPBN_HCKDE_15": r"HSPBN-HCKDE $\lambda=15$",
-    }
     save_summary_results()
     print(f"Results saved in {RESULT_SUMMARY_FILE}")
-    plot_cd_diagrams(rename_dict)
+    plot_cd_diagrams(ALGORITHM_NAMES)
     print("CD diagrams saved in plots/")
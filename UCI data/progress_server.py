@@ -0,0 +1,384 @@
+import http.client
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Seconds of the window used to compute the recent throughput.
+THROUGHPUT_WINDOW = 900
+# Seconds between two refreshes of the terminal dashboard.
+WATCH_INTERVAL = 10
+
+
+class ProgressTracker:
+    """
+    Thread-safe state of the tasks of an experiment run: the tasks done, running and
+    pending of each (stage, dataset, family) group, the task each worker is running and
+    the time of the finished tasks.
+
+    The ETA uses a runtime model fitted on the finished tasks: the time of a task is
+    proportional to its cost (see run_experiments.task_cost), with a seconds-per-cost
+    ratio for each stage and family. The families of a stage without finished tasks use
+    the ratio of the whole stage.
+    """
+
+    def __init__(self, workers, cost=None):
+        self.lock = threading.Lock()
+        self.workers = workers
+        self.cost = cost if cost is not None else lambda key: 1.0
+        self.start_time = time.time()
+        self.tasks = {}
+        self.worker_tasks = {}
+        self.finish_times = []
+
+    def add(self, key):
+        with self.lock:
+            self.tasks[key] = {"state": "pending", "start": None, "elapsed": None}
+
+    def start(self, key, worker, start_time=None):
+        with self.lock:
+            task = self.tasks[key]
+            # The start message of a worker can arrive after the task finished.
+            if task["state"] != "pending":
+                return
+            task["state"] = "running"
+            task["start"] = start_time if start_time is not None else time.time()
+            task["worker"] = worker
+            self.worker_tasks[worker] = key
+
+    def finish(self, key, state, elapsed=None):
+        """
+        Marks a task as "done", "skipped" or "failed".
+        """
+        with self.lock:
+            task = self.tasks[key]
+            worker = task.get("worker")
+            if worker is not None and self.worker_tasks.get(worker) == key:
+                del self.worker_tasks[worker]
+            task["state"] = state
+            task["elapsed"] = elapsed
+            if state == "done":
+                self.finish_times.append(time.time())
+
+    def runtime_model(self):
+        """
+        Returns the seconds per cost unit of each (stage, family) and of each stage.
+        """
+        sums = {}
+        for key, task in self.tasks.items():
+            if task["state"] != "done" or task["elapsed"] is None:
+                continue
+            cost = self.cost(key)
+            if cost is None:
+                continue
+            for model_key in [(key[0], family(key)), key[0]]:
+                seconds, costs = sums.get(model_key, (0.0, 0.0))
+                sums[model_key] = (seconds + task["elapsed"], costs + cost)
+
+        return {k: seconds / costs for k, (seconds, costs) in sums.items() if costs > 0}
+
+    def predicted_time(self, key, model, mean_costs):
+        ratio = model.get((key[0], family(key)), model.get(key[0]))
+        if ratio is None:
+            return None
+
+        cost = self.cost(key)
+        if cost is None:
+            # The shape of the dataset is not known before it is preprocessed.
+            cost = mean_costs.get(key[0], 1.0)
+        return ratio * cost
+
+    def mean_costs(self):
+        """
+        Mean cost of the tasks of each stage with a known cost.
+        """
+        sums = {}
+        for key in self.tasks:
+            cost = self.cost(key)
+            if cost is not None:
+                total, count = sums.get(key[0], (0.0, 0))
+                sums[key[0]] = (total + cost, count + 1)
+        return {stage: total / count for stage, (total, count) in sums.items()}
+
+    def snapshot(self):
+        """
+        Returns the current progress as a JSON serializable dict.
+        """
+        with self.lock:
+            now = time.time()
+            model = self.runtime_model()
+            mean_costs = self.mean_costs()
+
+            groups = {}
+            remaining = 0.0
+            unknown = 0
+            for key, task in self.tasks.items():
+                group_key = (key[0], dataset(key), family(key))
+                group = groups.setdefault(
+                    group_key,
+                    {"pending": 0, "running": 0, "done": 0, "skipped": 0, "failed": 0},
+                )
+                group[task["state"]] += 1
+
+                if task["state"] in ("pending", "running"):
+                    predicted = self.predicted_time(key, model, mean_costs)
+                    if predicted is None:
+                        unknown += 1
+                    elif task["state"] == "running":
+                        remaining += max(0.0, predicted - (now - task["start"]))
+                    else:
+                        remaining += predicted
+
+            elapsed = now - self.start_time
+            recent = [t for t in self.finish_times if t > now - THROUGHPUT_WINDOW]
+            totals = {
+                state: sum(g[state] for g in groups.values())
+                for state in ["pending", "running", "done", "skipped", "failed"]
+            }
+
+            return {
+                "time": now,
+                "elapsed": elapsed,
+                "workers": self.workers,
+                "totals": totals,
+                "groups": [
+                    {"stage": s, "dataset": d, "family": f, **counts}
+                    for (s, d, f), counts in groups.items()
+                ],
+                "throughput": {
+                    "tasks_per_hour": len(self.finish_times) * 3600 / elapsed,
+                    "recent_tasks_per_hour": len(recent)
+                    * 3600
+                    / min(elapsed, THROUGHPUT_WINDOW),
+                },
+                "running": [
+                    {
+                        "worker": worker,
+                        "task": list(key),
+                        "running_for": now - self.tasks[key]["start"],
+                    }
+                    for worker, key in sorted(
+                        self.worker_tasks.items(), key=lambda w: str(w[0])
+                    )
+                ],
+                "eta": {
+                    "seconds": remaining / self.workers,
+                    # Tasks of stages without any finished task are not in the ETA.
+                    "unestimated_tasks": unknown,
+                    "finish_time": now + remaining / self.workers,
+                },
+            }
+
+
+def dataset(key):
+    return key[1] if len(key) > 1 else "-"
+
+
+def family(key):
+    return key[2] if len(key) > 2 else "-"
+
+
+def listen_worker_events(tracker, events):
+    """
+    Updates the tracker with the (pid, task key, start time) messages sent by the
+    workers when they start a task, until None is received.
+    """
+    while True:
+        event = events.get()
+        if event is None:
+            return
+        pid, key, start_time = event
+        tracker.start(tuple(key), pid, start_time)
+
+
+class ProgressHandler(BaseHTTPRequestHandler):
+    """
+    GET /status returns the progress as JSON, and GET / as a text table.
+    """
+
+    def do_GET(self):
+        status = self.server.tracker.snapshot()
+        if self.path == "/status":
+            body = json.dumps(status).encode()
+            content_type = "application/json"
+        elif self.path == "/":
+            body = text_report(status).encode()
+            content_type = "text/plain; charset=utf-8"
+        else:
+            self.send_error(404)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+        socketserver.UnixStreamServer.server_bind(self)
+
+    def server_close(self):
+        socketserver.UnixStreamServer.server_close(self)
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+
+
+def parse_address(address):
+    """
+    "unix:[path]" is a Unix socket, and "[host]:[port]" or "[port]" a TCP address.
+    """
+    if address.startswith("unix:"):
+        return address[len("unix:") :]
+    host, _, port = address.rpartition(":")
+    return (host or "127.0.0.1", int(port))
+
+
+def start_server(tracker, address):
+    """
+    Serves the progress of the tracker on a daemon thread. Returns the server, which is
+    stopped with server.shutdown().
+    """
+    address = parse_address(address)
+    if isinstance(address, str):
+        server = UnixHTTPServer(address, ProgressHandler)
+    else:
+        server = ThreadingHTTPServer(address, ProgressHandler)
+    server.tracker = tracker
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def format_seconds(seconds):
+    seconds = int(seconds)
+    return (
+        (str(seconds // 86400) + "d " if seconds >= 86400 else "")
+        + str(seconds // 3600 % 24).zfill(2)
+        + ":"
+        + str(seconds // 60 % 60).zfill(2)
+        + ":"
+        + str(seconds % 60).zfill(2)
+    )
+
+
+def text_report(status):
+    totals = status["totals"]
+    lines = [
+        "Elapsed "
+        + format_seconds(status["elapsed"])
+        + ", "
+        + str(totals["done"])
+        + " done, "
+        + str(totals["running"])
+        + " running, "
+        + str(totals["pending"])
+        + " pending, "
+        + str(totals["skipped"])
+        + " skipped, "
+        + str(totals["failed"])
+        + " failed",
+        "Throughput "
+        + "{:.1f}".format(status["throughput"]["tasks_per_hour"])
+        + " tasks/h ("
+        + "{:.1f}".format(status["throughput"]["recent_tasks_per_hour"])
+        + " tasks/h in the last "
+        + str(THROUGHPUT_WINDOW // 60)
+        + " min)",
+        "ETA "
+        + format_seconds(status["eta"]["seconds"])
+        + " ("
+        + time.strftime("%Y-%m-%d %H:%M", time.localtime(status["eta"]["finish_time"]))
+        + ")"
+        + (
+            ", " + str(status["eta"]["unestimated_tasks"]) + " tasks not estimated yet"
+            if status["eta"]["unestimated_tasks"] > 0
+            else ""
+        ),
+        "",
+    ]
+
+    lines.append(
+        "{:<11} {:<22} {:<12} {:>7} {:>7} {:>7} {:>7} {:>7}".format(
+            "stage", "dataset", "family", "done", "run", "pend", "skip", "fail"
+        )
+    )
+    for g in status["groups"]:
+        if g["pending"] == 0 and g["running"] == 0:
+            continue
+        lines.append(
+            "{:<11} {:<22} {:<12} {:>7} {:>7} {:>7} {:>7} {:>7}".format(
+                g["stage"],
+                g["dataset"],
+                g["family"],
+                g["done"],
+                g["running"],
+                g["pending"],
+                g["skipped"],
+                g["failed"],
+            )
+        )
+
+    lines.append("")
+    for r in status["running"]:
+        lines.append(
+            "worker "
+            + str(r["worker"])
+            + ": "
+            + " ".join(str(k) for k in r["task"])
+            + " ("
+            + format_seconds(r["running_for"])
+            + ")"
+        )
+    return "\n".join(lines)
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path):
+        http.client.HTTPConnection.__init__(self, "localhost")
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.path)
+
+
+def fetch_status(address):
+    address = parse_address(address)
+    if isinstance(address, str):
+        connection = UnixHTTPConnection(address)
+    else:
+        connection = http.client.HTTPConnection(*address)
+    try:
+        connection.request("GET", "/status")
+        return json.loads(connection.getresponse().read())
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    # python progress_server.py [address] [--watch]
+    # Prints the progress of a run_experiments.py started with PROGRESS_ADDRESS.
+    args = [a for a in sys.argv[1:] if a != "--watch"]
+    address = args[0] if args else os.environ.get("PROGRESS_ADDRESS", "")
+    if not address:
+        raise ValueError("Pass the address of the run, e.g. 127.0.0.1:8765")
+
+    while True:
+        report = text_report(fetch_status(address))
+        if "--watch" not in sys.argv:
+            print(report)
+            break
+        print("\033[2J\033[H" + report, flush=True)
+        time.sleep(WATCH_INTERVAL)
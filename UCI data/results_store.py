@@ -0,0 +1,126 @@
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import task_lease
+
+import pybnesian as pbn
+
+RESULTS_PATH = Path("data/results/")
+
+COLUMNS = ["dataset", "family", "patience", "fold", "instance", "logl"]
+
+
+def results_file(df_name, family, patience):
+    return RESULTS_PATH / df_name / (family + "_" + str(patience) + ".parquet")
+
+
+def append(df_name, family, patience, folds, instances, logl):
+    """
+    Stores the test log-likelihood of each instance for a model configuration. Each
+    configuration is stored in its own Parquet file, so storing a configuration only
+    replaces the previous results of that configuration.
+
+    Parameters:
+    df_name (str): The name of the dataset.
+    family (str): The model family (see util.MODEL_FAMILIES).
+    patience (int): The patience of the greedy hill-climbing.
+    folds (numpy.ndarray): The evaluation fold of each instance.
+    instances (numpy.ndarray): The row position of each instance in the dataset.
+    logl (numpy.ndarray): The test log-likelihood of each instance.
+    """
+    n = len(logl)
+    df = pd.DataFrame(
+        {
+            "dataset": pd.Categorical([df_name] * n),
+            "family": pd.Categorical([family] * n),
+            "patience": np.full(n, patience, dtype=np.int32),
+            "fold": np.asarray(folds, dtype=np.int32),
+            "instance": np.asarray(instances, dtype=np.int64),
+            "logl": np.asarray(logl, dtype=np.float64),
+            "pybnesian_version": pd.Categorical([pbn.__version__] * n),
+            "evaluated_at": pd.Timestamp(time.time(), unit="s"),
+        }
+    )
+
+    filename = results_file(df_name, family, patience)
+    filename.parent.mkdir(parents=True, exist_ok=True)
+    # Write to a temporary file first, so an interrupted run never leaves a broken file.
+    tmp_file = task_lease.temporary_file(filename)
+    df.to_parquet(tmp_file, index=False)
+    os.replace(tmp_file, filename)
+
+
+def stored_configurations(df_name):
+    """
+    Returns the set of (family, patience) configurations stored for a dataset.
+    """
+    configurations = set()
+    for filename in (RESULTS_PATH / df_name).glob("*.parquet"):
+        family, patience = filename.stem.rsplit("_", 1)
+        configurations.add((family, int(patience)))
+    return configurations
+
+
+def load(datasets=None, columns=COLUMNS):
+    """
+    Loads the stored results into a single long-format pandas.DataFrame with one row
+    per (dataset, family, patience, instance).
+
+    Parameters:
+    datasets (list of str, optional): Datasets to load. By default, all the stored
+        datasets are loaded.
+    columns (list of str): Columns to load.
+    """
+    if datasets is None:
+        files = sorted(RESULTS_PATH.glob("*/*.parquet"))
+    else:
+        files = [
+            f for d in datasets for f in sorted((RESULTS_PATH / d).glob("*.parquet"))
+        ]
+
+    if not files:
+        return pd.DataFrame(columns=columns)
+
+    df = pd.concat(
+        [pd.read_parquet(f, columns=columns) for f in files], ignore_index=True
+    )
+    for c in ["dataset", "family"]:
+        if c in df.columns:
+            df[c] = df[c].astype("category")
+    return df
+
+
+def common_instances(results):
+    """
+    Removes the instances with a NaN or infinite log-likelihood in any configuration
+    of their dataset, so all the configurations are compared on the same instances.
+    """
+    valid = pd.Series(np.isfinite(results["logl"].to_numpy()), index=results.index)
+    valid_instance = valid.groupby(
+        [results["dataset"], results["instance"]], observed=True
+    ).transform("all")
+    return results[valid_instance.to_numpy()]
+
+
+def summary(results, by=("dataset", "family", "patience")):
+    """
+    Total log-likelihood of the common valid instances, grouped by the `by` columns.
+    """
+    return common_instances(results).groupby(list(by), observed=True)["logl"].sum()
+
+
+def summary_table(results, families, patiences):
+    """
+    Returns the total log-likelihood of each dataset (rows) and configuration
+    (columns named [family]_[patience]), in the format of the result summary file.
+    """
+    totals = summary(results).unstack(["family", "patience"])
+    columns = [(f, p) for f in families for p in patiences]
+    table = totals.reindex(columns=pd.MultiIndex.from_tuples(columns))
+    table.columns = [f + "_" + str(p) for f, p in columns]
+    table.index = table.index.astype(str)
+    table.index.name = "Dataset"
+    return table
@@ -0,0 +1,738 @@
+import argparse
+import heapq
+import multiprocessing as mp
+import os
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+import dataset_cache
+import plot_results
+import progress_server
+import results_store
+import task_lease
+import task_profile
+import util
+import worker_pool
+
+STAGES = ["preprocess", "train", "test", "aggregate", "plot"]
+
+# Preprocessed datasets and evaluation folds loaded by each process.
+loaded_datasets = {}
+# Queue where each worker process announces the tasks it starts to the progress
+# endpoint, if it is enabled (see init_worker).
+progress_events = None
+
+
+def load_dataset(df_name):
+    if df_name not in loaded_datasets:
+        df = plot_results.DATASETS[df_name].load_dataframe()
+        loaded_datasets[df_name] = (df, util.evaluation_folds(df))
+    return loaded_datasets[df_name]
+
+
+def preprocess_task(df_name):
+    df, _ = load_dataset(df_name)
+    return df.shape
+
+
+def train_task(df_name, family, patience, idx_fold):
+    df, fold_indices = load_dataset(df_name)
+    util.train_fold(df_name, df, fold_indices, family, patience, idx_fold)
+
+
+def test_task(df_name, family, patience, idx_fold):
+    df, fold_indices = load_dataset(df_name)
+    return util.test_fold(df_name, df, fold_indices, family, patience, idx_fold)
+
+
+def test_configuration_task(df_name, family, patience):
+    df, fold_indices = load_dataset(df_name)
+    util.store_fold_results(
+        df_name,
+        family,
+        patience,
+        [
+            util.test_fold(df_name, df, fold_indices, family, patience, idx_fold)
+            for idx_fold in range(util.EVALUATION_FOLDS)
+        ],
+        fold_indices,
+    )
+
+
+def report_task():
+    plot_results.save_summary_results()
+    plot_results.plot_cd_diagrams(plot_results.ALGORITHM_NAMES)
+
+
+def timed_task(func, args):
+    start = time.time()
+    result = func(*args)
+    return time.time() - start, result
+
+
+def init_worker(created, events, budget, counter):
+    global progress_events
+    progress_events = events
+    worker_pool.init_worker(created, budget, counter)
+
+
+def worker_task(key, func, args, submitted):
+    """
+    Runs a task in a worker process. Returns its time, its result and its startup
+    statistics (see worker_pool.task_startup).
+    """
+    start = time.time()
+    if progress_events is not None:
+        progress_events.put((os.getpid(), key, start))
+
+    r_init_time = util.r_init_time
+    elapsed, result = timed_task(func, args)
+    startup = worker_pool.task_startup(submitted, start, util.r_init_time - r_init_time)
+    return elapsed, result, startup
+
+
+def end_lock(df_name, family, patience, idx_fold):
+    return util.model_folder(df_name, family, patience, idx_fold) + "/end.lock"
+
+
+def is_trained(df_name, family, patience, idx_fold):
+    return os.path.exists(end_lock(df_name, family, patience, idx_fold))
+
+
+def is_tested(df_name, family, patience):
+    """
+    A configuration is tested if its stored results are newer than all its models.
+    """
+    filename = results_store.results_file(df_name, family, patience)
+    if not filename.exists():
+        return False
+
+    results_time = os.path.getmtime(filename)
+    return all(
+        is_trained(df_name, family, patience, idx_fold)
+        and os.path.getmtime(end_lock(df_name, family, patience, idx_fold))
+        <= results_time
+        for idx_fold in range(util.EVALUATION_FOLDS)
+    )
+
+
+def is_plotted():
+    cd_file = plot_results.PLOT_PATH / "CD.png"
+    return (
+        cd_file.exists()
+        and os.path.exists(plot_results.RESULT_SUMMARY_FILE)
+        and os.path.getmtime(cd_file)
+        >= os.path.getmtime(plot_results.RESULT_SUMMARY_FILE)
+    )
+
+
+def is_reported(datasets):
+    """
+    The report is done if the summary is newer than all the stored results and the CD
+    diagrams are newer than the summary.
+    """
+    if not os.path.exists(plot_results.RESULT_SUMMARY_FILE):
+        return False
+
+    summary_time = os.path.getmtime(plot_results.RESULT_SUMMARY_FILE)
+    return is_plotted() and all(
+        os.path.getmtime(results_store.results_file(df_name, family, patience))
+        <= summary_time
+        for df_name in datasets
+        for family in util.MODEL_FAMILIES
+        for patience in util.PATIENCE
+    )
+
+
+def select_grid(families=None, patience=None, folds=None, stages=None):
+    """
+    Selects a subset of the experiments grid. The arguments left as None select all
+    the values.
+
+    Parameters:
+    families (list of str): The model families.
+    patience (list of int): The patience values.
+    folds (list of int): The evaluation folds.
+    stages (list of str): "train" and/or "test".
+
+    Returns:
+    dict: The selected values of each parameter.
+    """
+    return {
+        "families": families if families is not None else util.MODEL_FAMILIES,
+        "patience": patience if patience is not None else util.PATIENCE,
+        "folds": folds if folds is not None else list(range(util.EVALUATION_FOLDS)),
+        "stages": stages if stages is not None else ["train", "test"],
+    }
+
+
+def all_folds(grid):
+    return sorted(grid["folds"]) == list(range(util.EVALUATION_FOLDS))
+
+
+def is_full_grid(datasets, grid):
+    """
+    The summary and the plots compare all the datasets and configurations, so they
+    are only made when the whole grid is selected.
+    """
+    return (
+        set(datasets) == set(plot_results.DATASETS)
+        and set(grid["families"]) == set(util.MODEL_FAMILIES)
+        and set(grid["patience"]) == set(util.PATIENCE)
+        and all_folds(grid)
+        and "test" in grid["stages"]
+    )
+
+
+def experiment_tasks(datasets, fold_results, grid=None):
+    """
+    Builds the task graph of the experiments of the selected grid (see select_grid).
+    The results of a configuration are stored for all its folds together, so the test
+    stage is only run if all the folds are selected.
+
+    Returns:
+    dict: Maps each task key (its first element is the stage) to a dict with its
+        dependencies, the function and arguments to run it in a worker process
+        ("worker") or in the main process ("local"), and a function that returns
+        whether its work is already done.
+    """
+    if grid is None:
+        grid = select_grid()
+    configurations = [(f, p) for f in grid["families"] for p in grid["patience"]]
+    folds = grid["folds"]
+
+    stored = []
+
+    def store(df_name, family, patience):
+        stored.append((df_name, family, patience))
+        _, fold_indices = load_dataset(df_name)
+        util.store_fold_results(
+            df_name,
+            family,
+            patience,
+            [
+                fold_results[(df_name, family, patience, idx_fold)]
+                for idx_fold in range(util.EVALUATION_FOLDS)
+            ],
+            fold_indices,
+        )
+
+    tasks = {}
+    for df_name in datasets:
+        tasks[("preprocess", df_name)] = {
+            "deps": [],
+            "worker": (preprocess_task, (df_name,)),
+            "done": lambda df_name=df_name: dataset_cache.is_cached(df_name),
+        }
+
+        for family, patience in configurations:
+            for idx_fold in folds:
+                args = (df_name, family, patience, idx_fold)
+                if "train" in grid["stages"]:
+                    tasks[("train",) + args] = {
+                        "deps": [("preprocess", df_name)],
+                        "worker": (train_task, args),
+                        "done": lambda args=args: is_trained(*args),
+                    }
+                if "test" in grid["stages"] and all_folds(grid):
+                    tasks[("test",) + args] = {
+                        "deps": [
+                            (
+                                ("train",) + args
+                                if "train" in grid["stages"]
+                                else ("preprocess", df_name)
+                            )
+                        ],
+                        "worker": (test_task, args),
+                        "done": lambda args=args: is_tested(*args[:3]),
+                    }
+
+            if "test" not in grid["stages"] or not all_folds(grid):
+                continue
+
+            # The folds of a configuration are either all tested again or all
+            # skipped (see is_tested). The results are stored only in the first case.
+            args = (df_name, family, patience)
+            tasks[("aggregate",) + args] = {
+                "deps": [("test",) + args + (idx_fold,) for idx_fold in folds],
+                "local": (store, args),
+                "done": lambda args=args: not all(
+                    args + (idx_fold,) in fold_results for idx_fold in folds
+                ),
+            }
+
+    if is_full_grid(datasets, grid):
+        tasks[("aggregate", "summary")] = {
+            "deps": [k for k in tasks if k[0] == "aggregate"],
+            "local": (plot_results.save_summary_results, ()),
+            "done": lambda: not stored
+            and os.path.exists(plot_results.RESULT_SUMMARY_FILE),
+        }
+        tasks[("plot",)] = {
+            "deps": [("aggregate", "summary")],
+            "local": (
+                plot_results.plot_cd_diagrams,
+                (plot_results.ALGORITHM_NAMES,),
+            ),
+            "done": is_plotted,
+        }
+
+    return tasks
+
+
+def task_cost(key, shapes):
+    """
+    Relative cost of a task. The cost of training and testing a fold grows with the
+    rows, the squared columns of the dataset and the patience. Returns None if the
+    dataset is not preprocessed yet.
+    """
+    if key[0] in ("train", "test"):
+        if key[1] not in shapes:
+            return None
+        rows, columns = shapes[key[1]]
+        return rows * columns * columns * (1 + key[3])
+    return 1.0
+
+
+def task_priority(key, shapes):
+    """
+    Larger datasets and longer searches are started first, so they do not delay the
+    end of the run.
+    """
+    if key[0] in ("train", "test"):
+        # The dependents of a failed preprocessing have no cost.
+        return -(task_cost(key, shapes) or 0.0)
+    return 0
+
+
+def run_experiments(
+    datasets,
+    workers=util.PARALLEL_THREADS,
+    progress_address=util.PROGRESS_ADDRESS,
+    grid=None,
+):
+    """
+    Runs the preprocessing, training, testing, aggregation and plotting of the selected
+    grid (see select_grid) of all the datasets on a single pool of worker processes.
+    Each task starts as soon as its dependencies are finished, and the work already
+    done in previous runs is skipped. The workers are started with util.START_METHOD
+    and reused by all the tasks, with the thread budget of util.worker_budget. If
+    progress_address is set, the progress of the tasks is served on it (see
+    progress_server.py).
+
+    Returns:
+    dict: The wall time, the accumulated task time, the number of run, skipped and
+        failed tasks and the startup statistics of the worker tasks of each stage.
+    """
+    shapes = {}
+    fold_results = {}
+    tasks = experiment_tasks(datasets, fold_results, grid)
+
+    dependents = {key: [] for key in tasks}
+    remaining_deps = {}
+    for key, task in tasks.items():
+        remaining_deps[key] = len(task["deps"])
+        for dep in task["deps"]:
+            dependents[dep].append(key)
+
+    stats = {
+        stage: {
+            "start": None,
+            "end": None,
+            "task_time": 0.0,
+            "run": 0,
+            "skipped": 0,
+            "failed": 0,
+            "startup": [],
+        }
+        for stage in STAGES
+    }
+
+    ready = []
+    counter = 0
+
+    def push(key):
+        nonlocal counter
+        heapq.heappush(ready, (task_priority(key, shapes), counter, key))
+        counter += 1
+
+    for key in tasks:
+        if remaining_deps[key] == 0:
+            push(key)
+
+    tracker = progress_server.ProgressTracker(
+        workers, lambda key: task_cost(key, shapes)
+    )
+    for key in tasks:
+        tracker.add(key)
+
+    def finish(key, elapsed, result, failed=False):
+        stage = stats[key[0]]
+        if failed:
+            stage["failed"] += 1
+            tracker.finish(key, "failed")
+        elif elapsed is None:
+            stage["skipped"] += 1
+            tracker.finish(key, "skipped")
+        else:
+            stage["run"] += 1
+            stage["task_time"] += elapsed
+            stage["end"] = time.time()
+            tracker.finish(key, "done", elapsed)
+
+        if key[0] == "preprocess" and not failed:
+            # A skipped preprocessing was cached by a previous run.
+            shapes[key[1]] = (
+                result if elapsed is not None else dataset_cache.cached_shape(key[1])
+            )
+        elif key[0] == "test" and elapsed is not None and not failed:
+            fold_results[key[1:]] = result
+
+        for dependent in dependents[key]:
+            if failed:
+                tasks[dependent]["failed_dep"] = True
+            remaining_deps[dependent] -= 1
+            if remaining_deps[dependent] == 0:
+                push(dependent)
+
+    ctx = worker_pool.context(util.START_METHOD)
+    events = None
+    if progress_address:
+        server = progress_server.start_server(tracker, progress_address)
+        events = ctx.Queue()
+        threading.Thread(
+            target=progress_server.listen_worker_events,
+            args=(tracker, events),
+            daemon=True,
+        ).start()
+        print("Serving the progress on " + progress_address)
+
+    budget = util.worker_budget(workers)
+    budget.apply_environment()
+    print("Thread budget: " + budget.describe())
+
+    running = {}
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=ctx,
+        initializer=init_worker,
+        initargs=(time.time(), events, budget, ctx.Value("i", 0)),
+    ) as executor:
+        while ready or running:
+            while ready and len(running) < 2 * workers:
+                _, _, key = heapq.heappop(ready)
+                task = tasks[key]
+
+                if task.get("failed_dep", False):
+                    finish(key, None, None, failed=True)
+                    continue
+
+                if task["done"]():
+                    finish(key, None, None)
+                    continue
+
+                if stats[key[0]]["start"] is None:
+                    stats[key[0]]["start"] = time.time()
+
+                if "local" in task:
+                    func, args = task["local"]
+                    tracker.start(key, "main")
+                    try:
+                        elapsed, result = timed_task(func, args)
+                        finish(key, elapsed, result)
+                    except Exception:
+                        print("Task " + str(key) + " failed:")
+                        traceback.print_exc()
+                        finish(key, None, None, failed=True)
+                else:
+                    func, args = task["worker"]
+                    future = executor.submit(worker_task, key, func, args, time.time())
+                    running[future] = key
+
+            if not running:
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                key = running.pop(future)
+                try:
+                    elapsed, result, startup = future.result()
+                    stats[key[0]]["startup"].append(startup)
+                    finish(key, elapsed, result)
+                except Exception:
+                    print("Task " + str(key) + " failed:")
+                    traceback.print_exc()
+                    finish(key, None, None, failed=True)
+
+    if progress_address:
+        events.put(None)
+        server.shutdown()
+        server.server_close()
+
+    return stats
+
+
+def distributed_phases(datasets, grid=None):
+    """
+    Tasks of each stage of the distributed mode, as expected by task_lease.run_tasks.
+    A stage starts when all the tasks of the previous stage are finished by any worker.
+    Testing is done per configuration, because the results of all its folds are stored
+    together, so the test stage is only run if all the folds are selected.
+    """
+    if grid is None:
+        grid = select_grid()
+    configurations = [(f, p) for f in grid["families"] for p in grid["patience"]]
+
+    def name(*args):
+        return "-".join(str(a) for a in args)
+
+    phases = [
+        (
+            "preprocess",
+            [
+                (
+                    name("preprocess", df_name),
+                    preprocess_task,
+                    (df_name,),
+                    lambda df_name=df_name: dataset_cache.is_cached(df_name),
+                )
+                for df_name in datasets
+            ],
+        )
+    ]
+
+    if "train" in grid["stages"]:
+        phases.append(
+            (
+                "train",
+                [
+                    (
+                        name("train", *args),
+                        train_task,
+                        args,
+                        lambda args=args: is_trained(*args),
+                    )
+                    for df_name in datasets
+                    for family, patience in configurations
+                    for args in [
+                        (df_name, family, patience, idx_fold)
+                        for idx_fold in grid["folds"]
+                    ]
+                ],
+            )
+        )
+
+    if "test" in grid["stages"] and all_folds(grid):
+        phases.append(
+            (
+                "test",
+                [
+                    (
+                        name("test", *args),
+                        test_configuration_task,
+                        args,
+                        lambda args=args: is_tested(*args),
+                    )
+                    for df_name in datasets
+                    for args in [(df_name, f, p) for f, p in configurations]
+                ],
+            )
+        )
+
+    if is_full_grid(datasets, grid):
+        phases.append(
+            ("plot", [("report", report_task, (), lambda: is_reported(datasets))])
+        )
+
+    return phases
+
+
+def distributed_worker(datasets, lease_path, grid=None, budget=None, index=0):
+    if budget is not None:
+        budget.apply(index)
+
+    for stage, tasks in distributed_phases(datasets, grid):
+        start = time.time()
+        failed = task_lease.run_tasks(tasks, lease_path)
+        print(
+            task_lease.worker_id()
+            + " "
+            + stage
+            + ": wall time "
+            + "{:.1f}".format(time.time() - start)
+            + " s"
+        )
+
+        if failed:
+            print(
+                "Stopping after "
+                + str(len(failed))
+                + " failed "
+                + stage
+                + " tasks. Remove their .failed files in "
+                + str(lease_path)
+                + " to run them again."
+            )
+            return
+
+
+def run_distributed(
+    datasets, workers=util.PARALLEL_THREADS, lease_path=None, grid=None
+):
+    """
+    Runs the experiments with several worker processes that claim the tasks through
+    lease files in a shared directory (see task_lease). The same command can be run on
+    several nodes sharing the working directory: there is no coordinator, and the tasks
+    of a crashed worker are run again when its leases expire.
+    """
+    if lease_path is None:
+        lease_path = task_lease.LEASE_PATH
+
+    budget = util.worker_budget(workers)
+    budget.apply_environment()
+    print("Thread budget: " + budget.describe())
+
+    processes = [
+        worker_pool.context(util.START_METHOD).Process(
+            target=distributed_worker, args=(datasets, lease_path, grid, budget, index)
+        )
+        for index in range(workers)
+    ]
+    for p in processes:
+        p.start()
+    for p in processes:
+        p.join()
+
+
+def print_stage_times(stats):
+    for stage in STAGES:
+        s = stats[stage]
+        wall = s["end"] - s["start"] if s["start"] is not None else 0.0
+        print(
+            stage
+            + ": wall time "
+            + "{:.1f}".format(wall)
+            + " s, task time "
+            + "{:.1f}".format(s["task_time"])
+            + " s, "
+            + str(s["run"])
+            + " run, "
+            + str(s["skipped"])
+            + " skipped, "
+            + str(s["failed"])
+            + " failed"
+        )
+
+
+def print_worker_startup(stats):
+    for stage in STAGES:
+        if stats[stage]["startup"]:
+            print(stage + ": " + worker_pool.startup_report(stats[stage]["startup"]))
+
+
+def parse_range(value):
+    """
+    Parses a list of integers and ranges such as "0-4,7".
+    """
+    values = []
+    for part in value.split(","):
+        first, _, last = part.partition("-")
+        values.extend(range(int(first), int(last or first) + 1))
+    return values
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(
+        description="Runs the UCI experiments, or a subset of their grid."
+    )
+    parser.add_argument(
+        "datasets",
+        nargs="*",
+        metavar="dataset",
+        help="datasets to run (all of them by default): "
+        + ", ".join(plot_results.DATASETS),
+    )
+    parser.add_argument(
+        "--distributed",
+        action="store_true",
+        help="claim the tasks through lease files shared with other nodes",
+    )
+    parser.add_argument(
+        "--lease-path",
+        type=Path,
+        help="shared directory of the lease files of --distributed (default: "
+        + str(task_lease.LEASE_PATH)
+        + ")",
+    )
+    parser.add_argument("--families", nargs="+", choices=util.MODEL_FAMILIES)
+    parser.add_argument("--patience", nargs="+", type=int, metavar="P")
+    parser.add_argument("--folds", type=parse_range, help='e.g. "0-4,7"')
+    parser.add_argument("--stages", nargs="+", choices=["train", "test"])
+    parser.add_argument(
+        "--start-method",
+        choices=mp.get_all_start_methods(),
+        help="start method of the worker processes (default: "
+        + util.START_METHOD
+        + ")",
+    )
+    args = parser.parse_args(args)
+
+    for df_name in args.datasets:
+        if df_name not in plot_results.DATASETS:
+            parser.error(
+                "Unknown dataset "
+                + df_name
+                + ". Available datasets: "
+                + ", ".join(plot_results.DATASETS)
+            )
+    if args.lease_path is not None and not args.distributed:
+        parser.error("--lease-path requires --distributed")
+    for idx_fold in args.folds or []:
+        if idx_fold < 0 or idx_fold >= util.EVALUATION_FOLDS:
+            parser.error(
+                "Fold "
+                + str(idx_fold)
+                + " out of range [0, "
+                + str(util.EVALUATION_FOLDS - 1)
+                + "]"
+            )
+    if args.folds is not None and "test" in (args.stages or ["test"]):
+        if sorted(args.folds) != list(range(util.EVALUATION_FOLDS)):
+            parser.error(
+                "The test results are only stored for all the folds: use --folds "
+                "with --stages train"
+            )
+    return args
+
+
+if __name__ == "__main__":
+    # python run_experiments.py [dataset ...] [--distributed] [--lease-path leases/]
+    #                           [--families ...]
+    #                           [--patience ...] [--folds 0-4] [--stages train test]
+    args = parse_args()
+    if args.start_method is not None:
+        util.START_METHOD = args.start_method
+
+    datasets = args.datasets if args.datasets else list(plot_results.DATASETS)
+    grid = select_grid(args.families, args.patience, args.folds, args.stages)
+
+    if args.distributed:
+        run_distributed(datasets, lease_path=args.lease_path, grid=grid)
+        failed = False
+    else:
+        stats = run_experiments(datasets, grid=grid)
+        print_stage_times(stats)
+        print_worker_startup(stats)
+        failed = any(s["failed"] > 0 for s in stats.values())
+
+    if util.PROFILE_TASKS:
+        model_folders = {f: util.MODEL_FOLDERS[f] for f in grid["families"]}
+        for name in task_profile.family_reports(model_folders):
+            print("Task profile: " + str(task_profile.PROFILE_PATH / (name + ".txt")))
+
+    if failed:
+        sys.exit(1)
@@ -0,0 +1,230 @@
+import glob
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+import pybnesian as pbn
+
+PROFILE_FILE = "score_profile.json"
+# Upper edges (in seconds) of the latency histogram bins: 3 bins per decade, from 1 us
+# to 1000 s. The last bin also counts the slower calls.
+LATENCY_BINS = np.logspace(-6, 3, 28)
+
+
+class ScoreProfile:
+    """
+    Call counts, total time and latency histogram of the local scores, grouped by
+    (kind, node type, evidence size, outcome). kind is "score" for the local scores and
+    "validation" for the validation local scores of a pbn.ValidatedScore.
+    """
+
+    def __init__(self):
+        self.buckets = {}
+
+    def record(self, kind, node_type, evidence_size, outcome, elapsed):
+        key = (kind, node_type, evidence_size, outcome)
+        if key not in self.buckets:
+            self.buckets[key] = {
+                "calls": 0,
+                "total_time": 0.0,
+                "max_time": 0.0,
+                "histogram": [0] * len(LATENCY_BINS),
+            }
+
+        bucket = self.buckets[key]
+        bucket["calls"] += 1
+        bucket["total_time"] += elapsed
+        bucket["max_time"] = max(bucket["max_time"], elapsed)
+        idx = min(int(np.searchsorted(LATENCY_BINS, elapsed)), len(LATENCY_BINS) - 1)
+        bucket["histogram"][idx] += 1
+
+    def dump(self, filename):
+        with open(filename, "w") as f:
+            json.dump(
+                {
+                    "bins": LATENCY_BINS.tolist(),
+                    "buckets": [
+                        {
+                            "kind": kind,
+                            "node_type": node_type,
+                            "evidence_size": evidence_size,
+                            "outcome": outcome,
+                            **bucket,
+                        }
+                        for (
+                            kind,
+                            node_type,
+                            evidence_size,
+                            outcome,
+                        ), bucket in self.buckets.items()
+                    ],
+                },
+                f,
+            )
+
+
+def outcome(score, value):
+    """
+    Outcome of a local score. Scores that explain their results (see
+    util.CVLikelihoodCheckInvalid.last_outcome) report it. Otherwise, the outcome is
+    "finite" or "-inf".
+    """
+    last_outcome = getattr(score, "last_outcome", None)
+    if last_outcome is not None:
+        return last_outcome
+    return "finite" if np.isfinite(value) else "-inf"
+
+
+class InstrumentedScoreMixin:
+    """
+    Transparent proxy of a score that profiles every local score call.
+    """
+
+    def init_profile(self, score):
+        self.score = score
+        self.profile = ScoreProfile()
+
+    def timed(self, kind, variable_type, evidence, func, *args):
+        start = time.perf_counter()
+        value = func(*args)
+        elapsed = time.perf_counter() - start
+
+        if kind == "score":
+            value_outcome = outcome(self.score, value)
+        else:
+            value_outcome = "finite" if np.isfinite(value) else "-inf"
+
+        self.profile.record(
+            kind, str(variable_type), len(evidence), value_outcome, elapsed
+        )
+        return value
+
+    def has_variables(self, vars):
+        return self.score.has_variables(vars)
+
+    def compatible_bn(self, model):
+        return self.score.compatible_bn(model)
+
+    def local_score(self, model, variable, evidence):
+        return self.timed(
+            "score",
+            model.node_type(variable),
+            evidence,
+            self.score.local_score,
+            model,
+            variable,
+            evidence,
+        )
+
+    def local_score_node_type(self, model, variable_type, variable, evidence):
+        return self.timed(
+            "score",
+            variable_type,
+            evidence,
+            self.score.local_score_node_type,
+            model,
+            variable_type,
+            variable,
+            evidence,
+        )
+
+    def data(self):
+        return self.score.data()
+
+    def dump(self, filename):
+        self.profile.dump(filename)
+
+
+class InstrumentedScore(InstrumentedScoreMixin, pbn.Score):
+    def __init__(self, score):
+        pbn.Score.__init__(self)
+        self.init_profile(score)
+
+
+class InstrumentedValidatedScore(InstrumentedScoreMixin, pbn.ValidatedScore):
+    def __init__(self, score):
+        pbn.ValidatedScore.__init__(self)
+        self.init_profile(score)
+
+    def vlocal_score(self, model, variable, evidence):
+        return self.timed(
+            "validation",
+            model.node_type(variable),
+            evidence,
+            self.score.vlocal_score,
+            model,
+            variable,
+            evidence,
+        )
+
+    def vlocal_score_node_type(self, model, variable_type, variable, evidence):
+        return self.timed(
+            "validation",
+            variable_type,
+            evidence,
+            self.score.vlocal_score_node_type,
+            model,
+            variable_type,
+            variable,
+            evidence,
+        )
+
+
+def instrument(score):
+    """
+    Wraps a pbn.Score or pbn.ValidatedScore in a profiling proxy with the same results.
+    """
+    if isinstance(score, pbn.ValidatedScore):
+        return InstrumentedValidatedScore(score)
+    return InstrumentedScore(score)
+
+
+def load_profiles(pattern):
+    """
+    Merges the score profiles of all the files matching a glob pattern.
+
+    Returns:
+    pandas.DataFrame: One row per (kind, node type, evidence size, outcome) with the
+        calls, total time, mean time, maximum time and the median and 90th percentile
+        latency (upper edge of the histogram bin).
+    """
+    rows = []
+    for filename in glob.glob(pattern, recursive=True):
+        with open(filename, "r") as f:
+            rows.extend(json.load(f)["buckets"])
+
+    columns = ["kind", "node_type", "evidence_size", "outcome"]
+    if not rows:
+        return pd.DataFrame(columns=columns)
+
+    df = pd.DataFrame(rows)
+    histograms = df.groupby(columns)["histogram"].apply(
+        lambda h: np.sum(np.stack(h.to_numpy()), axis=0)
+    )
+    summary = df.groupby(columns).agg(
+        calls=("calls", "sum"),
+        total_time=("total_time", "sum"),
+        max_time=("max_time", "max"),
+    )
+    summary["mean_time"] = summary["total_time"] / summary["calls"]
+
+    cumulative = np.cumsum(np.stack(histograms.loc[summary.index].to_numpy()), axis=1)
+    for q in [0.5, 0.9]:
+        idx = (cumulative < q * cumulative[:, -1:]).sum(axis=1)
+        summary["p" + str(int(q * 100)) + "_time"] = LATENCY_BINS[idx]
+
+    return summary.sort_values("total_time", ascending=False)
+
+
+if __name__ == "__main__":
+    import util
+
+    for family, folder in util.MODEL_FOLDERS.items():
+        print(family)
+        print(
+            load_profiles(
+                "models/*/HillClimbing/" + folder + "*/*/" + PROFILE_FILE
+            ).to_string()
+        )
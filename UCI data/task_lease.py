@@ -0,0 +1,194 @@
+import json
+import os
+import socket
+import threading
+import time
+import traceback
+from pathlib import Path
+
+# Shared directory where the workers of all the nodes claim their tasks.
+LEASE_PATH = Path("leases/")
+# Seconds without a heartbeat after which a lease is considered abandoned.
+LEASE_TIMEOUT = 300
+HEARTBEAT_INTERVAL = 30
+# Seconds to wait before checking again the tasks leased by other workers.
+POLL_INTERVAL = 10
+
+
+def worker_id():
+    return socket.gethostname() + "-" + str(os.getpid())
+
+
+def temporary_file(filename):
+    """
+    Temporary file name unique to this process, so processes on several nodes sharing
+    the working directory never write to the same temporary file.
+    """
+    return str(filename) + "." + worker_id() + ".tmp"
+
+
+def filesystem_time(lease_path):
+    """
+    Current time of the shared filesystem. The lease ages are measured with the clock of
+    the file server, so the clocks of the nodes do not need to be synchronized.
+    """
+    clock_file = lease_path / (worker_id() + ".clock")
+    clock_file.touch()
+    return os.stat(clock_file).st_mtime
+
+
+class Lease:
+    """
+    Exclusive claim of a task by a worker. The lease is a file created atomically in
+    the lease directory, and a heartbeat thread keeps updating its modification time.
+    If the worker crashes, the lease expires after LEASE_TIMEOUT seconds and any other
+    worker can reclaim it.
+    """
+
+    def __init__(
+        self,
+        lease_path,
+        name,
+        timeout=LEASE_TIMEOUT,
+        heartbeat_interval=HEARTBEAT_INTERVAL,
+    ):
+        self.lease_path = lease_path
+        self.filename = lease_path / (name + ".lease")
+        self.timeout = timeout
+        self.heartbeat_interval = heartbeat_interval
+        self.stop = threading.Event()
+        self.thread = None
+        self.lost = False
+
+    def create(self):
+        try:
+            fd = os.open(self.filename, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+
+        with os.fdopen(fd, "w") as f:
+            json.dump({"worker": worker_id(), "acquired": time.time()}, f)
+        return True
+
+    def age(self, filename):
+        return filesystem_time(self.lease_path) - os.stat(filename).st_mtime
+
+    def reclaim(self):
+        """
+        Removes the lease file if it expired. Returns whether it was removed.
+        """
+        try:
+            if self.age(self.filename) <= self.timeout:
+                return False
+        except FileNotFoundError:
+            return True
+
+        # Renaming is atomic, so only one worker can reclaim an expired lease.
+        stale = Path(str(self.filename) + "." + worker_id() + ".stale")
+        try:
+            os.rename(self.filename, stale)
+        except FileNotFoundError:
+            return False
+
+        if self.age(stale) <= self.timeout:
+            # Another worker reclaimed and leased the task again in the meantime.
+            try:
+                os.link(stale, self.filename)
+            except FileExistsError:
+                pass
+            os.unlink(stale)
+            return False
+
+        os.unlink(stale)
+        return True
+
+    def acquire(self):
+        """
+        Tries to lease the task. Returns whether the lease was acquired.
+        """
+        if not self.create() and not (self.reclaim() and self.create()):
+            return False
+
+        self.thread = threading.Thread(target=self.heartbeat, daemon=True)
+        self.thread.start()
+        return True
+
+    def heartbeat(self):
+        while not self.stop.wait(self.heartbeat_interval):
+            try:
+                os.utime(self.filename)
+            except FileNotFoundError:
+                self.lost = True
+                print(
+                    "Lease "
+                    + str(self.filename)
+                    + " was reclaimed by another worker while running"
+                )
+                return
+
+    def release(self):
+        self.stop.set()
+        if self.thread is not None:
+            self.thread.join()
+        if not self.lost:
+            self.filename.unlink(missing_ok=True)
+
+
+def failed_file(lease_path, name):
+    return lease_path / (name + ".failed")
+
+
+def run_tasks(
+    tasks,
+    lease_path=LEASE_PATH,
+    timeout=LEASE_TIMEOUT,
+    heartbeat_interval=HEARTBEAT_INTERVAL,
+    poll_interval=POLL_INTERVAL,
+):
+    """
+    Runs the tasks that are not done yet, cooperating with the other workers that run
+    the same tasks on the same lease directory. Each task is run by only one worker at
+    a time. A task that raises an exception is marked as failed with a [name].failed
+    file containing the traceback, and it is not run again until that file is removed.
+
+    Parameters:
+    tasks (list of tuple): The (name, function, arguments, is_done) tuples of the tasks.
+        is_done is a function without arguments that returns whether the task is done.
+        It must return True after the task function finishes successfully.
+    lease_path (pathlib.Path): The shared lease directory.
+
+    Returns:
+    list of str: The names of the failed tasks. The function returns when every task is
+        done or failed, including the tasks run by other workers.
+    """
+    lease_path.mkdir(parents=True, exist_ok=True)
+
+    while True:
+        leased_by_others = False
+        for name, func, args, is_done in tasks:
+            if is_done() or failed_file(lease_path, name).exists():
+                continue
+
+            lease = Lease(lease_path, name, timeout, heartbeat_interval)
+            if not lease.acquire():
+                leased_by_others = True
+                continue
+
+            try:
+                # The task could have been finished by another worker before the lease.
+                if not is_done():
+                    func(*args)
+            except Exception:
+                print("Task " + name + " failed:")
+                traceback.print_exc()
+                with open(failed_file(lease_path, name), "w") as f:
+                    f.write(worker_id() + "\n" + traceback.format_exc())
+            finally:
+                lease.release()
+
+        if not leased_by_others:
+            break
+        time.sleep(poll_interval)
+
+    (lease_path / (worker_id() + ".clock")).unlink(missing_ok=True)
+    return [name for (name, _, _, _) in tasks if failed_file(lease_path, name).exists()]
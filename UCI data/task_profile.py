@@ -0,0 +1,39 @@
+import sys
+from pathlib import Path
+
+# Modules shared by the UCI and synthetic experiments.
+sys.path.append(str(Path(__file__).resolve().parents[1] / "common"))
+
+from profile_reports import PROFILE_PATH, merge_profiles, run_profiled, write_report
+
+
+def family_reports(model_folders, stages=("train", "test")):
+    """
+    Merges the task profiles of every fold of every dataset into a report per model
+    family and stage (see util.ProfiledTask).
+
+    Parameters:
+    model_folders (dict): Maps each model family to its folder inside HillClimbing/.
+    stages (tuple of str): The task stages to report.
+
+    Returns:
+    list of str: The names of the written reports.
+    """
+    names = []
+    for family, folder in model_folders.items():
+        for stage in stages:
+            stats = merge_profiles(
+                "models/*/HillClimbing/" + folder + "*/*/" + stage + ".prof"
+            )
+            if stats is None:
+                continue
+            write_report(stats, family + "_" + stage)
+            names.append(family + "_" + stage)
+    return names
+
+
+if __name__ == "__main__":
+    import util
+
+    for name in family_reports(util.MODEL_FOLDERS):
+        print("Written " + str(PROFILE_PATH / (name + ".txt")))
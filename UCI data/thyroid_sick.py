@@ -1,6 +1,9 @@
+import dataset_cache
 import pandas as pd
 import util
 
+RAW_FILES = ["data/Thyroid/sick.data"]
+
 
 def preprocess_dataframe(df):
     # TBG is completely null
@@ -50,9 +53,18 @@ def preprocess_dataframe(df):
     return df
 
 
+def read_dataframe():
+    return pd.read_csv("data/Thyroid/sick.data", na_values="?")
+
+
+def load_dataframe():
+    return dataset_cache.load(
+        "Thyroid-sick", RAW_FILES, read_dataframe, preprocess_dataframe
+    )
+
+
 if __name__ == "__main__":
-    df = pd.read_csv("data/Thyroid/sick.data", na_values="?")
-    df = preprocess_dataframe(df)
+    df = load_dataframe()
 
     util.train_hc_models("Thyroid-sick", df)
     (bic_result, clg_vl_result, hspbn_vl_result, hspbn_hckde_vl_result) = (
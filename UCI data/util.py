@@ -1,9 +1,21 @@
 import glob
-import multiprocessing as mp
 import os
+import sys
+import time
+from functools import lru_cache
 from pathlib import Path
 
+# Modules shared by the UCI and synthetic experiments.
+sys.path.append(str(Path(__file__).resolve().parents[1] / "common"))
+
 import numpy as np
+import pandas as pd
+import results_store
+import score_profile
+import scipy.linalg
+import task_profile
+import thread_budget
+import worker_pool
 from sklearn.model_selection import KFold
 
 import pybnesian as pbn
@@ -12,22 +24,61 @@ SEED = 0
 EVALUATION_FOLDS = 10
 PARALLEL_THREADS = 10
 PATIENCE = [0, 5, 15]
+MODEL_FAMILIES = ["CLG_BIC", "CLG", "HSPBN", "HSPBN_HCKDE"]
+# CPUs of each pool worker, used by the threads of the BLAS, OpenMP and R libraries
+# (see thread_budget.py). By default, the CPUs are split evenly among the workers.
+# Also set by WORKER_THREADS.
+WORKER_THREADS = int(os.environ.get("WORKER_THREADS", "0")) or None
+# Binds every pool worker to its own WORKER_THREADS CPUs. Also enabled by PIN_WORKERS=1.
+PIN_WORKERS = os.environ.get("PIN_WORKERS", "0") == "1"
+# Profiles every local score call of the structure learning and saves the profile of
+# each run in its model folder (see score_profile.py).
+PROFILE_SCORES = False
+# Runs every train and test pool task with cProfile, saving one profile per fold in its
+# model folder (see ProfiledTask and task_profile.py). Also enabled by PROFILE_TASKS=1.
+PROFILE_TASKS = os.environ.get("PROFILE_TASKS", "0") == "1"
+# Address where run_experiments.py serves its progress ("[host]:[port]" or
+# "unix:[path]", see progress_server.py). Disabled if empty. Also set by
+# PROGRESS_ADDRESS.
+PROGRESS_ADDRESS = os.environ.get("PROGRESS_ADDRESS", "")
+# Start method of the worker processes (see worker_pool.py). Also set by START_METHOD.
+START_METHOD = os.environ.get("START_METHOD", "forkserver")
+
+# R packages imported by this process, and seconds spent starting R and importing them.
+r_packages = {}
+r_init_time = 0.0
+
+
+def r_package(name):
+    """
+    Imports an R package with rpy2. R is started on the first call, so importing this
+    module does not start R, and each worker process starts its own R once, when it is
+    first needed.
+    """
+    global r_init_time
+    if name not in r_packages:
+        start = time.time()
+        from rpy2.robjects import numpy2ri
+        from rpy2.robjects.packages import importr
 
-import rpy2
-from rpy2.robjects import numpy2ri
-from rpy2.robjects.packages import importr
-
-numpy2ri.activate()
+        numpy2ri.activate()
+        r_packages[name] = importr(name)
+        r_init_time += time.time() - start
+    return r_packages[name]
 
 
 class PluginEstimator(pbn.BandwidthSelector):
 
     def __init__(self):
         pbn.BandwidthSelector.__init__(self)
-        self.ks = importr("ks")
-        # self.R = robjects.r
+
+    @property
+    def ks(self):
+        return r_package("ks")
 
     def bandwidth(self, df, variables):
+        from rpy2.rinterface_lib.embedded import RRuntimeError
+
         data = df.to_pandas().loc[:, variables].dropna().to_numpy()
 
         if data.shape[0] <= len(variables):
@@ -46,7 +97,7 @@ class PluginEstimator(pbn.BandwidthSelector):
                 return np.asarray([self.ks.hpi(data)])
             else:
                 return self.ks.Hpi(data)
-        except rpy2.rinterface_lib.embedded.RRuntimeError as rerror:
+        except RRuntimeError as rerror:
             if "scale estimate is zero for input data" in str(rerror):
                 raise pbn.SingularCovarianceData(
                     "[scalest 1d] The data covariance could not be estimated because the matrix is singular."
@@ -55,51 +106,176 @@ class PluginEstimator(pbn.BandwidthSelector):
                 raise rerror
 
 
-def remove_crossvalidated_nan(dataset, folds):
-    to_delete = set()
+@lru_cache(maxsize=None)
+def preprocessing_folds(num_rows, k):
+    """
+    Materializes the row positions of the inner CV training folds of each outer
+    evaluation fold, as used by pbn.ValidatedLikelihood(train_data, k=k, seed=SEED).
 
+    The HoldOut and CrossValidation splits only depend on the number of rows and the
+    seed, so they are computed over a single column of row positions instead of
+    building a scorer for each outer fold.
+
+    Returns:
+    list: For each outer fold, a list with the integer row positions (with respect to
+        the full dataset) of the training data of each inner fold.
+    """
+    folds = []
     # Outer for: Performance CV
-    for idx_fold, (train_indices, test_indices) in enumerate(
-        KFold(EVALUATION_FOLDS, shuffle=True, random_state=SEED).split(dataset)
-    ):
-        train_data = dataset.iloc[train_indices, :]
+    for train_indices, _ in KFold(
+        EVALUATION_FOLDS, shuffle=True, random_state=SEED
+    ).split(np.arange(num_rows)):
+        rows = pd.DataFrame({"row": np.arange(train_indices.shape[0], dtype="double")})
+        holdout = pbn.HoldOut(rows, 0.2, SEED)
+        holdout_rows = holdout.training_data().to_pandas()["row"].to_numpy(dtype=int)
+
         # Inner for: Validation CV
-        for k in folds:
-            vl = pbn.ValidatedLikelihood(train_data, k=k, seed=SEED)
-            for train_fold, _ in vl.cv_lik.cv:
-                train_fold_pandas = train_fold.to_pandas().select_dtypes("float64")
-                d = train_fold_pandas.columns[
-                    np.isclose(train_fold_pandas.var(), 0)
-                ].tolist()
-                to_delete.update(d)
+        cv = pbn.CrossValidation(holdout.training_data(), k, SEED)
+        folds.append(
+            [
+                train_indices[holdout_rows[np.asarray(train_fold, dtype=int)]]
+                for train_fold, _ in cv.indices()
+            ]
+        )
+
+    return folds
+
+
+def centered_fold_data(data, inner_folds):
+    """
+    Stacks the rows of every inner fold of data (a NumPy matrix), centered on the
+    mean of its fold. Returns the stacked matrix, the first row of each fold in it and
+    the number of rows of each fold.
+    """
+    sizes = np.asarray([f.shape[0] for f in inner_folds])
+    starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+
+    stacked = data[np.concatenate(inner_folds), :]
+    means = np.add.reduceat(stacked, starts, axis=0) / sizes[:, None]
+    stacked -= np.repeat(means, sizes, axis=0)
+
+    return stacked, starts, sizes
+
+
+def remove_crossvalidated_nan(dataset, folds):
+    to_delete = set()
+
+    continuous = dataset.select_dtypes("float64")
+    data = continuous.to_numpy(dtype="double")
+
+    for k in folds:
+        for inner_folds in preprocessing_folds(dataset.shape[0], k):
+            centered, starts, sizes = centered_fold_data(data, inner_folds)
+            variances = np.add.reduceat(centered**2, starts, axis=0) / (
+                sizes[:, None] - 1
+            )
+
+            constant = np.isclose(variances, 0).any(axis=0)
+            to_delete.update(continuous.columns[constant].tolist())
 
     return to_delete
 
 
-def linear_dependent_features(dataset):
+def dependent_columns_rank(cov):
+    """
+    Positions of the columns of cov whose removal does not change its rank, found by
+    removing each column in turn.
+    """
+    dependent = []
+    rank = np.linalg.matrix_rank(cov)
+
+    if rank < cov.shape[1]:
+
+        for i in range(cov.shape[1]):
+            others = [j for j in range(cov.shape[1]) if j != i]
+            new_rank = np.linalg.matrix_rank(cov[np.ix_(others, others)])
+
+            if rank == new_rank:
+                dependent.append(i)
+
+    return dependent
+
+
+def dependent_columns_qr(cov):
+    """
+    Positions of the columns of cov whose removal does not change its rank, found with
+    a single rank-revealing (pivoted) QR factorization.
+
+    A column is dependent if it has a non-negligible row in the null space basis of
+    cov: removing it leaves a near-null eigenvalue of about |N[c]|^2 * cov[c, c]. When
+    the factorization is too close to the np.linalg.matrix_rank tolerance to decide,
+    it falls back to dependent_columns_rank.
+    """
+    p = cov.shape[1]
+    if p == 0:
+        return []
+
+    r, piv = scipy.linalg.qr(cov, mode="r", pivoting=True)
+    diag = np.abs(np.diag(r))
+    tol = diag[0] * p * np.finfo(float).eps
+
+    if np.any((diag > 1e-1 * tol) & (diag < 1e3 * tol)):
+        return dependent_columns_rank(cov)
+
+    rank = int((diag > tol).sum())
+    if rank == p:
+        return []
+
+    null = np.empty((p, p - rank))
+    null[piv[:rank], :] = -scipy.linalg.solve_triangular(
+        r[:rank, :rank], r[:rank, rank:]
+    )
+    null[piv[rank:], :] = np.eye(p - rank)
+    null, _ = np.linalg.qr(null)
+
+    near_null = (null**2).sum(axis=1) * np.diag(cov) / tol
+    if np.any((near_null > 1e-8) & (near_null < 1e2)):
+        return dependent_columns_rank(cov)
+
+    return np.flatnonzero(near_null >= 1e2).tolist()
+
+
+def linear_dependent_features(dataset, method="qr"):
+    """
+    Finds the continuous columns that are linearly dependent in the training data of
+    some inner CV fold.
+
+    Parameters:
+    dataset (pandas.DataFrame): The dataset.
+    method (str, optional): "qr" to find the dependent columns of each fold with a
+        pivoted QR factorization or "rank" to remove each column in turn and compare
+        the rank of the covariance. Both return the same columns. Default is "qr".
+
+    Returns:
+    set: The names of the linearly dependent columns.
+    """
+    if method == "qr":
+        dependent_columns = dependent_columns_qr
+    elif method == "rank":
+        dependent_columns = dependent_columns_rank
+    else:
+        raise ValueError(
+            'Wrong linear dependence method. Possible options are: "qr" and "rank".'
+        )
+
     to_delete = set()
 
-    # Outer for: Performance CV
-    for idx_fold, (train_indices, test_indices) in enumerate(
-        KFold(EVALUATION_FOLDS, shuffle=True, random_state=SEED).split(dataset)
-    ):
-        train_data = dataset.iloc[train_indices, :]
-        # Inner for: Validation CV
-        vl = pbn.ValidatedLikelihood(train_data, seed=SEED)
-        for train_fold, _ in vl.cv_lik.cv:
-            train_fold_pandas = train_fold.to_pandas().select_dtypes("float64")
-            train_fold_pandas = train_fold_pandas.drop(to_delete, axis=1)
+    continuous = dataset.select_dtypes("float64")
+    columns = continuous.columns.tolist()
+    data = continuous.to_numpy(dtype="double")
 
-            rank = np.linalg.matrix_rank(train_fold_pandas.cov())
+    for inner_folds in preprocessing_folds(dataset.shape[0], 10):
+        centered, starts, sizes = centered_fold_data(data, inner_folds)
 
-            if rank < train_fold_pandas.shape[1]:
+        for start, size in zip(starts, sizes):
+            fold = centered[start : start + size, :]
+            cov = fold.T @ fold / (size - 1)
 
-                for c in train_fold_pandas:
-                    new_df = train_fold_pandas.drop(c, axis=1)
-                    new_rank = np.linalg.matrix_rank(new_df.cov())
+            keep = [i for i, c in enumerate(columns) if c not in to_delete]
+            cov = cov[np.ix_(keep, keep)]
 
-                    if rank == new_rank:
-                        to_delete.add(c)
+            for i in dependent_columns(cov):
+                to_delete.add(columns[keep[i]])
 
     return to_delete
 
@@ -131,7 +307,13 @@ def preprocess_dataframe(df):
 class CVLikelihoodCheckInvalid(pbn.Score):
 
     def __init__(
-        self, df, test_df, invalid_limit=0.05, k=10, seed=0, arguments=pbn.Arguments()
+        self,
+        df,
+        test_df,
+        invalid_limit=0.05,
+        k=10,
+        seed=0,
+        arguments=pbn.Arguments(),
     ):
         pbn.Score.__init__(self)
 
@@ -141,6 +323,10 @@ class CVLikelihoodCheckInvalid(pbn.Score):
         self.test_df = test_df
         self.invalid_limit = invalid_limit
 
+        # How the last local score was obtained: "finite", "nan" or "invalid_limit"
+        # (-inf scores).
+        self.last_outcome = None
+
     def has_variables(self, vars):
         return all([v in self.test_df.columns for v in vars])
 
@@ -165,14 +351,17 @@ class CVLikelihoodCheckInvalid(pbn.Score):
             cpd.fit(train_df)
             loglik += cpd.slogl(validation_df)
             if np.isnan(loglik):
+                self.last_outcome = "nan"
                 return -np.inf
 
             test_ll = cpd.logl(self.test_df)
             test_invalid_total += np.isnan(test_ll).sum()
 
             if test_invalid_total > test_invalid_threshold:
+                self.last_outcome = "invalid_limit"
                 return -np.inf
 
+        self.last_outcome = "finite"
         return loglik
 
     def data(self):
@@ -210,6 +399,10 @@ class ValidatedLikelihoodCheckInvalid(pbn.ValidatedScore):
     def local_score_node_type(self, model, variable_type, variable, evidence):
         return self.cv.local_score_node_type(model, variable_type, variable, evidence)
 
+    @property
+    def last_outcome(self):
+        return self.cv.last_outcome
+
     def vlocal_score(self, model, variable, evidence):
         return self.holdout.local_score(model, variable, evidence)
 
@@ -222,28 +415,99 @@ class ValidatedLikelihoodCheckInvalid(pbn.ValidatedScore):
         return self.cv.data()
 
 
-def train_hc_clg_bic(df_name, train_df, patience, idx_fold):
-    fold_folder = (
+MODEL_FOLDERS = {
+    "CLG_BIC": "CLG/BIC_",
+    "CLG": "CLG/ValidationLikelihood_",
+    "HSPBN": "HSPBN/ValidationLikelihood_",
+    "HSPBN_HCKDE": "HSPBN_HCKDE/ValidationLikelihood_",
+}
+
+
+def model_folder(df_name, family, patience, idx_fold):
+    return (
         "models/"
         + df_name
-        + "/HillClimbing/CLG/BIC_"
+        + "/HillClimbing/"
+        + MODEL_FOLDERS[family]
         + str(patience)
         + "/"
         + str(idx_fold)
     )
+
+
+def evaluation_folds(df):
+    """
+    Returns the (train, test) row positions of the outer cross-validation folds.
+    """
+    return list(KFold(EVALUATION_FOLDS, shuffle=True, random_state=SEED).split(df))
+
+
+class ProfiledTask:
+    """
+    Pool task that runs a train_hc_* or test_hc_* function of a model family. If
+    PROFILE_TASKS is set, the function runs with cProfile and the profile is saved as
+    [stage].prof in the model folder of the fold. A training already finished (with an
+    end.lock file) is not profiled, so its profile is kept.
+
+    The functions take the dataset name as first argument and the patience and the fold
+    as last arguments.
+    """
+
+    def __init__(self, func, stage, family):
+        self.func = func
+        self.stage = stage
+        self.family = family
+
+    def __call__(self, df_name, *args):
+        if not PROFILE_TASKS:
+            return self.func(df_name, *args)
+
+        patience, idx_fold = args[-2:]
+        fold_folder = model_folder(df_name, self.family, patience, idx_fold)
+        if self.stage == "train" and os.path.exists(fold_folder + "/end.lock"):
+            return self.func(df_name, *args)
+
+        Path(fold_folder).mkdir(parents=True, exist_ok=True)
+        return task_profile.run_profiled(
+            fold_folder + "/" + self.stage + ".prof", self.func, df_name, *args
+        )
+
+
+def hill_climbing(operators, score, start_model, patience, fold_folder):
+    """
+    Greedy hill-climbing of the train_hc_* functions, saving every iteration in
+    fold_folder. With PROFILE_SCORES, the local scores are profiled and the profile is
+    saved in fold_folder.
+
+    Returns:
+    pybnesian.BayesianNetworkBase: The learned model.
+    """
+    instrumented = score_profile.instrument(score) if PROFILE_SCORES else score
+    bn = pbn.GreedyHillClimbing().estimate(
+        operators,
+        instrumented,
+        start_model,
+        patience=patience,
+        callback=pbn.SaveModel(fold_folder),
+    )
+    if PROFILE_SCORES:
+        instrumented.dump(fold_folder + "/" + score_profile.PROFILE_FILE)
+    return bn
+
+
+def train_hc_clg_bic(df_name, train_df, patience, idx_fold):
+    fold_folder = model_folder(df_name, "CLG_BIC", patience, idx_fold)
     Path(fold_folder).mkdir(parents=True, exist_ok=True)
 
     if os.path.exists(fold_folder + "/end.lock"):
         return
 
-    hc = pbn.GreedyHillClimbing()
     bic = pbn.BIC(train_df)
     arc_set = pbn.ArcOperatorSet()
 
-    cb_save = pbn.SaveModel(fold_folder)
     start_model = pbn.CLGNetwork(list(train_df.columns.values))
 
-    bn = hc.estimate(arc_set, bic, start_model, patience=patience, callback=cb_save)
+    bn = hill_climbing(arc_set, bic, start_model, patience, fold_folder)
     iters = sorted(glob.glob(fold_folder + "/*.pickle"))
     last_file = os.path.basename(iters[-1])
     number = int(os.path.splitext(last_file)[0])
@@ -254,28 +518,19 @@ def train_hc_clg_bic(df_name, train_df, patience, idx_fold):
 
 
 def train_hc_clg_vl(df_name, train_df, test_df, patience, idx_fold):
-    fold_folder = (
-        "models/"
-        + df_name
-        + "/HillClimbing/CLG/ValidationLikelihood_"
-        + str(patience)
-        + "/"
-        + str(idx_fold)
-    )
+    fold_folder = model_folder(df_name, "CLG", patience, idx_fold)
     Path(fold_folder).mkdir(parents=True, exist_ok=True)
 
     if os.path.exists(fold_folder + "/end.lock"):
         return
 
-    hc = pbn.GreedyHillClimbing()
     # vl = pbn.ValidatedLikelihood(train_df, seed=SEED)
     vl = ValidatedLikelihoodCheckInvalid(train_df, test_df, seed=SEED)
     arc_set = pbn.ArcOperatorSet()
 
-    cb_save = pbn.SaveModel(fold_folder)
     start_model = pbn.CLGNetwork(list(train_df.columns.values))
 
-    bn = hc.estimate(arc_set, vl, start_model, patience=patience, callback=cb_save)
+    bn = hill_climbing(arc_set, vl, start_model, patience, fold_folder)
     iters = sorted(glob.glob(fold_folder + "/*.pickle"))
     last_file = os.path.basename(iters[-1])
     number = int(os.path.splitext(last_file)[0])
@@ -286,28 +541,19 @@ def train_hc_clg_vl(df_name, train_df, test_df, patience, idx_fold):
 
 
 def train_hc_hspbn_clg(df_name, train_df, test_df, patience, idx_fold):
-    fold_folder = (
-        "models/"
-        + df_name
-        + "/HillClimbing/HSPBN/ValidationLikelihood_"
-        + str(patience)
-        + "/"
-        + str(idx_fold)
-    )
+    fold_folder = model_folder(df_name, "HSPBN", patience, idx_fold)
     Path(fold_folder).mkdir(parents=True, exist_ok=True)
 
     if os.path.exists(fold_folder + "/end.lock"):
         return
 
-    hc = pbn.GreedyHillClimbing()
     # vl = pbn.ValidatedLikelihood(train_df, seed=SEED)
     vl = ValidatedLikelihoodCheckInvalid(train_df, test_df, seed=SEED)
     pool = pbn.OperatorPool([pbn.ArcOperatorSet(), pbn.ChangeNodeTypeSet()])
 
-    cb_save = pbn.SaveModel(fold_folder)
     start_model = pbn.SemiparametricBN(list(train_df.columns.values))
 
-    bn = hc.estimate(pool, vl, start_model, patience=patience, callback=cb_save)
+    bn = hill_climbing(pool, vl, start_model, patience, fold_folder)
     iters = sorted(glob.glob(fold_folder + "/*.pickle"))
     last_file = os.path.basename(iters[-1])
     number = int(os.path.splitext(last_file)[0])
@@ -318,25 +564,16 @@ def train_hc_hspbn_clg(df_name, train_df, test_df, patience, idx_fold):
 
 
 def train_hc_hspbn_hckde(df_name, train_df, test_df, patience, idx_fold):
-    fold_folder = (
-        "models/"
-        + df_name
-        + "/HillClimbing/HSPBN_HCKDE/ValidationLikelihood_"
-        + str(patience)
-        + "/"
-        + str(idx_fold)
-    )
+    fold_folder = model_folder(df_name, "HSPBN_HCKDE", patience, idx_fold)
     Path(fold_folder).mkdir(parents=True, exist_ok=True)
 
     if os.path.exists(fold_folder + "/end.lock"):
         return
 
-    hc = pbn.GreedyHillClimbing()
     # vl = pbn.ValidatedLikelihood(train_df, seed=SEED)
     vl = ValidatedLikelihoodCheckInvalid(train_df, test_df, seed=SEED)
     pool = pbn.OperatorPool([pbn.ArcOperatorSet(), pbn.ChangeNodeTypeSet()])
 
-    cb_save = pbn.SaveModel(fold_folder)
     node_types = [
         (name, pbn.CKDEType())
         for name in train_df.select_dtypes("double").columns.values
@@ -347,8 +584,7 @@ def train_hc_hspbn_hckde(df_name, train_df, test_df, patience, idx_fold):
 
     start_model = pbn.SemiparametricBN(list(train_df.columns.values), node_types)
 
-    bn = hc.estimate(pool, vl, start_model, patience=patience, callback=cb_save)
-
+    bn = hill_climbing(pool, vl, start_model, patience, fold_folder)
     iters = sorted(glob.glob(fold_folder + "/*.pickle"))
     last_file = os.path.basename(iters[-1])
     number = int(os.path.splitext(last_file)[0])
@@ -358,86 +594,67 @@ def train_hc_hspbn_hckde(df_name, train_df, test_df, patience, idx_fold):
         pass
 
 
-def train_hc_models(df_name, df):
-    chunks = int(np.ceil(EVALUATION_FOLDS / PARALLEL_THREADS))
+TRAIN_FUNCTIONS = {
+    "CLG_BIC": train_hc_clg_bic,
+    "CLG": train_hc_clg_vl,
+    "HSPBN": train_hc_hspbn_clg,
+    "HSPBN_HCKDE": train_hc_hspbn_hckde,
+}
+
+
+def train_fold(df_name, df, fold_indices, family, patience, idx_fold):
+    train_indices, test_indices = fold_indices[idx_fold]
+    train = ProfiledTask(TRAIN_FUNCTIONS[family], "train", family)
+    if family == "CLG_BIC":
+        train(df_name, df.iloc[train_indices, :], patience, idx_fold)
+    else:
+        train(
+            df_name,
+            df.iloc[train_indices, :],
+            df.iloc[test_indices, :],
+            patience,
+            idx_fold,
+        )
 
-    fold_indices = list(
-        KFold(EVALUATION_FOLDS, shuffle=True, random_state=SEED).split(df)
-    )
 
-    for patience in PATIENCE:
-        for ch in range(chunks):
-            num_threads = int(
-                np.minimum(PARALLEL_THREADS, EVALUATION_FOLDS - PARALLEL_THREADS * ch)
-            )
-            with mp.Pool(processes=num_threads) as p:
-                p.starmap(
-                    train_hc_clg_bic,
-                    [
-                        (
-                            df_name,
-                            df.iloc[fold_indices[idx_fold][0], :],
-                            patience,
-                            idx_fold,
-                        )
-                        for idx_fold in range(
-                            ch * PARALLEL_THREADS, ch * PARALLEL_THREADS + num_threads
-                        )
-                    ],
-                )
+def worker_budget(workers):
+    """
+    Thread budget of a pool of worker processes (see thread_budget.ThreadBudget).
+    """
+    return thread_budget.ThreadBudget(workers, WORKER_THREADS, pin=PIN_WORKERS)
 
-    for patience in PATIENCE:
-        for ch in range(chunks):
-            num_threads = int(
-                np.minimum(PARALLEL_THREADS, EVALUATION_FOLDS - PARALLEL_THREADS * ch)
-            )
-            with mp.Pool(processes=num_threads) as p:
-                p.starmap(
-                    train_hc_clg_vl,
-                    [
-                        (
-                            df_name,
-                            df.iloc[fold_indices[idx_fold][0], :],
-                            df.iloc[fold_indices[idx_fold][1], :],
-                            patience,
-                            idx_fold,
-                        )
-                        for idx_fold in range(
-                            ch * PARALLEL_THREADS, ch * PARALLEL_THREADS + num_threads
-                        )
-                    ],
-                )
 
-    for patience in PATIENCE:
-        for ch in range(chunks):
-            num_threads = int(
-                np.minimum(PARALLEL_THREADS, EVALUATION_FOLDS - PARALLEL_THREADS * ch)
+def train_hc_models(df_name, df):
+    fold_indices = evaluation_folds(df)
+    folds = range(EVALUATION_FOLDS)
+
+    # A single pool trains all the model families, so its workers are reused.
+    ctx = worker_pool.context(START_METHOD)
+    processes = min(PARALLEL_THREADS, EVALUATION_FOLDS)
+    budget = worker_budget(processes)
+    budget.apply_environment()
+    with ctx.Pool(
+        processes=processes,
+        initializer=worker_pool.init_worker,
+        initargs=(time.time(), budget, ctx.Value("i", 0)),
+    ) as p:
+        for patience in PATIENCE:
+            p.starmap(
+                ProfiledTask(train_hc_clg_bic, "train", "CLG_BIC"),
+                [
+                    (df_name, df.iloc[fold_indices[idx_fold][0], :], patience, idx_fold)
+                    for idx_fold in folds
+                ],
             )
-            with mp.Pool(processes=num_threads) as p:
-                p.starmap(
-                    train_hc_hspbn_clg,
-                    [
-                        (
-                            df_name,
-                            df.iloc[fold_indices[idx_fold][0], :],
-                            df.iloc[fold_indices[idx_fold][1], :],
-                            patience,
-                            idx_fold,
-                        )
-                        for idx_fold in range(
-                            ch * PARALLEL_THREADS, ch * PARALLEL_THREADS + num_threads
-                        )
-                    ],
-                )
 
-    for patience in PATIENCE:
-        for ch in range(chunks):
-            num_threads = int(
-                np.minimum(PARALLEL_THREADS, EVALUATION_FOLDS - PARALLEL_THREADS * ch)
-            )
-            with mp.Pool(processes=num_threads) as p:
+        for family, func in [
+            ("CLG", train_hc_clg_vl),
+            ("HSPBN", train_hc_hspbn_clg),
+            ("HSPBN_HCKDE", train_hc_hspbn_hckde),
+        ]:
+            for patience in PATIENCE:
                 p.starmap(
-                    train_hc_hspbn_hckde,
+                    ProfiledTask(func, "train", family),
                     [
                         (
                             df_name,
@@ -446,22 +663,13 @@ def train_hc_models(df_name, df):
                             patience,
                             idx_fold,
                         )
-                        for idx_fold in range(
-                            ch * PARALLEL_THREADS, ch * PARALLEL_THREADS + num_threads
-                        )
+                        for idx_fold in folds
                     ],
                 )
 
 
 def test_hc_clg_bic(df_name, train_df, test_df, patience, idx_fold):
-    fold_folder = (
-        "models/"
-        + df_name
-        + "/HillClimbing/CLG/BIC_"
-        + str(patience)
-        + "/"
-        + str(idx_fold)
-    )
+    fold_folder = model_folder(df_name, "CLG_BIC", patience, idx_fold)
     all_models = sorted(glob.glob(fold_folder + "/*.pickle"))
     final_model = pbn.load(all_models[-1])
 
@@ -470,14 +678,7 @@ def test_hc_clg_bic(df_name, train_df, test_df, patience, idx_fold):
 
 
 def test_hc_clg_vl(df_name, train_df, test_df, patience, idx_fold):
-    fold_folder = (
-        "models/"
-        + df_name
-        + "/HillClimbing/CLG/ValidationLikelihood_"
-        + str(patience)
-        + "/"
-        + str(idx_fold)
-    )
+    fold_folder = model_folder(df_name, "CLG", patience, idx_fold)
     all_models = sorted(glob.glob(fold_folder + "/*.pickle"))
     final_model = pbn.load(all_models[-1])
 
@@ -486,14 +687,7 @@ def test_hc_clg_vl(df_name, train_df, test_df, patience, idx_fold):
 
 
 def test_hc_hspbn_clg(df_name, train_df, test_df, patience, idx_fold):
-    fold_folder = (
-        "models/"
-        + df_name
-        + "/HillClimbing/HSPBN/ValidationLikelihood_"
-        + str(patience)
-        + "/"
-        + str(idx_fold)
-    )
+    fold_folder = model_folder(df_name, "HSPBN", patience, idx_fold)
     all_models = sorted(glob.glob(fold_folder + "/*.pickle"))
     final_model = pbn.load(all_models[-1])
 
@@ -504,14 +698,7 @@ def test_hc_hspbn_clg(df_name, train_df, test_df, patience, idx_fold):
 
 
 def test_hc_hspbn_hckde(df_name, train_df, test_df, patience, idx_fold):
-    fold_folder = (
-        "models/"
-        + df_name
-        + "/HillClimbing/HSPBN_HCKDE/ValidationLikelihood_"
-        + str(patience)
-        + "/"
-        + str(idx_fold)
-    )
+    fold_folder = model_folder(df_name, "HSPBN_HCKDE", patience, idx_fold)
     all_models = sorted(glob.glob(fold_folder + "/*.pickle"))
     final_model = pbn.load(all_models[-1])
 
@@ -521,178 +708,156 @@ def test_hc_hspbn_hckde(df_name, train_df, test_df, patience, idx_fold):
     return final_model.logl(test_df)
 
 
-def unfold_predictions(results):
-    p = np.asarray([])
-    for r in results:
-        p = np.hstack((p, r))
+TEST_FUNCTIONS = {
+    "CLG_BIC": test_hc_clg_bic,
+    "CLG": test_hc_clg_vl,
+    "HSPBN": test_hc_hspbn_clg,
+    "HSPBN_HCKDE": test_hc_hspbn_hckde,
+}
 
-    return p
+# Dataset and evaluation folds of the test_hc_models worker processes.
+worker_df = None
+worker_fold_indices = None
 
 
-def test_hc_models(df_name, df):
+def init_test_worker(df, fold_indices, budget, counter):
+    global worker_df, worker_fold_indices
+    worker_df = df
+    worker_fold_indices = fold_indices
+    thread_budget.init_worker(budget, counter)
+
+
+def test_fold(df_name, df, fold_indices, family, patience, idx_fold):
+    train_indices, test_indices = fold_indices[idx_fold]
+    return ProfiledTask(TEST_FUNCTIONS[family], "test", family)(
+        df_name,
+        df.iloc[train_indices, :],
+        df.iloc[test_indices, :],
+        patience,
+        idx_fold,
+    )
+
+
+def test_hc_fold(task):
+    family, df_name, patience, idx_fold = task
+    logl = test_fold(
+        df_name, worker_df, worker_fold_indices, family, patience, idx_fold
+    )
+    return family, patience, idx_fold, logl
+
+
+def unfold_predictions(results, fold_indices):
     """
-    Evaluates various hierarchical clustering models on a given dataset using cross-validation.
+    Places the test predictions of each fold at the row positions of its test
+    instances, so the predictions of every model are aligned with the dataset rows.
 
     Parameters:
-    df_name (str): The name of the dataframe.
-    df (pandas.DataFrame): The dataframe containing the data to be evaluated.
+    results (list of numpy.ndarray): The test predictions of each fold.
+    fold_indices (list of tuple): The (train, test) row positions of each fold.
 
     Returns:
-    tuple: A tuple containing the evaluation results for the following models:
-        - bic_result: List of BIC evaluation results for different patience values.
-        - clg_vl_result: List of CLG validation results for different patience values.
-        - hspbn_vl_result: List of HSPBN validation results for different patience values.
-        - hspbn_hckde_vl_result: List of HSPBN-HCKDE validation results for different patience values.
+    numpy.ndarray: The prediction of each row of the dataset.
     """
-    chunks = int(np.ceil(EVALUATION_FOLDS / PARALLEL_THREADS))
-
-    fold_indices = list(
-        KFold(EVALUATION_FOLDS, shuffle=True, random_state=SEED).split(df)
-    )
+    p = np.empty((sum(len(test) for (_, test) in fold_indices),))
+    for r, (_, test) in zip(results, fold_indices):
+        p[test] = r
 
-    bic_result = []
-    for patience in PATIENCE:
-        result = []
-        for ch in range(chunks):
-            num_threads = int(
-                np.minimum(PARALLEL_THREADS, EVALUATION_FOLDS - PARALLEL_THREADS * ch)
-            )
-            with mp.Pool(processes=num_threads) as p:
-                tmp_result = p.starmap(
-                    test_hc_clg_bic,
-                    [
-                        (
-                            df_name,
-                            df.iloc[fold_indices[idx_fold][0], :],
-                            df.iloc[fold_indices[idx_fold][1], :],
-                            patience,
-                            idx_fold,
-                        )
-                        for idx_fold in range(
-                            ch * PARALLEL_THREADS, ch * PARALLEL_THREADS + num_threads
-                        )
-                    ],
-                )
+    return p
 
-            result.extend(tmp_result)
 
-        bic_result.append(unfold_predictions(result))
+def store_fold_results(df_name, family, patience, results, fold_indices):
+    """
+    Unfolds the test log-likelihoods of each fold of a model configuration and saves
+    them in the results store.
 
-    clg_vl_result = []
-    for patience in PATIENCE:
-        result = []
-        for ch in range(chunks):
-            num_threads = int(
-                np.minimum(PARALLEL_THREADS, EVALUATION_FOLDS - PARALLEL_THREADS * ch)
-            )
-            with mp.Pool(processes=num_threads) as p:
-                tmp_result = p.starmap(
-                    test_hc_clg_vl,
-                    [
-                        (
-                            df_name,
-                            df.iloc[fold_indices[idx_fold][0], :],
-                            df.iloc[fold_indices[idx_fold][1], :],
-                            patience,
-                            idx_fold,
-                        )
-                        for idx_fold in range(
-                            ch * PARALLEL_THREADS, ch * PARALLEL_THREADS + num_threads
-                        )
-                    ],
-                )
+    Returns:
+    numpy.ndarray: The test log-likelihood of each row of the dataset.
+    """
+    logl = unfold_predictions(results, fold_indices)
 
-            result.extend(tmp_result)
+    folds = np.empty(logl.shape, dtype=int)
+    for idx_fold, (_, test) in enumerate(fold_indices):
+        folds[test] = idx_fold
 
-        clg_vl_result.append(unfold_predictions(result))
+    results_store.append(
+        df_name, family, patience, folds, np.arange(logl.shape[0]), logl
+    )
+    return logl
 
-    hspbn_vl_result = []
-    for patience in PATIENCE:
-        result = []
-        for ch in range(chunks):
-            num_threads = int(
-                np.minimum(PARALLEL_THREADS, EVALUATION_FOLDS - PARALLEL_THREADS * ch)
-            )
-            with mp.Pool(processes=num_threads) as p:
-                tmp_result = p.starmap(
-                    test_hc_hspbn_clg,
-                    [
-                        (
-                            df_name,
-                            df.iloc[fold_indices[idx_fold][0], :],
-                            df.iloc[fold_indices[idx_fold][1], :],
-                            patience,
-                            idx_fold,
-                        )
-                        for idx_fold in range(
-                            ch * PARALLEL_THREADS, ch * PARALLEL_THREADS + num_threads
-                        )
-                    ],
-                )
 
-            result.extend(tmp_result)
+def test_hc_models(df_name, df):
+    """
+    Evaluates various hierarchical clustering models on a given dataset using cross-validation.
 
-        hspbn_vl_result.append(unfold_predictions(result))
+    Parameters:
+    df_name (str): The name of the dataframe.
+    df (pandas.DataFrame): The dataframe containing the data to be evaluated.
 
-    hspbn_hckde_vl_result = []
-    for patience in PATIENCE:
-        result = []
-        for ch in range(chunks):
-            num_threads = int(
-                np.minimum(PARALLEL_THREADS, EVALUATION_FOLDS - PARALLEL_THREADS * ch)
+    Returns:
+    tuple: A tuple containing the evaluation results for the following models:
+        - bic_result: List of BIC evaluation results for different patience values.
+        - clg_vl_result: List of CLG validation results for different patience values.
+        - hspbn_vl_result: List of HSPBN validation results for different patience values.
+        - hspbn_hckde_vl_result: List of HSPBN-HCKDE validation results for different patience values.
+        Each result contains the test log-likelihood of every row of df, in row order.
+    """
+    fold_indices = evaluation_folds(df)
+    # All the (family, patience, fold) evaluations are sent at once to a single pool.
+    # The dataset and the folds are sent once to each worker by the initializer.
+    tasks = [
+        (family, df_name, patience, idx_fold)
+        for family in MODEL_FAMILIES
+        for patience in PATIENCE
+        for idx_fold in range(EVALUATION_FOLDS)
+    ]
+    fold_results = {}
+    ctx = worker_pool.context(START_METHOD)
+    processes = min(PARALLEL_THREADS, len(tasks))
+    budget = worker_budget(processes)
+    budget.apply_environment()
+    with ctx.Pool(
+        processes=processes,
+        initializer=init_test_worker,
+        initargs=(df, fold_indices, budget, ctx.Value("i", 0)),
+    ) as p:
+        for family, patience, idx_fold, logl in p.imap_unordered(test_hc_fold, tasks):
+            fold_results[(family, patience, idx_fold)] = logl
+
+    results = {}
+    for family in MODEL_FAMILIES:
+        results[family] = [
+            store_fold_results(
+                df_name,
+                family,
+                patience,
+                [
+                    fold_results[(family, patience, idx_fold)]
+                    for idx_fold in range(EVALUATION_FOLDS)
+                ],
+                fold_indices,
             )
-            with mp.Pool(processes=num_threads) as p:
-                tmp_result = p.starmap(
-                    test_hc_hspbn_hckde,
-                    [
-                        (
-                            df_name,
-                            df.iloc[fold_indices[idx_fold][0], :],
-                            df.iloc[fold_indices[idx_fold][1], :],
-                            patience,
-                            idx_fold,
-                        )
-                        for idx_fold in range(
-                            ch * PARALLEL_THREADS, ch * PARALLEL_THREADS + num_threads
-                        )
-                    ],
-                )
-
-            result.extend(tmp_result)
-
-        hspbn_hckde_vl_result.append(unfold_predictions(result))
+            for patience in PATIENCE
+        ]
 
-    return (bic_result, clg_vl_result, hspbn_vl_result, hspbn_hckde_vl_result)
+    return tuple(results[family] for family in MODEL_FAMILIES)
 
 
 def common_instance_results(
     bic_result, clg_vl_result, hspbn_vl_result, hspbn_hckde_vl_result
 ):
-    is_invalid_instance = np.full_like(bic_result[0], False, dtype=bool)
+    # All the results are aligned with the dataset rows (see unfold_predictions).
+    is_valid_instance = np.ones_like(bic_result[0], dtype=bool)
+    for ll in bic_result + clg_vl_result + hspbn_vl_result + hspbn_hckde_vl_result:
+        is_valid_instance &= np.isfinite(ll)
 
-    for bic in bic_result:
-        local_invalid = np.logical_or(np.isnan(bic), np.isinf(bic))
-        is_invalid_instance = np.logical_or(is_invalid_instance, local_invalid)
-
-    for clg_vl in clg_vl_result:
-        local_invalid = np.logical_or(np.isnan(clg_vl), np.isinf(clg_vl))
-        is_invalid_instance = np.logical_or(is_invalid_instance, local_invalid)
-
-    for hspbn_vl in hspbn_vl_result:
-        local_invalid = np.logical_or(np.isnan(hspbn_vl), np.isinf(hspbn_vl))
-        is_invalid_instance = np.logical_or(is_invalid_instance, local_invalid)
-
-    for hspbn_hckde_vl in hspbn_hckde_vl_result:
-        local_invalid = np.logical_or(
-            np.isnan(hspbn_hckde_vl), np.isinf(hspbn_hckde_vl)
-        )
-        is_invalid_instance = np.logical_or(is_invalid_instance, local_invalid)
+    if is_valid_instance.all():
+        return (bic_result, clg_vl_result, hspbn_vl_result, hspbn_hckde_vl_result)
 
     return (
-        [ll[~is_invalid_instance] for ll in bic_result],
-        [ll[~is_invalid_instance] for ll in clg_vl_result],
-        [ll[~is_invalid_instance] for ll in hspbn_vl_result],
-        [ll[~is_invalid_instance] for ll in hspbn_hckde_vl_result],
+        [ll[is_valid_instance] for ll in bic_result],
+        [ll[is_valid_instance] for ll in clg_vl_result],
+        [ll[is_valid_instance] for ll in hspbn_vl_result],
+        [ll[is_valid_instance] for ll in hspbn_hckde_vl_result],
     )
 
 
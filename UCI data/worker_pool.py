@@ -0,0 +1,60 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Modules shared by the UCI and synthetic experiments.
+sys.path.append(str(Path(__file__).resolve().parents[1] / "common"))
+
+import process_pool
+from process_pool import init_worker
+
+# Modules imported by the fork server before forking any worker, so the workers start
+# with them already imported. util does not start R when imported (see
+# util.r_package), so R is never embedded in the fork server.
+PRELOAD_MODULES = [
+    "numpy",
+    "pandas",
+    "pyarrow",
+    "scipy.linalg",
+    "sklearn.model_selection",
+    "pybnesian",
+    "util",
+]
+
+
+def context(start_method):
+    """
+    Returns the multiprocessing context of the worker pools, which preloads
+    PRELOAD_MODULES in the fork server (see process_pool.context). The workers never
+    inherit an embedded R from the main process.
+    """
+    return process_pool.context(start_method, PRELOAD_MODULES)
+
+
+def task_startup(submitted, start, r_init_time=0.0):
+    """
+    Startup statistics of a task (see process_pool.task_startup), with the time spent
+    starting R during the task.
+    """
+    startup = process_pool.task_startup(submitted, start)
+    startup["r_init"] = r_init_time
+    return startup
+
+
+def startup_report(startups):
+    """
+    Summarizes the startup statistics of the tasks returned by task_startup, and the
+    time spent starting R.
+    """
+    report = process_pool.startup_report(startups)
+    r_init = np.asarray([s["r_init"] for s in startups if s["r_init"] > 0])
+    if len(r_init) > 0:
+        report += (
+            "\n  R started in "
+            + str(len(r_init))
+            + " tasks: mean "
+            + "{:.3f}".format(r_init.mean())
+            + " s"
+        )
+    return report
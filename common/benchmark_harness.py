@@ -0,0 +1,159 @@
+import json
+import platform
+import sys
+import time
+import timeit
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import pybnesian as pbn
+
+# Repetitions of each benchmark. Each repetition runs the benchmark enough times to
+# take at least 0.2 seconds (see timeit.Timer.autorange).
+REPETITIONS = 5
+BASELINE_FILE = Path("benchmarks/hot_paths.json")
+# Results of the last run, with the time of every repetition (see perf_history.py).
+LATEST_FILE = Path("benchmarks/hot_paths_latest.json")
+# Relative slowdown of the median time over the baseline reported as a regression.
+REGRESSION_THRESHOLD = 0.1
+
+
+def time_benchmark(setup, args):
+    """
+    Returns the time in seconds of a single call of the benchmark in each repetition,
+    their minimum and median, and the number of calls of each repetition.
+    """
+    timer = timeit.Timer(setup(*args))
+    number, _ = timer.autorange()
+    times = np.asarray(timer.repeat(REPETITIONS, number)) / number
+    return {
+        "min": float(times.min()),
+        "median": float(np.median(times)),
+        "number": number,
+        "times": times.tolist(),
+    }
+
+
+def run_benchmarks(cases, patterns):
+    """
+    Runs the benchmarks whose name contains any of the patterns (all of them if there
+    are no patterns). A benchmark that raises an exception (e.g. PluginEstimator
+    without the R ks package) is reported and skipped.
+
+    Parameters:
+    cases (dict): The name and the (setup function, arguments) of each benchmark. The
+        setup function generates the inputs and returns the function to time.
+    patterns (list of str): The name patterns of the benchmarks to run.
+    """
+    results = {}
+    for name, (setup, args) in cases.items():
+        if patterns and not any(p in name for p in patterns):
+            continue
+
+        try:
+            results[name] = time_benchmark(setup, args)
+        except Exception as e:
+            print(name + " failed: " + repr(e))
+            continue
+
+        print(name + ": " + "{:.6f}".format(results[name]["median"]) + "s")
+
+    return results
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "pybnesian": pbn.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
+def load_baseline(filename=BASELINE_FILE):
+    if not filename.exists():
+        return None
+    with open(filename, "r") as f:
+        return json.load(f)
+
+
+def save_latest(results, filename=LATEST_FILE):
+    filename.parent.mkdir(parents=True, exist_ok=True)
+    with open(filename, "w") as f:
+        json.dump(
+            {"environment": environment(), "benchmarks": results},
+            f,
+            indent=2,
+            sort_keys=True,
+        )
+
+
+def save_baseline(results, filename=BASELINE_FILE):
+    """
+    Stores the results as the new baseline. The benchmarks not run keep their previous
+    baseline.
+    """
+    baseline = load_baseline(filename) or {"benchmarks": {}}
+    baseline["environment"] = environment()
+    baseline["benchmarks"].update(results)
+
+    filename.parent.mkdir(parents=True, exist_ok=True)
+    with open(filename, "w") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+
+
+def compare(results, baseline):
+    """
+    Prints the ratio between the median times and the baseline. Returns the names of
+    the benchmarks slower than the baseline by more than REGRESSION_THRESHOLD.
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline["benchmarks"]:
+            continue
+
+        ratio = result["median"] / baseline["benchmarks"][name]["median"]
+        if ratio > 1 + REGRESSION_THRESHOLD:
+            regressions.append(name)
+        print(
+            name
+            + ": "
+            + "{:.2f}".format(ratio)
+            + "x baseline"
+            + (" (regression)" if ratio > 1 + REGRESSION_THRESHOLD else "")
+        )
+
+    return regressions
+
+
+def main(cases, argv):
+    """
+    Command line of the benchmark suites: [--save] [name pattern ...]. Runs the
+    benchmarks, stores their times in LATEST_FILE and compares them with the baseline.
+    With --save, the times are stored as the new baseline. Otherwise, exits with an
+    error if there is any regression.
+    """
+    save = len(argv) > 0 and argv[0] == "--save"
+    patterns = argv[1:] if save else argv
+
+    results = run_benchmarks(cases, patterns)
+    save_latest(results)
+
+    baseline = load_baseline()
+    regressions = []
+    if baseline is not None:
+        print()
+        print("Comparison with " + str(BASELINE_FILE))
+        print("=======================")
+        regressions = compare(results, baseline)
+
+    if save:
+        save_baseline(results)
+        print("Baseline saved in " + str(BASELINE_FILE))
+    elif regressions:
+        sys.exit(1)
@@ -0,0 +1,95 @@
+import multiprocessing as mp
+import os
+import time
+
+import numpy as np
+import thread_budget
+
+# Pool creation time, and end time and number of tasks of the previous task of this
+# worker process (see init_worker and task_startup).
+worker_state = {"created": None, "last_end": None, "tasks": 0}
+
+
+def context(start_method, preload_modules):
+    """
+    Returns the multiprocessing context of the worker pools. With "forkserver", the
+    main module and preload_modules are imported once by the fork server, and every
+    worker is forked from it, so the workers neither import them again nor inherit the
+    state of the main process (e.g. its threads). The default start method is used if
+    start_method is not available on this platform.
+    """
+    if start_method not in mp.get_all_start_methods():
+        return mp.get_context()
+
+    ctx = mp.get_context(start_method)
+    if start_method == "forkserver":
+        ctx.set_forkserver_preload(["__main__"] + preload_modules)
+    return ctx
+
+
+def init_worker(created, budget=None, counter=None):
+    """
+    Pool initializer. created is the time the pool was created by the main process. If
+    a thread_budget.ThreadBudget is given, it is applied to the worker (see
+    thread_budget.init_worker).
+    """
+    worker_state["created"] = created
+    worker_state["last_end"] = None
+    worker_state["tasks"] = 0
+    if budget is not None:
+        thread_budget.init_worker(budget, counter)
+
+
+def task_startup(submitted, start):
+    """
+    Startup statistics of the task that a worker started at start, to be called when
+    the task finishes. The startup latency is the time since both the task was
+    submitted and the worker was free (the pool was created for its first task, or its
+    previous task finished), so the time the task waited for a busy worker is not
+    included. The latency of the first task of a worker includes starting the process.
+
+    Returns:
+    dict: The pid of the worker, whether it is its first task and the startup latency.
+    """
+    first_task = worker_state["tasks"] == 0
+    free = worker_state["created"] if first_task else worker_state["last_end"]
+    worker_state["tasks"] += 1
+    worker_state["last_end"] = time.time()
+
+    return {
+        "pid": os.getpid(),
+        "first_task": first_task,
+        "latency": start - max(submitted, free if free is not None else submitted),
+    }
+
+
+def startup_report(startups):
+    """
+    Summarizes the startup statistics of the tasks returned by task_startup.
+    """
+    if not startups:
+        return "No worker tasks"
+
+    lines = []
+    first = np.asarray([s["latency"] for s in startups if s["first_task"]])
+    reused = np.asarray([s["latency"] for s in startups if not s["first_task"]])
+
+    workers = len({s["pid"] for s in startups})
+    lines.append(str(len(startups)) + " tasks on " + str(workers) + " worker processes")
+    for name, latencies in [("new worker", first), ("reused worker", reused)]:
+        if len(latencies) == 0:
+            continue
+        lines.append(
+            "  startup latency ("
+            + name
+            + ", "
+            + str(len(latencies))
+            + " tasks): mean "
+            + "{:.4f}".format(latencies.mean())
+            + " s, p90 "
+            + "{:.4f}".format(np.quantile(latencies, 0.9))
+            + " s, max "
+            + "{:.4f}".format(latencies.max())
+            + " s"
+        )
+    return "\n".join(lines)
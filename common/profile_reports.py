@@ -0,0 +1,59 @@
+import cProfile
+import glob
+import io
+import os
+import pstats
+from pathlib import Path
+
+PROFILE_PATH = Path("profiles/")
+# Number of functions listed in the text reports.
+REPORT_LINES = 60
+
+
+def run_profiled(profile_file, func, *args):
+    """
+    Runs func(*args) with cProfile and saves the profile in profile_file, also when the
+    function raises an exception. Returns the result of the function.
+    """
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(func, *args)
+    finally:
+        # Write to a temporary file first, so the merge never reads a partial profile.
+        tmp_file = profile_file + "." + str(os.getpid()) + ".tmp"
+        profiler.dump_stats(tmp_file)
+        os.replace(tmp_file, profile_file)
+
+
+def merge_profiles(pattern):
+    """
+    Merges the profiles of all the files matching a glob pattern. Returns a
+    pstats.Stats, or None if no file matches.
+    """
+    files = sorted(glob.glob(pattern))
+    if not files:
+        return None
+
+    stats = pstats.Stats(files[0])
+    for filename in files[1:]:
+        stats.add(filename)
+    return stats
+
+
+def write_report(stats, name, profile_path=PROFILE_PATH):
+    """
+    Saves a merged profile as [name].prof (for snakeviz, gprof2dot, ...) and a text
+    report [name].txt with the functions sorted by cumulative and internal time.
+    """
+    profile_path.mkdir(parents=True, exist_ok=True)
+    stats.dump_stats(profile_path / (name + ".prof"))
+
+    report = io.StringIO()
+    stats.stream = report
+    report.write(str(stats.total_calls) + " calls in " + str(len(stats.files)))
+    report.write(" profiles\n")
+    for sort_key in ["cumulative", "tottime"]:
+        stats.sort_stats(sort_key).print_stats(REPORT_LINES)
+
+    with open(profile_path / (name + ".txt"), "w") as f:
+        f.write(report.getvalue())
@@ -0,0 +1,107 @@
+import os
+import warnings
+
+try:
+    import threadpoolctl
+except ImportError:
+    threadpoolctl = None
+
+# Variables read by the thread pools of the BLAS and OpenMP libraries (also the BLAS
+# of R) and of the pocl OpenCL CPU devices used by PyBNesian, when they are loaded.
+THREAD_VARIABLES = [
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "BLIS_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+    "POCL_MAX_PTHREAD_COUNT",
+]
+
+
+def available_cpus():
+    """
+    Returns the sorted ids of the CPUs this process can run on.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+class ThreadBudget:
+    """
+    Splits the CPUs available to the main process among the workers of a pool. Each
+    worker gets threads CPUs (by default, the CPUs divided by the number of workers)
+    for its BLAS, OpenMP, R and OpenCL threads. The workers run a single task at a
+    time and score the CV folds sequentially, so these are their only threads. If pin
+    is True, each worker is bound to its own threads CPUs, wrapping around if the
+    workers need more CPUs than available.
+    """
+
+    def __init__(self, workers, threads=None, pin=False):
+        self.cpus = available_cpus()
+        self.workers = workers
+        self.threads = threads or max(1, len(self.cpus) // workers)
+        self.pin = pin
+
+    def environment(self):
+        return {variable: str(self.threads) for variable in THREAD_VARIABLES}
+
+    def apply_environment(self):
+        """
+        Sets the variables of the budget in the parent process, before starting the
+        workers. The fork server and the workers inherit them, so the BLAS and OpenMP
+        libraries imported by the fork server (see worker_pool.PRELOAD_MODULES) start
+        with the budget. The libraries already loaded, e.g. by a fork server started for
+        a previous pool, are only limited by threadpoolctl (see apply).
+        """
+        os.environ.update(self.environment())
+        if threadpoolctl is None:
+            warnings.warn(
+                "threadpoolctl is not installed: the thread budget does not limit the "
+                "libraries loaded before the pool is created"
+            )
+
+    def worker_cpus(self, index):
+        """
+        CPUs of the index-th worker started by the pool.
+        """
+        slots = max(1, len(self.cpus) // self.threads)
+        first = index % slots * self.threads
+        return self.cpus[first : first + self.threads]
+
+    def apply(self, index):
+        """
+        Applies the budget to the index-th worker, from the worker process. The
+        variables limit the libraries loaded afterwards (e.g. R, which each worker
+        starts when it is first needed), and threadpoolctl limits the libraries already
+        loaded by the worker or the fork server (NumPy's BLAS).
+        """
+        os.environ.update(self.environment())
+        if threadpoolctl is not None:
+            threadpoolctl.threadpool_limits(self.threads)
+        if self.pin and hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, self.worker_cpus(index))
+
+    def describe(self):
+        return (
+            str(self.workers)
+            + " workers x "
+            + str(self.threads)
+            + " threads on "
+            + str(len(self.cpus))
+            + " CPUs"
+            + (", pinned" if self.pin else "")
+            + ("" if threadpoolctl is not None else ", without threadpoolctl")
+        )
+
+
+def init_worker(budget, counter):
+    """
+    Applies the budget to a new worker. counter is a multiprocessing Value shared by the
+    workers of the pool, used to number them in the order they start.
+    """
+    with counter.get_lock():
+        index = counter.value
+        counter.value += 1
+    budget.apply(index)
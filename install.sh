@@ -8,4 +8,3 @@ apt install r-base
 # R
 # install.packages("ks")
 pip install -r requirements.txt
-# TODO: Modify tikzplotlib
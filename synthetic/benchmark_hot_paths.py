@@ -0,0 +1,114 @@
+import sys
+from pathlib import Path
+
+# Modules shared by the UCI and synthetic experiments.
+sys.path.append(str(Path(__file__).resolve().parents[1] / "common"))
+
+import benchmark_harness
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import util
+from generate_new_bns import (
+    FixedCLG,
+    FixedDiscreteFactor,
+    NormalMixtureCPD,
+    ProbabilisticModel,
+)
+
+import pybnesian as pbn
+
+SEED = 0
+
+
+def synthetic_data(n):
+    """
+    n instances with the discrete and continuous variables of ProbabilisticModel.
+    """
+    rng = np.random.default_rng(SEED)
+    columns = {}
+    for node in ProbabilisticModel.discrete_nodes:
+        categories = ProbabilisticModel.discrete_categories[node]
+        columns[node] = pd.Categorical(
+            rng.choice(categories, size=n), categories=categories
+        )
+    for node in ProbabilisticModel.continuous_nodes:
+        columns[node] = rng.normal(size=n)
+    return pa.RecordBatch.from_pandas(pd.DataFrame(columns))
+
+
+def random_factor(factor_type):
+    """
+    Random factor of the given type with the largest evidence used in the experiments.
+    """
+    np.random.seed(SEED)
+    if factor_type == "FixedDiscreteFactor":
+        return FixedDiscreteFactor.new_random_cpd("E", ["A", "B", "C"])
+    elif factor_type == "FixedCLG":
+        return FixedCLG.new_random_cpd("I", ["A", "B"], ["D", "G"])
+    else:
+        return NormalMixtureCPD.new_random_cpd("I", ["A", "B"], ["D", "G"])
+
+
+def setup_logl(factor_type, n):
+    factor = random_factor(factor_type)
+    df = synthetic_data(n)
+    return lambda: factor.logl(df)
+
+
+def setup_sample(factor_type, n):
+    factor = random_factor(factor_type)
+    df = synthetic_data(n)
+    evidence = df.select(factor.evidence())
+    return lambda: factor.sample(n, evidence, SEED)
+
+
+def random_bn(num_nodes, seed):
+    """
+    Random semiparametric BN with an expected number of arcs equal to num_nodes.
+    """
+    rng = np.random.default_rng(seed)
+    nodes = ["X" + str(i) for i in range(num_nodes)]
+    node_types = [pbn.LinearGaussianCPDType(), pbn.CKDEType()]
+    bn = pbn.SemiparametricBN(
+        nodes,
+        [(n, node_types[t]) for n, t in zip(nodes, rng.integers(2, size=num_nodes))],
+    )
+
+    # Arcs from each node to the next ones, so the graph is acyclic.
+    arc_probability = 2 / (num_nodes - 1)
+    for i in range(num_nodes):
+        for j in range(i + 1, num_nodes):
+            if rng.uniform() < arc_probability:
+                bn.add_arc(nodes[i], nodes[j])
+    return bn
+
+
+def setup_metric(metric, num_nodes):
+    true = random_bn(num_nodes, SEED)
+    estimated = random_bn(num_nodes, SEED + 1)
+    return lambda: metric(estimated, true)
+
+
+def benchmark_cases():
+    """
+    Returns the name and the (setup function, arguments) of each benchmark. The setup
+    function generates the inputs and returns the function to time.
+    """
+    cases = {}
+    for factor_type in ["FixedDiscreteFactor", "FixedCLG", "NormalMixtureCPD"]:
+        for n in util.INSTANCES:
+            name = factor_type + ".logl[n=" + str(n) + "]"
+            cases[name] = (setup_logl, (factor_type, n))
+            name = factor_type + ".sample[n=" + str(n) + "]"
+            cases[name] = (setup_sample, (factor_type, n))
+    for metric in [util.shd, util.hamming, util.hamming_type]:
+        for num_nodes in [10, 50, 200]:
+            name = "util." + metric.__name__ + "[nodes=" + str(num_nodes) + "]"
+            cases[name] = (setup_metric, (metric, num_nodes))
+    return cases
+
+
+if __name__ == "__main__":
+    # python benchmark_hot_paths.py [--save] [name pattern ...]
+    benchmark_harness.main(benchmark_cases(), sys.argv[1:])
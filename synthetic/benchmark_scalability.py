@@ -0,0 +1,326 @@
+import multiprocessing as mp
+import resource
+import sys
+import time
+from pathlib import Path
+
+import hc_telemetry
+import numpy as np
+import pandas as pd
+import util
+
+import pybnesian as pbn
+
+FAMILIES = ["CLG_BIC", "CLG_VL", "HSPBN", "HSPBN_HCKDE"]
+# The sweep changes one parameter of the base configuration at a time. density is the
+# expected number of parents of each node.
+BASE_CONFIGURATION = {"nodes": 8, "rows": 2000, "cardinality": 3, "density": 1.0}
+SWEEP = {
+    "nodes": [4, 8, 16, 32],
+    "rows": [500, 2000, 8000, 32000],
+    "cardinality": [2, 3, 5, 8],
+    "density": [0.5, 1.0, 2.0, 3.0],
+}
+# Number of random datasets of each configuration.
+REPETITIONS = 3
+PATIENCE = 0
+# Seconds after which a run is stopped. The larger values of the swept parameter are
+# not run for that model family.
+TIME_LIMIT = 1800
+RESULTS_FILE = Path("benchmarks/scalability.csv")
+CONFIGURATION_COLUMNS = ["nodes", "rows", "cardinality", "density", "family", "seed"]
+RESULT_COLUMNS = CONFIGURATION_COLUMNS + [
+    "status",
+    "time",
+    "local_scores",
+    "cache_hits",
+    "arcs",
+    "peak_rss_mb",
+]
+
+
+def random_dataset(nodes, rows, cardinality, density, seed):
+    """
+    Samples a dataset from a random hybrid Bayesian network. Half of the nodes are
+    discrete with `cardinality` categories and can only have discrete parents. The
+    continuous nodes are linear Gaussian (even nodes) or non-linear (odd nodes) functions
+    of their continuous parents, with an intercept for each configuration of their
+    discrete parents.
+
+    Parameters:
+    nodes (int): The number of nodes.
+    rows (int): The number of instances.
+    cardinality (int): The number of categories of the discrete nodes.
+    density (float): The expected number of parents of each node.
+    seed (int): The random seed.
+
+    Returns:
+    pandas.DataFrame: The dataset, with the discrete nodes as categorical columns.
+    """
+    rng = np.random.default_rng(seed)
+    num_discrete = nodes // 2
+    names = ["D" + str(i) for i in range(num_discrete)] + [
+        "C" + str(i) for i in range(nodes - num_discrete)
+    ]
+
+    # Arcs follow the order of the nodes, so the discrete nodes precede the continuous.
+    candidate_arcs = nodes * (nodes - 1) // 2
+    arc_probability = min(1.0, density * nodes / max(candidate_arcs, 1))
+
+    values = {}
+    for j, name in enumerate(names):
+        parents = [names[i] for i in range(j) if rng.uniform() < arc_probability]
+        discrete_parents = [p for p in parents if p.startswith("D")]
+        continuous_parents = [p for p in parents if p.startswith("C")]
+
+        config = np.zeros((rows,), dtype=int)
+        for p in discrete_parents:
+            config = config * cardinality + values[p]
+        num_configs = cardinality ** len(discrete_parents)
+
+        if name.startswith("D"):
+            probs = rng.dirichlet([3] * cardinality, size=num_configs)[config]
+            u = rng.uniform(size=(rows, 1))
+            values[name] = np.minimum(
+                (probs.cumsum(axis=1) < u).sum(axis=1), cardinality - 1
+            )
+        else:
+            x = rng.normal(0, 2, size=num_configs)[config]
+            for p in continuous_parents:
+                x = x + rng.choice([-1, 1]) * rng.uniform(1, 5) * values[p]
+            if j % 2 == 1:
+                x = np.sin(x) + np.abs(x) ** 0.5
+            x = x + rng.normal(0, np.sqrt(0.2 + rng.chisquare(1)), size=rows)
+            values[name] = (x - x.mean()) / x.std()
+
+    df = pd.DataFrame(values)
+    for name in names[:num_discrete]:
+        df[name] = pd.Categorical(
+            df[name].astype(str), categories=[str(c) for c in range(cardinality)]
+        )
+    return df
+
+
+def peak_memory():
+    """
+    Peak resident memory of the process in MB.
+    """
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KB on Linux.
+    return maxrss / 2**20 if sys.platform == "darwin" else maxrss / 2**10
+
+
+def start_model(family, df):
+    if family in ["CLG_BIC", "CLG_VL"]:
+        return pbn.CLGNetwork(list(df.columns.values))
+    elif family == "HSPBN":
+        return pbn.SemiparametricBN(list(df.columns.values))
+    else:
+        node_types = [
+            (name, pbn.CKDEType()) for name in df.select_dtypes("double").columns.values
+        ] + [
+            (name, pbn.DiscreteFactorType())
+            for name in df.select_dtypes("category").columns.values
+        ]
+        return pbn.SemiparametricBN(list(df.columns.values), node_types)
+
+
+def run_hc(nodes, rows, cardinality, density, family, seed):
+    """
+    Learns a model of a family on a random dataset with the same greedy hill-climbing
+    setup as the training scripts. It runs on its own process, so the peak memory is
+    the one of the run.
+    """
+    df = random_dataset(nodes, rows, cardinality, density, seed)
+
+    if family == "CLG_BIC":
+        score = pbn.BIC(df)
+        operators = pbn.ArcOperatorSet()
+    else:
+        score = pbn.ValidatedLikelihood(df, k=10, seed=util.SEED)
+        operators = pbn.OperatorPool([pbn.ArcOperatorSet(), pbn.ChangeNodeTypeSet()])
+    counter = hc_telemetry.counting_score(score)
+
+    hc = pbn.GreedyHillClimbing()
+    start_time = time.time()
+    bn = hc.estimate(operators, counter, start_model(family, df), patience=PATIENCE)
+    elapsed = time.time() - start_time
+
+    return {
+        "time": elapsed,
+        "local_scores": counter.calls,
+        "cache_hits": counter.cache_hits,
+        "arcs": bn.num_arcs(),
+        "peak_rss_mb": peak_memory(),
+    }
+
+
+def run_configuration(configuration):
+    """
+    Runs a configuration on a new process, stopping it after TIME_LIMIT seconds.
+    Returns its results with the status "ok", "timeout" or "error".
+    """
+    args = tuple(configuration[c] for c in CONFIGURATION_COLUMNS)
+    with mp.Pool(processes=1, maxtasksperchild=1) as p:
+        result = p.apply_async(run_hc, args)
+        try:
+            return {"status": "ok", **result.get(timeout=TIME_LIMIT)}
+        except mp.TimeoutError:
+            return {"status": "timeout", "time": TIME_LIMIT}
+        except Exception as e:
+            print("Error: " + repr(e))
+            return {"status": "error"}
+
+
+def sweep_configurations(families):
+    """
+    Yields the (swept parameter, configuration) of every run of the sweep.
+    """
+    for parameter, values in SWEEP.items():
+        for family in families:
+            for value in values:
+                for seed in range(REPETITIONS):
+                    configuration = dict(BASE_CONFIGURATION)
+                    configuration[parameter] = value
+                    configuration["family"] = family
+                    configuration["seed"] = seed
+                    yield parameter, configuration
+
+
+def load_results(filename=RESULTS_FILE):
+    if not filename.exists():
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+    return pd.read_csv(filename)
+
+
+def configuration_key(configuration):
+    return tuple(
+        float(configuration[c]) if c == "density" else configuration[c]
+        for c in CONFIGURATION_COLUMNS
+    )
+
+
+def run_sweep(families, filename=RESULTS_FILE):
+    """
+    Runs the configurations of the sweep not stored in the results file yet, appending
+    their results to it. After a timeout, the larger values of the swept parameter are
+    not run for that family.
+    """
+    results = load_results(filename)
+    done = {configuration_key(row) for _, row in results.iterrows()}
+    timeouts = {
+        configuration_key(row)
+        for _, row in results[results["status"] == "timeout"].iterrows()
+    }
+
+    filename.parent.mkdir(parents=True, exist_ok=True)
+    infeasible = set()
+    for parameter, configuration in sweep_configurations(families):
+        family = configuration["family"]
+        if (parameter, family) in infeasible:
+            continue
+
+        key = configuration_key(configuration)
+        if key in done:
+            if key in timeouts:
+                infeasible.add((parameter, family))
+            continue
+
+        print(
+            ", ".join(c + " = " + str(configuration[c]) for c in CONFIGURATION_COLUMNS)
+        )
+        row = {**configuration, **run_configuration(configuration)}
+        pd.DataFrame([row], columns=RESULT_COLUMNS).to_csv(
+            filename, mode="a", header=not filename.exists(), index=False
+        )
+        done.add(key)
+        if row["status"] == "timeout":
+            timeouts.add(key)
+            infeasible.add((parameter, family))
+
+
+def swept_results(results, parameter):
+    """
+    Results of the runs that only change a parameter of the base configuration.
+    """
+    mask = np.ones((results.shape[0],), dtype=bool)
+    for c, value in BASE_CONFIGURATION.items():
+        if c != parameter:
+            mask &= results[c].to_numpy() == value
+    return results[mask]
+
+
+def scaling_exponent(x, y):
+    """
+    Slope of the least squares fit of log(y) = a + b * log(x), so y grows as x^b.
+    """
+    if len(x) < 2:
+        return np.nan
+    return np.polyfit(np.log(x), np.log(y), 1)[0]
+
+
+def scaling_report(results):
+    """
+    Fits the scaling exponents of the time, local scores and peak memory with respect
+    to each swept parameter, for each model family.
+
+    Returns:
+    pandas.DataFrame: One row per (parameter, family) with the exponents, the largest
+        value run within the time limit and its median time, the first value that
+        exceeded the time limit, and the value at which the time would reach the
+        time limit according to the fit of the time.
+    """
+    rows = []
+    for parameter in SWEEP:
+        swept = swept_results(results, parameter)
+        for family, runs in swept.groupby("family"):
+            ok = runs[runs["status"] == "ok"]
+            medians = ok.groupby(parameter)[
+                ["time", "local_scores", "peak_rss_mb"]
+            ].median()
+            timeouts = runs[runs["status"] == "timeout"][parameter]
+
+            x = medians.index.to_numpy(dtype=float)
+            time_exponent = scaling_exponent(x, medians["time"].to_numpy())
+            row = {
+                "parameter": parameter,
+                "family": family,
+                "time_exponent": time_exponent,
+                "local_scores_exponent": scaling_exponent(
+                    x, medians["local_scores"].to_numpy(dtype=float)
+                ),
+                "memory_exponent": scaling_exponent(
+                    x, medians["peak_rss_mb"].to_numpy()
+                ),
+                "max_value": x.max() if len(x) > 0 else np.nan,
+                "max_value_time": medians["time"].iloc[-1] if len(x) > 0 else np.nan,
+                "timeout_value": timeouts.min() if len(timeouts) > 0 else np.nan,
+            }
+            if time_exponent > 0:
+                row["time_limit_value"] = row["max_value"] * (
+                    TIME_LIMIT / row["max_value_time"]
+                ) ** (1 / time_exponent)
+            else:
+                row["time_limit_value"] = np.nan
+            rows.append(row)
+
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    # python benchmark_scalability.py [--report] [family ...]
+    report_only = len(sys.argv) > 1 and sys.argv[1] == "--report"
+    families = sys.argv[2:] if report_only else sys.argv[1:]
+    for family in families:
+        if family not in FAMILIES:
+            raise ValueError(
+                "Unknown model family "
+                + family
+                + ". Available families: "
+                + ", ".join(FAMILIES)
+            )
+
+    if not report_only:
+        run_sweep(families if families else FAMILIES)
+
+    print(scaling_report(load_results()).to_string(index=False))
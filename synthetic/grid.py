@@ -0,0 +1,171 @@
+import argparse
+import multiprocessing as mp
+import time
+
+import task_profile
+import util
+import worker_pool
+
+FAMILIES = ["CLG", "HSPBN", "HSPBN_HCKDE"]
+# Run folders of each patience value inside the folder of each model family.
+RUN_PREFIXES = {
+    "CLG": ["BIC_", "ValidationLikelihood_"],
+    "HSPBN": [""],
+    "HSPBN_HCKDE": [""],
+}
+
+
+def train_function(family):
+    """
+    Imports the run_hc_* function of a model family. The training scripts are only
+    imported when needed, so the workers do not import all of them.
+    """
+    if family == "CLG":
+        import train_hc_clg
+
+        return train_hc_clg.run_hc_hspbn
+    elif family == "HSPBN":
+        import train_hc_hspbn
+
+        return train_hc_hspbn.run_hc_hspbn
+    else:
+        import train_hc_hspbn_hckde
+
+        return train_hc_hspbn_hckde.run_hc_hspbn_hckde
+
+
+def train_task(family, idx_dataset, i, patience, submitted):
+    start = time.time()
+    task = util.ProfiledTask(train_function(family), family, RUN_PREFIXES[family])
+    task(idx_dataset, i, patience)
+    return worker_pool.task_startup(submitted, start)
+
+
+def train(families, instances, simulations, patience):
+    """
+    Learns the models of the selected simulations, numbers of instances, model families
+    and patience values on a pool of PARALLEL_THREADS processes, started with
+    util.START_METHOD and reused by all the simulations, with the thread budget of
+    util.worker_budget. Finished runs are skipped. Prints the startup latency of the
+    tasks (see worker_pool.task_startup).
+    """
+    submitted = time.time()
+    tasks = [
+        (family, idx_dataset, i, patience, submitted)
+        for i in instances
+        for family in families
+        for idx_dataset in simulations
+    ]
+    processes = min(util.PARALLEL_THREADS, len(tasks))
+    ctx = worker_pool.context(util.START_METHOD)
+    budget = util.worker_budget(processes)
+    budget.apply_environment()
+    print("Thread budget: " + budget.describe())
+
+    with ctx.Pool(
+        processes=processes,
+        initializer=worker_pool.init_worker,
+        initargs=(submitted, budget, ctx.Value("i", 0)),
+    ) as p:
+        startups = p.starmap(train_task, tasks, chunksize=1)
+    print(worker_pool.startup_report(startups))
+
+    if util.PROFILE_TASKS:
+        task_profile.family_reports(families, instances)
+
+
+def test(families, instances, simulations, patience):
+    """
+    Evaluates the learned models of the selected model families with the
+    compare_models function of their test script.
+    """
+    for i in instances:
+        print(str(i) + " instances")
+        print("=======================")
+        if "CLG" in families:
+            import test_hc_clg
+
+            test_hc_clg.compare_models(i, simulations, patience)
+        if "HSPBN" in families:
+            import test_hc_hspbn
+
+            test_hc_hspbn.compare_models(i, "normal_reference", simulations, patience)
+        if "HSPBN_HCKDE" in families:
+            import test_hc_hspbn_hckde
+
+            test_hc_hspbn_hckde.compare_models(
+                i, "normal_reference", simulations, patience
+            )
+
+
+def times(families, instances, simulations, patience):
+    import test_hc_times
+
+    for i in instances:
+        print(str(i) + " instances")
+        print("=======================")
+        test_hc_times.compare_models(i, simulations, patience)
+
+
+COMMANDS = {"train": train, "test": test, "times": times}
+
+
+def parse_range(value):
+    """
+    Parses a list of integers and ranges such as "0-9,20,30-39".
+    """
+    values = []
+    for part in value.split(","):
+        first, _, last = part.partition("-")
+        values.extend(range(int(first), int(last or first) + 1))
+    return values
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(
+        description="Runs a subset of the synthetic experiments grid."
+    )
+    parser.add_argument("command", choices=list(COMMANDS))
+    parser.add_argument("--families", nargs="+", choices=FAMILIES, default=FAMILIES)
+    parser.add_argument(
+        "--instances", nargs="+", type=int, default=util.INSTANCES, metavar="N"
+    )
+    parser.add_argument(
+        "--simulations",
+        type=parse_range,
+        default=list(range(util.NUM_SIMULATIONS)),
+        help='e.g. "0-9,20"',
+    )
+    parser.add_argument(
+        "--patience", nargs="+", type=int, default=util.PATIENCE, metavar="P"
+    )
+    parser.add_argument(
+        "--start-method",
+        choices=mp.get_all_start_methods(),
+        help="start method of the worker processes (default: "
+        + util.START_METHOD
+        + ")",
+    )
+    args = parser.parse_args(args)
+
+    for idx_dataset in args.simulations:
+        if idx_dataset < 0 or idx_dataset >= util.NUM_SIMULATIONS:
+            parser.error(
+                "Simulation "
+                + str(idx_dataset)
+                + " out of range [0, "
+                + str(util.NUM_SIMULATIONS - 1)
+                + "]"
+            )
+    return args
+
+
+if __name__ == "__main__":
+    # python grid.py train --families HSPBN --instances 200 --simulations 0-9
+    args = parse_args()
+    if args.start_method is not None:
+        util.START_METHOD = args.start_method
+
+    COMMANDS[args.command](
+        args.families, args.instances, args.simulations, args.patience
+    )
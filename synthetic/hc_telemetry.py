@@ -0,0 +1,254 @@
+import math
+import os
+import resource
+import sys
+import time
+
+import pandas as pd
+import util
+
+import pybnesian as pbn
+
+TELEMETRY_FILE = "telemetry.csv"
+TELEMETRY_COLUMNS = [
+    "iteration",
+    "time",
+    "save_time",
+    "local_scores",
+    "cache_hits",
+    "operator",
+    "delta",
+    "rss_mb",
+]
+
+
+def resident_memory():
+    """
+    Resident memory of the process in MB. The peak resident memory is returned if the
+    current one is not available (no /proc filesystem).
+    """
+    try:
+        with open("/proc/self/statm", "r") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and in KB on Linux.
+        return maxrss / 2**20 if sys.platform == "darwin" else maxrss / 2**10
+
+
+class LocalScoreCounter:
+    """
+    Counts the local scores requested by the greedy hill-climbing to a wrapped score.
+    The local scores are always computed by the wrapped score.
+
+    PyBNesian keeps the local score of the current parents and type of each node in a
+    LocalScoreCache. The requests for the current configuration of a node fill that
+    cache, at the start and after each operator is applied. The other requests
+    evaluate a candidate operator, whose delta subtracts the current local score read
+    from the cache, so they are counted as cache hits.
+    """
+
+    def init_counter(self, score):
+        self.score = score
+        self.calls = 0
+        self.cache_hits = 0
+
+    def has_variables(self, vars):
+        return self.score.has_variables(vars)
+
+    def compatible_bn(self, model):
+        return self.score.compatible_bn(model)
+
+    def count(self, model, variable_type, variable, evidence):
+        self.calls += 1
+        current_type = str(variable_type) == str(model.node_type(variable))
+        current_parents = set(evidence) == set(model.parents(variable))
+        if not (current_type and current_parents):
+            self.cache_hits += 1
+
+    def local_score(self, model, variable, evidence):
+        self.count(model, model.node_type(variable), variable, evidence)
+        return self.score.local_score(model, variable, evidence)
+
+    def local_score_node_type(self, model, variable_type, variable, evidence):
+        self.count(model, variable_type, variable, evidence)
+        return self.score.local_score_node_type(
+            model, variable_type, variable, evidence
+        )
+
+    def data(self):
+        return self.score.data()
+
+
+class CountingScore(LocalScoreCounter, pbn.Score):
+    def __init__(self, score):
+        pbn.Score.__init__(self)
+        self.init_counter(score)
+
+
+class CountingValidatedScore(LocalScoreCounter, pbn.ValidatedScore):
+    def __init__(self, score):
+        pbn.ValidatedScore.__init__(self)
+        self.init_counter(score)
+
+    def vlocal_score(self, model, variable, evidence):
+        return self.score.vlocal_score(model, variable, evidence)
+
+    def vlocal_score_node_type(self, model, variable_type, variable, evidence):
+        return self.score.vlocal_score_node_type(
+            model, variable_type, variable, evidence
+        )
+
+
+class HCTelemetry(pbn.Callback):
+    """
+    Callback that appends a line to [result_folder]/telemetry.csv after each iteration
+    of the greedy hill-climbing, with the wall time of the iteration, the local scores
+    requested and the LocalScoreCache hits (if the score is a LocalScoreCounter), the operator
+    applied, its score delta and the resident memory.
+
+    The wrapped callback (e.g. pbn.SaveModel) is called after the iteration time is
+    measured, and its time is reported separately in the save_time column.
+    """
+
+    def __init__(self, result_folder, callback=None, score=None):
+        pbn.Callback.__init__(self)
+        self.filename = result_folder + "/" + TELEMETRY_FILE
+        self.callback = callback
+        self.score = score
+        self.calls = 0
+        self.cache_hits = 0
+
+        with open(self.filename, "w") as f:
+            f.write(",".join(TELEMETRY_COLUMNS) + "\n")
+        self.last_time = time.time()
+
+    def call(self, model, operator, score, iteration):
+        iteration_time = time.time() - self.last_time
+
+        if self.callback is not None:
+            start_save = time.time()
+            self.callback.call(model, operator, score, iteration)
+            save_time = time.time() - start_save
+        else:
+            save_time = 0.0
+
+        if self.score is not None:
+            local_scores = str(self.score.calls - self.calls)
+            cache_hits = str(self.score.cache_hits - self.cache_hits)
+            self.calls = self.score.calls
+            self.cache_hits = self.score.cache_hits
+        else:
+            local_scores = cache_hits = ""
+
+        if operator is None:
+            operator_type, delta = "", math.nan
+        else:
+            operator_type, delta = type(operator).__name__, operator.delta()
+
+        with open(self.filename, "a") as f:
+            f.write(
+                ",".join(
+                    [
+                        str(iteration),
+                        "{:.6f}".format(iteration_time),
+                        "{:.6f}".format(save_time),
+                        local_scores,
+                        cache_hits,
+                        operator_type,
+                        str(delta),
+                        "{:.1f}".format(resident_memory()),
+                    ]
+                )
+                + "\n"
+            )
+
+        self.last_time = time.time()
+
+
+def counting_score(score):
+    """
+    Wraps a pbn.Score or pbn.ValidatedScore in a LocalScoreCounter.
+    """
+    if isinstance(score, pbn.ValidatedScore):
+        return CountingValidatedScore(score)
+    return CountingScore(score)
+
+
+def instrument(result_folder, score, callback):
+    """
+    Returns the score and callback for the greedy hill-climbing of a run: the original
+    ones, or the counting score and the telemetry callback if util.HC_TELEMETRY is set.
+    """
+    if not util.HC_TELEMETRY:
+        return score, callback
+
+    counter = counting_score(score)
+    return counter, HCTelemetry(result_folder, callback, counter)
+
+
+def telemetry_summary(num_instances, folders):
+    """
+    Summarizes the telemetry of all the simulations of each model type.
+
+    Parameters:
+    num_instances (int): The number of instances used in the experiments.
+    folders (dict): Maps each model type name to its folder inside HillClimbing/.
+
+    Returns:
+    pandas.DataFrame: Per model type, the mean number of iterations, iteration time,
+        local scores and cache hits per run, the fraction of node type changes and the
+        maximum resident memory.
+    """
+    rows = {}
+    for name, folder in folders.items():
+        runs = []
+        for i in range(util.NUM_SIMULATIONS):
+            filename = (
+                "models/"
+                + str(i).zfill(3)
+                + "/"
+                + str(num_instances)
+                + "/HillClimbing/"
+                + folder
+                + "/"
+                + TELEMETRY_FILE
+            )
+            if os.path.exists(filename):
+                runs.append(pd.read_csv(filename))
+
+        if not runs:
+            continue
+
+        # The operator is empty at the start and at the end of the search.
+        operators = pd.concat([r["operator"] for r in runs]).dropna()
+        rows[name] = {
+            "runs": len(runs),
+            "iterations": sum(r["iteration"].max() for r in runs) / len(runs),
+            "iteration_time": pd.concat([r["time"] for r in runs]).mean(),
+            "save_time": pd.concat([r["save_time"] for r in runs]).mean(),
+            "local_scores": sum(r["local_scores"].sum() for r in runs) / len(runs),
+            "cache_hits": sum(r["cache_hits"].sum() for r in runs) / len(runs),
+            "node_type_changes": (operators == "ChangeNodeType").mean(),
+            "max_rss_mb": max(r["rss_mb"].max() for r in runs),
+        }
+
+    return pd.DataFrame.from_dict(rows, orient="index")
+
+
+if __name__ == "__main__":
+    for i in util.INSTANCES:
+        for p in util.PATIENCE:
+            print(str(i) + " instances, patience " + str(p))
+            print(
+                telemetry_summary(
+                    i,
+                    {
+                        "CLG BIC": "CLG/BIC_" + str(p),
+                        "CLG VL": "CLG/ValidationLikelihood_" + str(p),
+                        "HSPBN": "HSPBN/" + str(p),
+                        "HSPBN_HCKDE": "HSPBN_HCKDE/" + str(p),
+                    },
+                )
+            )
@@ -0,0 +1,362 @@
+import hashlib
+import json
+import os
+import platform
+import socket
+import sqlite3
+import struct
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import scipy.stats
+import util
+
+import pybnesian as pbn
+
+HISTORY_FILE = Path("benchmarks/history.sqlite")
+# Folder of each model family inside HillClimbing/, followed by the patience.
+GRID_FOLDERS = {
+    "CLG_BIC": "CLG/BIC_",
+    "CLG_VL": "CLG/ValidationLikelihood_",
+    "HSPBN": "HSPBN/",
+    "HSPBN_HCKDE": "HSPBN_HCKDE/",
+}
+# A benchmark is reported as slower if its median time grows more than MIN_SLOWDOWN
+# and the one-sided test is significant at level ALPHA.
+ALPHA = 0.01
+MIN_SLOWDOWN = 0.05
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    recorded_at TEXT NOT NULL,
+    source TEXT NOT NULL,
+    git_revision TEXT NOT NULL,
+    git_dirty INTEGER NOT NULL,
+    pybnesian_version TEXT NOT NULL,
+    host_fingerprint TEXT NOT NULL,
+    host_description TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS samples (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    benchmark TEXT NOT NULL,
+    instances INTEGER NOT NULL,
+    sample INTEGER NOT NULL,
+    seconds REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS samples_benchmark ON samples(benchmark, instances);
+"""
+
+
+def git_revision():
+    """
+    Returns the git revision of the working tree and whether it has uncommitted
+    changes. The revision is "unknown" outside a git repository.
+    """
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        status = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+    return revision, len(status.strip()) > 0
+
+
+def host_description():
+    memory = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    return (
+        socket.gethostname()
+        + " "
+        + platform.system()
+        + " "
+        + platform.machine()
+        + " "
+        + (platform.processor() or "unknown processor")
+        + ", "
+        + str(os.cpu_count())
+        + " CPUs, "
+        + str(round(memory / 2**30))
+        + " GB, Python "
+        + platform.python_version()
+        + ", numpy "
+        + np.__version__
+    )
+
+
+def host_fingerprint():
+    """
+    Short hash of the host description. Only the runs of the same host are compared.
+    """
+    return hashlib.sha1(host_description().encode()).hexdigest()[:12]
+
+
+def connect(filename=HISTORY_FILE):
+    filename.parent.mkdir(parents=True, exist_ok=True)
+    connection = sqlite3.connect(filename)
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def record(source, samples, filename=HISTORY_FILE):
+    """
+    Stores the samples of a run in the history database.
+
+    Parameters:
+    source (str): What was run, e.g. "grid" or "hot_paths".
+    samples (list of tuple): The (benchmark, instances, sample, seconds) tuples. sample
+        identifies the sample within the benchmark (the simulation of a grid or the
+        repetition of a micro-benchmark). instances is 0 if it does not apply.
+    filename (pathlib.Path): The history database.
+
+    Returns:
+    int: The id of the run.
+    """
+    revision, dirty = git_revision()
+    with connect(filename) as connection:
+        cursor = connection.execute(
+            "INSERT INTO runs (recorded_at, source, git_revision, git_dirty, "
+            "pybnesian_version, host_fingerprint, host_description) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                time.strftime("%Y-%m-%d %H:%M:%S"),
+                source,
+                revision,
+                int(dirty),
+                pbn.__version__,
+                host_fingerprint(),
+                host_description(),
+            ),
+        )
+        run_id = cursor.lastrowid
+        connection.executemany(
+            "INSERT INTO samples (run_id, benchmark, instances, sample, seconds) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [(run_id, b, int(i), int(s), float(t)) for b, i, s, t in samples],
+        )
+    return run_id
+
+
+def grid_samples():
+    """
+    Learning times of the simulations in the models folder, read from the time file
+    of each run.
+    """
+    samples = []
+    for family, folder in GRID_FOLDERS.items():
+        for p in util.PATIENCE:
+            for i in util.INSTANCES:
+                for idx in range(util.NUM_SIMULATIONS):
+                    filename = (
+                        "models/"
+                        + str(idx).zfill(3)
+                        + "/"
+                        + str(i)
+                        + "/HillClimbing/"
+                        + folder
+                        + str(p)
+                        + "/time"
+                    )
+                    if not os.path.exists(filename):
+                        continue
+                    with open(filename, "rb") as f:
+                        seconds = struct.unpack("<d", f.read())[0]
+                    samples.append((family + "_" + str(p), i, idx, seconds))
+    return samples
+
+
+def benchmark_samples(filename, prefix):
+    """
+    Times of every repetition of the micro-benchmarks stored by benchmark_hot_paths.py.
+    """
+    with open(filename, "r") as f:
+        benchmarks = json.load(f)["benchmarks"]
+
+    return [
+        (prefix + name, 0, repetition, seconds)
+        for name, result in benchmarks.items()
+        for repetition, seconds in enumerate(result["times"])
+    ]
+
+
+def load_history(filename=HISTORY_FILE):
+    with connect(filename) as connection:
+        return pd.read_sql_query(
+            "SELECT runs.id AS run_id, recorded_at, source, git_revision, git_dirty, "
+            "pybnesian_version, host_fingerprint, benchmark, instances, sample, "
+            "seconds FROM samples JOIN runs ON samples.run_id = runs.id",
+            connection,
+        )
+
+
+def slowdown_test(baseline, current, paired):
+    """
+    One-sided test of current being slower than baseline: the Wilcoxon signed-rank test
+    if the samples are paired by their ids (the same simulations of a grid), or the
+    Mann-Whitney U test otherwise. Returns the p-value.
+    """
+    common = baseline.index.intersection(current.index)
+    if paired and len(common) >= 6:
+        differences = current.loc[common] - baseline.loc[common]
+        if np.all(differences == 0):
+            return 1.0
+        return scipy.stats.wilcoxon(differences, alternative="greater").pvalue
+
+    if len(baseline) < 2 or len(current) < 2:
+        return np.nan
+    return scipy.stats.mannwhitneyu(current, baseline, alternative="greater").pvalue
+
+
+def compare_runs(history, baseline_revision=None):
+    """
+    Compares the last run of each benchmark and instance size with a previous run of
+    the same host: the last run of baseline_revision, or the run before the last one.
+
+    Returns:
+    pandas.DataFrame: One row per (benchmark, instances) with the revisions and
+        PyBNesian versions compared, the median times, the relative change, the
+        p-value of the slowdown test and whether it is a significant slowdown.
+    """
+    rows = []
+    host = host_fingerprint()
+    history = history[history["host_fingerprint"] == host]
+
+    for (benchmark, instances), runs in history.groupby(["benchmark", "instances"]):
+        run_ids = sorted(runs["run_id"].unique())
+        current_id = run_ids[-1]
+        if baseline_revision is None:
+            previous = run_ids[:-1]
+        else:
+            previous = sorted(
+                runs[runs["git_revision"].str.startswith(baseline_revision)][
+                    "run_id"
+                ].unique()
+            )
+            previous = [r for r in previous if r != current_id]
+        if not previous:
+            continue
+        baseline_id = previous[-1]
+
+        current = runs[runs["run_id"] == current_id]
+        baseline = runs[runs["run_id"] == baseline_id]
+        current_seconds = current.set_index("sample")["seconds"]
+        baseline_seconds = baseline.set_index("sample")["seconds"]
+
+        change = current_seconds.median() / baseline_seconds.median() - 1
+        pvalue = slowdown_test(
+            baseline_seconds, current_seconds, current["source"].iloc[0] == "grid"
+        )
+        rows.append(
+            {
+                "benchmark": benchmark,
+                "instances": instances,
+                "baseline_revision": baseline["git_revision"].iloc[0][:10]
+                + ("+" if baseline["git_dirty"].iloc[0] else ""),
+                "current_revision": current["git_revision"].iloc[0][:10]
+                + ("+" if current["git_dirty"].iloc[0] else ""),
+                "baseline_pybnesian": baseline["pybnesian_version"].iloc[0],
+                "current_pybnesian": current["pybnesian_version"].iloc[0],
+                "baseline_median": baseline_seconds.median(),
+                "current_median": current_seconds.median(),
+                "change": change,
+                "pvalue": pvalue,
+                "slower": bool(change > MIN_SLOWDOWN and pvalue < ALPHA),
+            }
+        )
+
+    return pd.DataFrame(rows)
+
+
+def text_report(comparison):
+    if comparison.empty:
+        return "No benchmark has two runs on this host (" + host_fingerprint() + ")."
+
+    lines = []
+    slower = comparison[comparison["slower"]]
+    lines.append(
+        str(len(slower))
+        + " of "
+        + str(len(comparison))
+        + " benchmarks are significantly slower (change > "
+        + "{:.0%}".format(MIN_SLOWDOWN)
+        + ", p < "
+        + str(ALPHA)
+        + ") on host "
+        + host_fingerprint()
+    )
+    for _, row in comparison.iterrows():
+        lines.append(
+            ("SLOWER " if row["slower"] else "       ")
+            + row["benchmark"]
+            + (
+                " (" + str(row["instances"]) + " instances)"
+                if row["instances"] > 0
+                else ""
+            )
+            + ": "
+            + "{:.4g}".format(row["baseline_median"])
+            + "s ("
+            + row["baseline_revision"]
+            + ", pybnesian "
+            + row["baseline_pybnesian"]
+            + ") -> "
+            + "{:.4g}".format(row["current_median"])
+            + "s ("
+            + row["current_revision"]
+            + ", pybnesian "
+            + row["current_pybnesian"]
+            + "), "
+            + "{:+.1%}".format(row["change"])
+            + ", p = "
+            + "{:.3g}".format(row["pvalue"])
+        )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    # python perf_history.py grid
+    # python perf_history.py benchmarks [hot_paths_latest.json ...]
+    # python perf_history.py report [baseline revision]
+    command = sys.argv[1] if len(sys.argv) > 1 else "report"
+    if command == "grid":
+        samples = grid_samples()
+        run_id = record("grid", samples)
+        print("Recorded " + str(len(samples)) + " grid times as run " + str(run_id))
+    elif command == "benchmarks":
+        files = (
+            sys.argv[2:] if len(sys.argv) > 2 else ["benchmarks/hot_paths_latest.json"]
+        )
+        for filename in files:
+            # The micro-benchmarks of each experiment folder have their own prefix.
+            prefix = Path(filename).resolve().parent.parent.name + "/"
+            samples = benchmark_samples(filename, prefix)
+            run_id = record("hot_paths", samples)
+            print(
+                "Recorded "
+                + str(len(samples))
+                + " benchmark times of "
+                + filename
+                + " as run "
+                + str(run_id)
+            )
+    elif command == "report":
+        baseline_revision = sys.argv[2] if len(sys.argv) > 2 else None
+        comparison = compare_runs(load_history(), baseline_revision)
+        print(text_report(comparison))
+        if not comparison.empty and comparison["slower"].any():
+            sys.exit(1)
+    else:
+        raise ValueError(
+            "Unknown command "
+            + command
+            + ". Available commands: grid, benchmarks, report"
+        )
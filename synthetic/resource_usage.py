@@ -0,0 +1,179 @@
+import json
+import os
+import resource
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import util
+
+RESOURCES_FILE = "resources_{stage}.json"
+RESOURCE_COLUMNS = [
+    "wall_time",
+    "user_time",
+    "system_time",
+    "peak_rss_mb",
+    "read_bytes",
+    "write_bytes",
+    "read_chars",
+    "write_chars",
+]
+
+
+def reset_peak_memory():
+    """
+    Resets the peak resident memory of the process (Linux >= 4.0). Returns whether it
+    was reset.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_memory():
+    """
+    Peak resident memory of the process in MB since the last reset_peak_memory.
+    """
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 2**10
+    except OSError:
+        pass
+
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KB on Linux.
+    return maxrss / 2**20 if sys.platform == "darwin" else maxrss / 2**10
+
+
+def io_counters():
+    """
+    Bytes read and written by the process. read_bytes and write_bytes are the bytes
+    transferred from and to the storage, and read_chars and write_chars the bytes of
+    all the read and write calls, including the ones served by the page cache.
+    """
+    try:
+        with open("/proc/self/io", "r") as f:
+            counters = dict(line.split(": ") for line in f.read().splitlines())
+        return {
+            "read_bytes": int(counters["read_bytes"]),
+            "write_bytes": int(counters["write_bytes"]),
+            "read_chars": int(counters["rchar"]),
+            "write_chars": int(counters["wchar"]),
+        }
+    except (OSError, KeyError, ValueError):
+        # Without /proc, only the block operations are available (512 byte blocks).
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        return {
+            "read_bytes": usage.ru_inblock * 512,
+            "write_bytes": usage.ru_oublock * 512,
+            "read_chars": np.nan,
+            "write_chars": np.nan,
+        }
+
+
+class ResourceUsage:
+    """
+    Measures the resources used by the process from its creation until stop() is
+    called: wall time, user and system CPU time (of all the threads), peak resident
+    memory and bytes read and written.
+
+    The peak memory is the peak of the measured period if the kernel allows resetting
+    it, and the peak of the whole process otherwise (peak_rss_scope is "run" or
+    "process").
+    """
+
+    def __init__(self):
+        self.peak_rss_scope = "run" if reset_peak_memory() else "process"
+        self.start_io = io_counters()
+        self.start_usage = resource.getrusage(resource.RUSAGE_SELF)
+        self.start_time = time.time()
+
+    def stop(self):
+        wall_time = time.time() - self.start_time
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        io = io_counters()
+
+        record = {
+            "wall_time": wall_time,
+            "user_time": usage.ru_utime - self.start_usage.ru_utime,
+            "system_time": usage.ru_stime - self.start_usage.ru_stime,
+            "peak_rss_mb": peak_memory(),
+            "peak_rss_scope": self.peak_rss_scope,
+        }
+        for c in io:
+            record[c] = io[c] - self.start_io[c]
+        return record
+
+
+def save(result_folder, stage, record, load_record=None):
+    """
+    Saves the resources used by the train or test stage of a run in its result folder.
+    The resources used to load the data shared by several runs are stored with the load_
+    prefix.
+    """
+    record = dict(record)
+    if load_record is not None:
+        for c in ["wall_time", "user_time", "system_time", "read_bytes"]:
+            record["load_" + c] = load_record[c]
+
+    with open(result_folder + "/" + RESOURCES_FILE.format(stage=stage), "w") as f:
+        json.dump(record, f)
+
+
+def load_resources(
+    num_instances, folders, stage, simulations=range(util.NUM_SIMULATIONS)
+):
+    """
+    Loads the resources used by a stage of all the simulations of each model type.
+
+    Parameters:
+    num_instances (int): The number of instances used in the experiments.
+    folders (dict): Maps each model type name to its folder inside HillClimbing/.
+    stage (str): "train" or "test".
+    simulations (list of int): The simulations to load.
+
+    Returns:
+    pandas.DataFrame: One row per (model, simulation) with the resources of the run.
+    """
+    rows = []
+    for name, folder in folders.items():
+        for i in simulations:
+            filename = (
+                "models/"
+                + str(i).zfill(3)
+                + "/"
+                + str(num_instances)
+                + "/HillClimbing/"
+                + folder
+                + "/"
+                + RESOURCES_FILE.format(stage=stage)
+            )
+            if not os.path.exists(filename):
+                continue
+            with open(filename, "r") as f:
+                rows.append({"model": name, "simulation": i, **json.load(f)})
+
+    if not rows:
+        return pd.DataFrame(columns=["model", "simulation"] + RESOURCE_COLUMNS)
+    return pd.DataFrame(rows)
+
+
+def resource_percentiles(resources, percentiles=(0.5, 0.9, 0.99)):
+    """
+    Mean and percentiles of each resource, per model type.
+    """
+    rows = {}
+    for name, runs in resources.groupby("model", sort=False):
+        row = {"runs": len(runs)}
+        for c in RESOURCE_COLUMNS:
+            row[c + "_mean"] = runs[c].mean()
+            for q in percentiles:
+                row[c + "_p" + str(round(q * 100))] = runs[c].quantile(q)
+        rows[name] = row
+    return pd.DataFrame.from_dict(rows, orient="index")
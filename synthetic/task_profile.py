@@ -0,0 +1,39 @@
+import sys
+from pathlib import Path
+
+# Modules shared by the UCI and synthetic experiments.
+sys.path.append(str(Path(__file__).resolve().parents[1] / "common"))
+
+from profile_reports import PROFILE_PATH, merge_profiles, run_profiled, write_report
+
+
+def family_reports(families, instances):
+    """
+    Merges the task profiles of every simulation into a report per model family and
+    number of instances (see util.ProfiledTask).
+
+    Parameters:
+    families (list of str): The model families (folders inside HillClimbing/).
+    instances (list of int): The numbers of instances used in the experiments.
+
+    Returns:
+    list of str: The names of the written reports.
+    """
+    names = []
+    for family in families:
+        for i in instances:
+            stats = merge_profiles(
+                "models/*/" + str(i) + "/HillClimbing/" + family + "/train.prof"
+            )
+            if stats is None:
+                continue
+            write_report(stats, family + "_" + str(i))
+            names.append(family + "_" + str(i))
+    return names
+
+
+if __name__ == "__main__":
+    import util
+
+    for name in family_reports(["CLG", "HSPBN", "HSPBN_HCKDE"], util.INSTANCES):
+        print("Written " + str(PROFILE_PATH / (name + ".txt")))
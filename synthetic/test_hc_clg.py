@@ -5,6 +5,7 @@ import glob
 from pathlib import Path
 
 import pandas as pd
+import resource_usage
 import util
 from generate_dataset import preprocess_dataset
 from generate_new_bns import (
@@ -20,7 +21,9 @@ from generate_new_bns import (
 from pybnesian import load
 
 
-def compare_models(num_instances):
+def compare_models(
+    num_instances, simulations=range(util.NUM_SIMULATIONS), patience=util.PATIENCE
+):
     """
     Compares probabilistic models using different scoring methods and prints the results.
 
@@ -30,6 +33,8 @@ def compare_models(num_instances):
 
     Parameters:
     num_instances (int): The number of instances in the training dataset.
+    simulations (list of int): The simulations to evaluate.
+    patience (list of int): The patience values to evaluate.
 
     Returns:
     None
@@ -44,7 +49,7 @@ def compare_models(num_instances):
     shd_vl = np.empty((util.NUM_SIMULATIONS,))
     hamming_vl = np.empty((util.NUM_SIMULATIONS,))
 
-    for i in range(util.NUM_SIMULATIONS):
+    for i in simulations:
         test_df = pd.read_csv("data/synthetic_" + str(i).zfill(3) + "_test.csv")
         test_df = preprocess_dataset(test_df)
 
@@ -53,10 +58,11 @@ def compare_models(num_instances):
         )
         truth_ll[i] = true_model.ground_truth_bn.slogl(test_df)
 
-    print("True model loglik: " + str(truth_ll.mean()))
+    print("True model loglik: " + str(truth_ll[simulations].mean()))
 
-    for p in util.PATIENCE:
-        for i in range(util.NUM_SIMULATIONS):
+    for p in patience:
+        for i in simulations:
+            load_usage = resource_usage.ResourceUsage()
             true_model = ProbabilisticModel.load(
                 "ground_truth_models/model_" + str(i) + ".pickle"
             )
@@ -67,7 +73,9 @@ def compare_models(num_instances):
             train_df = preprocess_dataset(train_df)
             test_df = pd.read_csv("data/synthetic_" + str(i).zfill(3) + "_test.csv")
             test_df = preprocess_dataset(test_df)
+            load_record = load_usage.stop()
 
+            usage = resource_usage.ResourceUsage()
             result_folder = (
                 "models/"
                 + str(i).zfill(3)
@@ -85,7 +93,9 @@ def compare_models(num_instances):
             ll_bic[i] = final_model.slogl(test_df)
             shd_bic[i] = util.shd(final_model, true_model.expected_bn)
             hamming_bic[i] = util.hamming(final_model, true_model.expected_bn)
+            resource_usage.save(result_folder, "test", usage.stop(), load_record)
 
+            usage = resource_usage.ResourceUsage()
             result_folder = (
                 "models/"
                 + str(i).zfill(3)
@@ -103,15 +113,28 @@ def compare_models(num_instances):
             ll_vl[i] = final_model.slogl(test_df)
             shd_vl[i] = util.shd(final_model, true_model.expected_bn)
             hamming_vl[i] = util.hamming(final_model, true_model.expected_bn)
+            resource_usage.save(result_folder, "test", usage.stop(), load_record)
 
-        print("Loglik, BIC p " + str(p) + ": " + str(ll_bic.mean()))
-        print("Hamming, BIC p " + str(p) + ": " + str(hamming_bic.mean()))
-        print("SHD, BIC p " + str(p) + ": " + str(shd_bic.mean()))
+        print("Loglik, BIC p " + str(p) + ": " + str(ll_bic[simulations].mean()))
+        print("Hamming, BIC p " + str(p) + ": " + str(hamming_bic[simulations].mean()))
+        print("SHD, BIC p " + str(p) + ": " + str(shd_bic[simulations].mean()))
         print()
 
-        print("Loglik, ValidationScore p " + str(p) + ": " + str(ll_vl.mean()))
-        print("Hamming, ValidationScore p " + str(p) + ": " + str(hamming_vl.mean()))
-        print("SHD, ValidationScore p " + str(p) + ": " + str(shd_vl.mean()))
+        print(
+            "Loglik, ValidationScore p "
+            + str(p)
+            + ": "
+            + str(ll_vl[simulations].mean())
+        )
+        print(
+            "Hamming, ValidationScore p "
+            + str(p)
+            + ": "
+            + str(hamming_vl[simulations].mean())
+        )
+        print(
+            "SHD, ValidationScore p " + str(p) + ": " + str(shd_vl[simulations].mean())
+        )
         print()
 
 
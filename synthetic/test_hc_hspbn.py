@@ -5,6 +5,7 @@ import glob
 from pathlib import Path
 
 import pandas as pd
+import resource_usage
 import rpy2
 import util
 from generate_dataset import preprocess_dataset
@@ -60,7 +61,12 @@ class PluginEstimator(pbn.BandwidthSelector):
                 raise rerror
 
 
-def compare_models(num_instances, bandwidth_selection="normal_reference"):
+def compare_models(
+    num_instances,
+    bandwidth_selection="normal_reference",
+    simulations=range(util.NUM_SIMULATIONS),
+    patience=util.PATIENCE,
+):
     """
     Compare probabilistic models using various metrics.
 
@@ -76,6 +82,10 @@ def compare_models(num_instances, bandwidth_selection="normal_reference"):
     bandwidth_selection : str, optional
         The method for bandwidth selection during model fitting. Possible options are:
         "normal_reference", "ucv", and "plugin". Default is "normal_reference".
+    simulations : list of int, optional
+        The simulations to evaluate. Default is all of them.
+    patience : list of int, optional
+        The patience values to evaluate. Default is util.PATIENCE.
 
     Raises:
     -------
@@ -95,7 +105,7 @@ def compare_models(num_instances, bandwidth_selection="normal_reference"):
     hamming = np.empty((util.NUM_SIMULATIONS,))
     hamming_type = np.empty((util.NUM_SIMULATIONS,))
 
-    for i in range(util.NUM_SIMULATIONS):
+    for i in simulations:
         test_df = pd.read_csv("data/synthetic_" + str(i).zfill(3) + "_test.csv")
         test_df = preprocess_dataset(test_df)
 
@@ -104,10 +114,11 @@ def compare_models(num_instances, bandwidth_selection="normal_reference"):
         )
         truth_ll[i] = true_model.ground_truth_bn.slogl(test_df)
 
-    print("True model loglik: " + str(truth_ll.mean()))
+    print("True model loglik: " + str(truth_ll[simulations].mean()))
 
-    for p in util.PATIENCE:
-        for i in range(util.NUM_SIMULATIONS):
+    for p in patience:
+        for i in simulations:
+            load_usage = resource_usage.ResourceUsage()
             true_model = ProbabilisticModel.load(
                 "ground_truth_models/model_" + str(i) + ".pickle"
             )
@@ -118,7 +129,9 @@ def compare_models(num_instances, bandwidth_selection="normal_reference"):
             train_df = preprocess_dataset(train_df)
             test_df = pd.read_csv("data/synthetic_" + str(i).zfill(3) + "_test.csv")
             test_df = preprocess_dataset(test_df)
+            load_record = load_usage.stop()
 
+            usage = resource_usage.ResourceUsage()
             result_folder = (
                 "models/"
                 + str(i).zfill(3)
@@ -152,15 +165,23 @@ def compare_models(num_instances, bandwidth_selection="normal_reference"):
             shd[i] = util.shd(final_model, true_model.expected_bn)
             hamming[i] = util.hamming(final_model, true_model.expected_bn)
             hamming_type[i] = util.hamming_type(final_model, true_model.expected_bn)
+            resource_usage.save(result_folder, "test", usage.stop(), load_record)
 
-        print("Loglik, ValidationScore p " + str(p) + ": " + str(ll.mean()))
-        print("Hamming, ValidationScore p " + str(p) + ": " + str(hamming.mean()))
-        print("SHD, ValidationScore p " + str(p) + ": " + str(shd.mean()))
+        print(
+            "Loglik, ValidationScore p " + str(p) + ": " + str(ll[simulations].mean())
+        )
+        print(
+            "Hamming, ValidationScore p "
+            + str(p)
+            + ": "
+            + str(hamming[simulations].mean())
+        )
+        print("SHD, ValidationScore p " + str(p) + ": " + str(shd[simulations].mean()))
         print(
             "Hamming type, ValidationScore p "
             + str(p)
             + ": "
-            + str(hamming_type.mean())
+            + str(hamming_type[simulations].mean())
         )
         print()
 
@@ -5,6 +5,7 @@ import glob
 from pathlib import Path
 
 import pandas as pd
+import resource_usage
 import rpy2
 import util
 from generate_dataset import preprocess_dataset
@@ -60,7 +61,12 @@ class PluginEstimator(pbn.BandwidthSelector):
                 raise rerror
 
 
-def compare_models(num_instances, bandwidth_selection="normal_reference"):
+def compare_models(
+    num_instances,
+    bandwidth_selection="normal_reference",
+    simulations=range(util.NUM_SIMULATIONS),
+    patience=util.PATIENCE,
+):
     """
     Compare probabilistic models using various metrics.
 
@@ -68,10 +74,12 @@ def compare_models(num_instances, bandwidth_selection="normal_reference"):
     num_instances (int): The number of instances to use for training the models.
     bandwidth_selection (str): The method for bandwidth selection. Possible options are:
                                "normal_reference", "ucv", and "plugin". Default is "normal_reference".
+    simulations (list of int): The simulations to evaluate. Default is all of them.
+    patience (list of int): The patience values to evaluate. Default is util.PATIENCE.
 
     This function performs the following steps:
     1. Loads the ground truth models and computes their log-likelihood on the test datasets.
-    2. For each patience value in `util.PATIENCE`, it:
+    2. For each patience value, it:
        a. Loads the training and test datasets.
        b. Loads the final model from the specified result folder.
        c. Fits the model using the specified bandwidth selection method.
@@ -90,7 +98,7 @@ def compare_models(num_instances, bandwidth_selection="normal_reference"):
     hamming = np.empty((util.NUM_SIMULATIONS,))
     hamming_type = np.empty((util.NUM_SIMULATIONS,))
 
-    for i in range(util.NUM_SIMULATIONS):
+    for i in simulations:
         test_df = pd.read_csv("data/synthetic_" + str(i).zfill(3) + "_test.csv")
         test_df = preprocess_dataset(test_df)
 
@@ -99,10 +107,11 @@ def compare_models(num_instances, bandwidth_selection="normal_reference"):
         )
         truth_ll[i] = true_model.ground_truth_bn.slogl(test_df)
 
-    print("True model loglik: " + str(truth_ll.mean()))
+    print("True model loglik: " + str(truth_ll[simulations].mean()))
 
-    for p in util.PATIENCE:
-        for i in range(util.NUM_SIMULATIONS):
+    for p in patience:
+        for i in simulations:
+            load_usage = resource_usage.ResourceUsage()
             true_model = ProbabilisticModel.load(
                 "ground_truth_models/model_" + str(i) + ".pickle"
             )
@@ -113,7 +122,9 @@ def compare_models(num_instances, bandwidth_selection="normal_reference"):
             train_df = preprocess_dataset(train_df)
             test_df = pd.read_csv("data/synthetic_" + str(i).zfill(3) + "_test.csv")
             test_df = preprocess_dataset(test_df)
+            load_record = load_usage.stop()
 
+            usage = resource_usage.ResourceUsage()
             result_folder = (
                 "models/"
                 + str(i).zfill(3)
@@ -147,15 +158,23 @@ def compare_models(num_instances, bandwidth_selection="normal_reference"):
             shd[i] = util.shd(final_model, true_model.expected_bn)
             hamming[i] = util.hamming(final_model, true_model.expected_bn)
             hamming_type[i] = util.hamming_type(final_model, true_model.expected_bn)
+            resource_usage.save(result_folder, "test", usage.stop(), load_record)
 
-        print("Loglik, ValidationScore p " + str(p) + ": " + str(ll.mean()))
-        print("Hamming, ValidationScore p " + str(p) + ": " + str(hamming.mean()))
-        print("SHD, ValidationScore p " + str(p) + ": " + str(shd.mean()))
+        print(
+            "Loglik, ValidationScore p " + str(p) + ": " + str(ll[simulations].mean())
+        )
+        print(
+            "Hamming, ValidationScore p "
+            + str(p)
+            + ": "
+            + str(hamming[simulations].mean())
+        )
+        print("SHD, ValidationScore p " + str(p) + ": " + str(shd[simulations].mean()))
         print(
             "Hamming type, ValidationScore p "
             + str(p)
             + ": "
-            + str(hamming_type.mean())
+            + str(hamming_type[simulations].mean())
         )
         print()
 
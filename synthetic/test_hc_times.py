@@ -3,14 +3,19 @@ import numpy as np
 np.random.seed(0)
 import struct
 
+import resource_usage
 import util
 
 
-def compare_models(num_instances):
+def compare_models(
+    num_instances, simulations=range(util.NUM_SIMULATIONS), patience=util.PATIENCE
+):
     """
     Compare different models based on their computation times.
 
     This function reads computation times from files for different models and prints the mean times for each model.
+    It also prints the mean and percentiles of the resources used by the train and test stage of each model (see
+    resource_usage.py).
     The models compared are:
     - CLG with BIC
     - CLG with Validation Likelihood
@@ -20,6 +25,8 @@ def compare_models(num_instances):
     Parameters:
     num_instances (int): The number of instances used in the experiments.
     bandwidth_selection (str): The bandwidth selection method used. Default is "normal_reference".
+    simulations (list of int): The simulations to summarize.
+    patience (list of int): The patience values to summarize.
 
     Returns:
     None
@@ -29,8 +36,8 @@ def compare_models(num_instances):
     hspbn_clg_vl = np.empty((util.NUM_SIMULATIONS,))
     hspbn_hckde_vl = np.empty((util.NUM_SIMULATIONS,))
 
-    for p in util.PATIENCE:
-        for i in range(util.NUM_SIMULATIONS):
+    for p in patience:
+        for i in simulations:
 
             bic_folder = (
                 "models/"
@@ -89,10 +96,29 @@ def compare_models(num_instances):
             except FileNotFoundError:
                 hspbn_hckde_vl[i] = None
 
-        print("BIC p = " + str(p) + ": " + str(clg_bic.mean()))
-        print("CLG-VL p = " + str(p) + ": " + str(clg_vl.mean()))
-        print("HSPBN-CLG p = " + str(p) + ": " + str(hspbn_clg_vl.mean()))
-        print("HSPBN-HCKDE p = " + str(p) + ": " + str(hspbn_hckde_vl.mean()))
+        print("BIC p = " + str(p) + ": " + str(clg_bic[simulations].mean()))
+        print("CLG-VL p = " + str(p) + ": " + str(clg_vl[simulations].mean()))
+        print("HSPBN-CLG p = " + str(p) + ": " + str(hspbn_clg_vl[simulations].mean()))
+        print(
+            "HSPBN-HCKDE p = " + str(p) + ": " + str(hspbn_hckde_vl[simulations].mean())
+        )
+
+        folders = {
+            "CLG BIC": "CLG/BIC_" + str(p),
+            "CLG VL": "CLG/ValidationLikelihood_" + str(p),
+            "HSPBN": "HSPBN/" + str(p),
+            "HSPBN_HCKDE": "HSPBN_HCKDE/" + str(p),
+        }
+        for stage in ["train", "test"]:
+            resources = resource_usage.load_resources(
+                num_instances, folders, stage, simulations
+            )
+            if resources.empty:
+                continue
+            print()
+            print("Resources of the " + stage + " stage, p = " + str(p))
+            print(resource_usage.resource_percentiles(resources).T.to_string())
+        print()
 
 
 if __name__ == "__main__":
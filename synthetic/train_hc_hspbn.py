@@ -1,27 +1,27 @@
 import glob
-import math
-import multiprocessing as mp
 import os
 import struct
 import time
 from pathlib import Path
 
 import generate_dataset
+import grid
+import hc_telemetry
 import pandas as pd
+import resource_usage
 import util
 
 import pybnesian as pbn
 
-patience = util.PATIENCE
 
-
-def run_hc_hspbn(idx_dataset, i):
+def run_hc_hspbn(idx_dataset, i, patience=util.PATIENCE):
     """
     Runs the Hill Climbing algorithm for Hybrid Semiparametric Bayesian Networks (HSPBN) on a specified dataset.
 
     Args:
         idx_dataset (int): Index of the dataset to be used.
         i (int): Identifier for the specific run or instance of the dataset.
+        patience (list of int): The patience values of the runs.
 
     Description:
         This function performs the following steps:
@@ -38,12 +38,14 @@ def run_hc_hspbn(idx_dataset, i):
     hc = pbn.GreedyHillClimbing()
     pool = pbn.OperatorPool([pbn.ArcOperatorSet(), pbn.ChangeNodeTypeSet()])
 
+    load_usage = resource_usage.ResourceUsage()
     df = pd.read_csv(
         "data/synthetic_" + str(idx_dataset).zfill(3) + "_" + str(i) + ".csv"
     )
     df = generate_dataset.preprocess_dataset(df)
 
     vl = pbn.ValidatedLikelihood(df, k=10, seed=util.SEED)
+    load_record = load_usage.stop()
     for p in patience:
         result_folder = (
             "models/"
@@ -58,11 +60,14 @@ def run_hc_hspbn(idx_dataset, i):
         if os.path.exists(result_folder + "/end.lock"):
             continue
 
+        usage = resource_usage.ResourceUsage()
         cb_save = pbn.SaveModel(result_folder)
         start_model = pbn.SemiparametricBN(list(df.columns.values))
 
+        score, callback = hc_telemetry.instrument(result_folder, vl, cb_save)
+
         start_time = time.time()
-        bn = hc.estimate(pool, vl, start_model, callback=cb_save, patience=p)
+        bn = hc.estimate(pool, score, start_model, callback=callback, patience=p)
         end_time = time.time()
 
         with open(result_folder + "/time", "wb") as f:
@@ -72,24 +77,10 @@ def run_hc_hspbn(idx_dataset, i):
         last_file = os.path.basename(iters[-1])
         number = int(os.path.splitext(last_file)[0])
         bn.save(result_folder + "/" + str(number + 1).zfill(6) + ".pickle")
+        resource_usage.save(result_folder, "train", usage.stop(), load_record)
         with open(result_folder + "/end.lock", "w") as f:
             pass
 
 
-for i in util.INSTANCES:
-    for idx_dataset in range(
-        0, math.ceil(util.NUM_SIMULATIONS / util.PARALLEL_THREADS)
-    ):
-
-        num_processes = min(
-            util.PARALLEL_THREADS,
-            util.NUM_SIMULATIONS - idx_dataset * util.PARALLEL_THREADS,
-        )
-        with mp.Pool(processes=num_processes) as p:
-            p.starmap(
-                run_hc_hspbn,
-                [
-                    (util.PARALLEL_THREADS * idx_dataset + ii, i)
-                    for ii in range(num_processes)
-                ],
-            )
+if __name__ == "__main__":
+    grid.train(["HSPBN"], util.INSTANCES, range(util.NUM_SIMULATIONS), util.PATIENCE)
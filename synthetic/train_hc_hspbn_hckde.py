@@ -1,27 +1,27 @@
 import glob
-import math
-import multiprocessing as mp
 import os
 import struct
 import time
 from pathlib import Path
 
 import generate_dataset
+import grid
+import hc_telemetry
 import pandas as pd
+import resource_usage
 import util
 
 import pybnesian as pbn
 
-patience = util.PATIENCE
 
-
-def run_hc_hspbn_hckde(idx_dataset, i):
+def run_hc_hspbn_hckde(idx_dataset, i, patience=util.PATIENCE):
     """
     Runs the Hill Climbing algorithm with HSPBN and HCKDE on a synthetic dataset.
 
     Parameters:
     idx_dataset (int): Index of the synthetic dataset to be used.
     i (int): Index of the specific instance of the dataset.
+    patience (list of int): The patience values of the runs.
 
     This function performs the following steps:
     1. Initializes the Greedy Hill Climbing algorithm and the operator pool.
@@ -35,12 +35,14 @@ def run_hc_hspbn_hckde(idx_dataset, i):
     hc = pbn.GreedyHillClimbing()
     pool = pbn.OperatorPool([pbn.ArcOperatorSet(), pbn.ChangeNodeTypeSet()])
 
+    load_usage = resource_usage.ResourceUsage()
     df = pd.read_csv(
         "data/synthetic_" + str(idx_dataset).zfill(3) + "_" + str(i) + ".csv"
     )
     df = generate_dataset.preprocess_dataset(df)
 
     vl = pbn.ValidatedLikelihood(df, k=10, seed=util.SEED)
+    load_record = load_usage.stop()
     for p in patience:
         result_folder = (
             "models/"
@@ -55,6 +57,7 @@ def run_hc_hspbn_hckde(idx_dataset, i):
         if os.path.exists(result_folder + "/end.lock"):
             continue
 
+        usage = resource_usage.ResourceUsage()
         cb_save = pbn.SaveModel(result_folder)
 
         node_types = [
@@ -65,8 +68,10 @@ def run_hc_hspbn_hckde(idx_dataset, i):
         ]
         start_model = pbn.SemiparametricBN(list(df.columns.values), node_types)
 
+        score, callback = hc_telemetry.instrument(result_folder, vl, cb_save)
+
         start_time = time.time()
-        bn = hc.estimate(pool, vl, start_model, callback=cb_save, patience=p)
+        bn = hc.estimate(pool, score, start_model, callback=callback, patience=p)
         end_time = time.time()
 
         with open(result_folder + "/time", "wb") as f:
@@ -76,24 +81,12 @@ def run_hc_hspbn_hckde(idx_dataset, i):
         last_file = os.path.basename(iters[-1])
         number = int(os.path.splitext(last_file)[0])
         bn.save(result_folder + "/" + str(number + 1).zfill(6) + ".pickle")
+        resource_usage.save(result_folder, "train", usage.stop(), load_record)
         with open(result_folder + "/end.lock", "w") as f:
             pass
 
 
-for i in util.INSTANCES:
-    for idx_dataset in range(
-        0, math.ceil(util.NUM_SIMULATIONS / util.PARALLEL_THREADS)
-    ):
-
-        num_processes = min(
-            util.PARALLEL_THREADS,
-            util.NUM_SIMULATIONS - idx_dataset * util.PARALLEL_THREADS,
-        )
-        with mp.Pool(processes=num_processes) as p:
-            p.starmap(
-                run_hc_hspbn_hckde,
-                [
-                    (util.PARALLEL_THREADS * idx_dataset + ii, i)
-                    for ii in range(num_processes)
-                ],
-            )
+if __name__ == "__main__":
+    grid.train(
+        ["HSPBN_HCKDE"], util.INSTANCES, range(util.NUM_SIMULATIONS), util.PATIENCE
+    )
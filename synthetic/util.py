@@ -1,10 +1,85 @@
+import os
+import sys
+from pathlib import Path
+
+# Modules shared by the UCI and synthetic experiments.
+sys.path.append(str(Path(__file__).resolve().parents[1] / "common"))
+
 import pyarrow as pa
+import task_profile
+import thread_budget
 
 NUM_SIMULATIONS = 100
 PARALLEL_THREADS = 10
 INSTANCES = [200, 2000, 10000]
 SEED = 0
 PATIENCE = [0, 15]
+# CPUs of each pool worker, used by the threads of the BLAS and OpenMP libraries and
+# the OpenCL CPU devices of PyBNesian (see thread_budget.py). By default, the CPUs are
+# split evenly among the workers. Also set by WORKER_THREADS.
+WORKER_THREADS = int(os.environ.get("WORKER_THREADS", "0")) or None
+# Binds every pool worker to its own WORKER_THREADS CPUs. Also enabled by PIN_WORKERS=1.
+PIN_WORKERS = os.environ.get("PIN_WORKERS", "0") == "1"
+# Writes a telemetry.csv file with per-iteration statistics of each greedy
+# hill-climbing run (see hc_telemetry.py).
+HC_TELEMETRY = False
+# Runs every training pool task with cProfile, saving one profile per simulation in its
+# model folder (see ProfiledTask and task_profile.py). Also enabled by PROFILE_TASKS=1.
+PROFILE_TASKS = os.environ.get("PROFILE_TASKS", "0") == "1"
+# Start method of the worker processes (see worker_pool.py). Also set by START_METHOD.
+START_METHOD = os.environ.get("START_METHOD", "forkserver")
+
+
+class ProfiledTask:
+    """
+    Pool task that runs the run_hc_* function of a model family on a simulation. If
+    PROFILE_TASKS is set, the function runs with cProfile and the profile is saved as
+    models/[idx_dataset]/[i]/HillClimbing/[family]/train.prof. A simulation with all
+    the runs of the patience values finished (with an end.lock file) is not profiled,
+    so its profile is kept.
+
+    Parameters:
+    func (function): The run_hc_* function, called as func(idx_dataset, i, patience).
+    family (str): The folder of the model family inside HillClimbing/.
+    run_prefixes (list of str): The prefixes of the run folders of each patience value
+        inside the family folder, e.g. ["BIC_", "ValidationLikelihood_"].
+    """
+
+    def __init__(self, func, family, run_prefixes):
+        self.func = func
+        self.family = family
+        self.run_prefixes = run_prefixes
+
+    def __call__(self, idx_dataset, i, patience=PATIENCE):
+        if not PROFILE_TASKS:
+            return self.func(idx_dataset, i, patience)
+
+        family_folder = (
+            "models/"
+            + str(idx_dataset).zfill(3)
+            + "/"
+            + str(i)
+            + "/HillClimbing/"
+            + self.family
+        )
+        if all(
+            os.path.exists(family_folder + "/" + prefix + str(p) + "/end.lock")
+            for prefix in self.run_prefixes
+            for p in patience
+        ):
+            return self.func(idx_dataset, i, patience)
+
+        os.makedirs(family_folder, exist_ok=True)
+        return task_profile.run_profiled(
+            family_folder + "/train.prof", self.func, idx_dataset, i, patience
+        )
+
+
+def worker_budget(workers):
+    """
+    Thread budget of a pool of worker processes (see thread_budget.ThreadBudget).
+    """
+    return thread_budget.ThreadBudget(workers, WORKER_THREADS, pin=PIN_WORKERS)
 
 
 def shd(estimated, true):
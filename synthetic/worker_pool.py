@@ -0,0 +1,29 @@
+import sys
+from pathlib import Path
+
+# Modules shared by the UCI and synthetic experiments.
+sys.path.append(str(Path(__file__).resolve().parents[1] / "common"))
+
+import process_pool
+from process_pool import init_worker, startup_report, task_startup
+
+# Modules imported by the fork server before forking any worker, so the workers start
+# with them already imported.
+PRELOAD_MODULES = [
+    "numpy",
+    "pandas",
+    "pyarrow",
+    "pybnesian",
+    "util",
+    "generate_dataset",
+    "hc_telemetry",
+    "resource_usage",
+]
+
+
+def context(start_method):
+    """
+    Returns the multiprocessing context of the worker pools, which preloads
+    PRELOAD_MODULES in the fork server (see process_pool.context).
+    """
+    return process_pool.context(start_method, PRELOAD_MODULES)